@@ -0,0 +1,259 @@
+"""Benchmark suite for DIT Lab.
+
+Measures the hot paths with fake LLM clients, so no network access or API
+key is needed:
+
+* step throughput (steps/sec) of ``step_once`` and ``run`` at several
+  qubit counts;
+* snapshot memory (bytes per snapshot) over long timelines;
+* rewind, checkout and branch latency on a long timeline;
+* ``compute_entropy`` latency on single and batched brains;
+* step throughput through the pooled OpenAI client against the local
+  stub chat server: sequential, batched with ``call_many`` and
+  pipelined over many timelines with ``run_pipelined``;
+* p50/p99 latency of ``POST /step`` and ``GET /state`` through the
+  in-process ASGI test client.
+
+Results are written as JSON and can be compared against a saved baseline;
+any metric that is worse than the baseline by more than the tolerance is
+reported as a regression and makes the script exit with status 1.
+
+Usage:
+    PYTHONPATH=src python benchmarks/run_benchmarks.py --save baseline.json
+    PYTHONPATH=src python benchmarks/run_benchmarks.py --compare baseline.json
+    PYTHONPATH=src python benchmarks/run_benchmarks.py --quick
+
+Baselines are machine specific, so none is committed; record one on the
+machine that runs the comparison.
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from ditlab.api import FakeLLMClient
+from ditlab.brain.batched import BatchedBrainState
+from ditlab.brain.metrics import compute_entropy
+from ditlab.brain.qubits import QubitBrainState
+from ditlab.env.simple_1d import Simple1DEnvironment
+from ditlab.lab.controller import SimulationController
+from ditlab.lab.pipeline import run_pipelined
+from ditlab.llm.client_base import LLMClientBase
+from ditlab.llm.openai_client import OpenAIClient
+from ditlab.llm.stub_server import StubChatServer, constant
+from ditlab.util.random_seed import make_rng
+
+# Each result records whether a higher or a lower value is better.
+Results = Dict[str, Dict[str, Any]]
+
+
+class PromptReadingLLM(LLMClientBase):
+    """Fake client that asks for the prompt, like a real model would."""
+
+    def __call__(self, prompt: str) -> str:
+        return '{"qubit_update": "decohere", "perceived_environment": {"description": "bench"}}'
+
+
+def _controller(num_qubits: int, llm: LLMClientBase, **kwargs: Any) -> SimulationController:
+    brain = QubitBrainState.init_random(num_qubits, rng=make_rng(0))
+    return SimulationController(Simple1DEnvironment(size=10), brain, llm, rng=make_rng(1), **kwargs)
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    values = np.asarray(samples)
+    return {"p50": float(np.percentile(values, 50)), "p99": float(np.percentile(values, 99))}
+
+
+def _timed(fn: Callable[[], Any], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_step_throughput(results: Results, qubit_counts: List[int], steps: int) -> None:
+    for n in qubit_counts:
+        controller = _controller(n, PromptReadingLLM())
+        start = time.perf_counter()
+        for _ in range(steps):
+            controller.step_once()
+        rate = steps / (time.perf_counter() - start)
+        results[f"step_once.q{n}"] = {"value": rate, "unit": "steps/s", "better": "higher"}
+
+        controller = _controller(n, FakeLLMClient())
+        start = time.perf_counter()
+        controller.run(steps)
+        rate = steps / (time.perf_counter() - start)
+        results[f"run.q{n}"] = {"value": rate, "unit": "steps/s", "better": "higher"}
+
+
+def bench_snapshot_memory(results: Results, lengths: List[int], num_qubits: int = 4) -> None:
+    for length in lengths:
+        controller = _controller(num_qubits, FakeLLMClient())
+        controller.run(length, actions=["left", "right", "stay"] * (length // 3 + 1))
+        store = controller.snapshots.store
+        per_snapshot = store.nbytes / max(len(store), 1)
+        results[f"snapshot_bytes.{length}"] = {"value": per_snapshot, "unit": "bytes", "better": "lower"}
+
+
+def bench_timeline_ops(results: Results, length: int, repeat: int) -> None:
+    controller = _controller(4, FakeLLMClient())
+    controller.run(length)
+    snapshots = controller.snapshots
+    rng = np.random.default_rng(0)
+    indices = rng.integers(0, length, size=repeat)
+    it = iter(indices)
+    rewind = _timed(lambda: snapshots.rewind(int(next(it))), repeat)
+    results["rewind"] = {"value": _percentiles(rewind)["p50"], "unit": "s", "better": "lower"}
+    it = iter(indices)
+    checkout = _timed(lambda: snapshots.checkout(int(next(it))), repeat)
+    results["checkout"] = {"value": _percentiles(checkout)["p50"], "unit": "s", "better": "lower"}
+    branch = _timed(snapshots.branch, repeat)
+    results["branch"] = {"value": _percentiles(branch)["p50"], "unit": "s", "better": "lower"}
+
+    replaying = _controller(4, FakeLLMClient(), checkpoint_interval=32)
+    replaying.run(length)
+    it = iter(indices)
+    replay = _timed(lambda: replaying.rewind_to(int(next(it))), repeat)
+    results["rewind_to.k32"] = {"value": _percentiles(replay)["p50"], "unit": "s", "better": "lower"}
+
+
+def bench_entropy(results: Results, repeat: int) -> None:
+    single = QubitBrainState.init_random(16, rng=make_rng(0))
+    batch = BatchedBrainState.init_random(1024, 16, rng=make_rng(0))
+
+    def fresh_single() -> None:
+        single.invalidate()
+        compute_entropy(single)
+
+    def fresh_batch() -> None:
+        batch.invalidate()
+        compute_entropy(batch)
+
+    results["entropy.single"] = {
+        "value": _percentiles(_timed(fresh_single, repeat))["p50"], "unit": "s", "better": "lower"
+    }
+    results["entropy.batch1024"] = {
+        "value": _percentiles(_timed(fresh_batch, repeat))["p50"], "unit": "s", "better": "lower"
+    }
+
+
+def bench_stub_llm(results: Results, steps: int, latency: float = 0.005) -> None:
+    with StubChatServer(latency=constant(latency)) as server:
+        client = OpenAIClient(base_url=server.url)
+        controller = _controller(4, client)
+        start = time.perf_counter()
+        for _ in range(steps):
+            controller.step_once()
+        rate = steps / (time.perf_counter() - start)
+        results["step_once.stub"] = {"value": rate, "unit": "steps/s", "better": "higher"}
+
+        prompts = [f"prompt {i}" for i in range(steps)]
+        start = time.perf_counter()
+        client.call_many(prompts)
+        rate = steps / (time.perf_counter() - start)
+        results["call_many.stub"] = {"value": rate, "unit": "calls/s", "better": "higher"}
+
+        controllers = [_controller(4, client) for _ in range(16)]
+        per_controller = max(steps // len(controllers), 1)
+        start = time.perf_counter()
+        run_pipelined(controllers, per_controller)
+        rate = per_controller * len(controllers) / (time.perf_counter() - start)
+        results["pipelined.stub"] = {"value": rate, "unit": "steps/s", "better": "higher"}
+        client.close()
+
+
+def bench_api(results: Results, requests: int) -> None:
+    from fastapi.testclient import TestClient
+
+    from ditlab.api import app
+
+    client = TestClient(app)
+    client.post("/reset")
+    actions = itertools.cycle(["left", "right", "stay"])
+    step = _timed(lambda: client.post("/step", json={"action": next(actions)}), requests)
+    state = _timed(lambda: client.get("/state"), requests)
+    for name, samples in (("api.step", step), ("api.state", state)):
+        for key, value in _percentiles(samples).items():
+            results[f"{name}.{key}"] = {"value": value, "unit": "s", "better": "lower"}
+
+
+def run_all(quick: bool = False) -> Dict[str, Any]:
+    """Run every benchmark and return the results with run metadata."""
+    scale = 10 if quick else 1
+    results: Results = {}
+    bench_step_throughput(results, [2, 8, 32], steps=2000 // scale)
+    bench_snapshot_memory(results, [10_000 // scale, 100_000 // scale])
+    bench_timeline_ops(results, length=5000 // scale, repeat=200 // scale)
+    bench_entropy(results, repeat=500 // scale)
+    bench_stub_llm(results, steps=200 // scale)
+    bench_api(results, requests=500 // scale)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Return a description of every metric that regressed beyond ``tolerance``.
+
+    Args:
+        current: Results of this run.
+        baseline: Previously saved results.
+        tolerance: Allowed relative slowdown, e.g. ``0.2`` for 20%.
+    """
+    regressions = []
+    for name, old in baseline["results"].items():
+        new = current["results"].get(name)
+        if new is None or old["value"] == 0:
+            continue
+        change = new["value"] / old["value"] - 1.0
+        worse = -change if old["better"] == "higher" else change
+        if worse > tolerance:
+            regressions.append(
+                f"{name}: {old['value']:.4g} -> {new['value']:.4g} {old['unit']} ({change:+.1%})"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--save", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="Compare against a baseline JSON file.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression.")
+    parser.add_argument("--quick", action="store_true", help="Run a 10x smaller workload.")
+    args = parser.parse_args()
+
+    current = run_all(quick=args.quick)
+    for name, result in current["results"].items():
+        print(f"{name:<24} {result['value']:>14.6g} {result['unit']}")
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,21 +3,33 @@
 This example shows how to configure the brain dynamics to study the effects
 of increased noise versus more stable update rules. The current script is a
 placeholder and will be expanded as the simulation code evolves.
+
+:func:`run_sweep` runs a grid of configurations over several seeds in
+parallel with :class:`~ditlab.lab.sweeps.SweepRunner`; given a cache
+directory, results are cached there so an interrupted sweep resumes where
+it stopped.
 """
 
 import random
-from typing import Tuple
+from typing import Dict, Optional, Tuple
 
 from ditlab.env.simple_1d import Simple1DEnvironment
 from ditlab.brain.qubits import QubitBrainState
+from ditlab.brain.metrics import compute_entropy
+from ditlab.config.schemas import LabConfig
 from ditlab.llm.client_base import LLMClientBase
 from ditlab.lab.controller import SimulationController
+from ditlab.lab.experiments import Experiment
+from ditlab.lab.sweeps import SweepRunner, expand_grid
+from ditlab.util.random_seed import set_random_seed
 
 
 class DummyLLMClient(LLMClientBase):
     """A minimal LLM client returning random perceived environment."""
 
-    def __call__(self, prompt: str) -> str -> str:
+    uses_prompt = False
+
+    def __call__(self, prompt: str) -> str:
         # Randomly choose threat level and self state for demonstration
         threat = random.choice(["low", "medium", "high"])
         state = random.choice(["calm", "anxious", "excited", "neutral"])
@@ -44,16 +56,50 @@ def run_experiment(noise_level: float, steps: int = 10) -> Tuple[int, dict]:
     llm = DummyLLMClient()
     controller = SimulationController(env, brain, llm)
 
-    perceived = {}
-    for _ in range(steps):
-        state, perceived = controller.step_once()
+    _, perceived = controller.run(steps)
     return steps, perceived
 
 
+def run_cell(config: LabConfig, steps: int = 50) -> Dict[str, float]:
+    """Run one sweep cell and return summary statistics.
+
+    ``steps`` is not part of the config, so the sweep cache does not see
+    it; use a new cache directory after changing it.
+    """
+    # The dummy client draws from ``random``; seed it for this run.
+    set_random_seed(config.seed)
+    controller = Experiment(config=config, llm_client=DummyLLMClient()).create_controller()
+    controller.run(steps, snapshot_every=steps)
+    return {
+        "entropy": compute_entropy(controller.brain),
+        "agent_position": controller.env.state.agent_position,
+    }
+
+
+def run_sweep(num_seeds: int = 4, cache_dir: Optional[str] = None) -> None:
+    """Sweep brain size and environment size over several seeds.
+
+    Args:
+        num_seeds: Number of seeds per configuration.
+        cache_dir: Directory in which finished cells are memoised, so an
+            interrupted sweep can be resumed. Nothing is cached if omitted.
+    """
+    configs = expand_grid(LabConfig(), {"brain.num_qubits": [2, 4, 8], "environment.size": [10, 20]})
+    runner = SweepRunner(run_cell, cache_dir=cache_dir)
+    for cell in runner.run(configs, seeds=num_seeds, root_seed=0):
+        source = "cached" if cell.cached else "done"
+        print(
+            f"[{source}] qubits={cell.config.brain.num_qubits} size={cell.config.environment.size} "
+            f"seed={cell.config.seed}: {cell.result}"
+        )
+
+
 def main() -> None:
     print("Running chaos vs stability experiment...\n")
     steps, perceived = run_experiment(noise_level=0.5, steps=5)
     print(f"Ran {steps} steps. Final perceived environment: {perceived}")
+    print("\nRunning parameter sweep...\n")
+    run_sweep()
 
 
 if __name__ == "__main__":
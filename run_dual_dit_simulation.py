@@ -23,9 +23,8 @@ import json
 import random
 from typing import List, Tuple
 
-import numpy as np
-
 from ditlab.brain.qubits import QubitBrainState
+from ditlab.brain.entangled import EntangledBrainState
 
 
 def colour_from_activity(activity: float, emotion: float) -> str:
@@ -56,22 +55,22 @@ def colour_from_activity(activity: float, emotion: float) -> str:
     return "blue"
 
 
-def entangle_brains(brain_neutral: QubitBrainState, brain_speaker: QubitBrainState, emotion: float) -> None:
+def entangle_brains(
+    brain_neutral: QubitBrainState, brain_speaker: QubitBrainState, emotion: float
+) -> EntangledBrainState:
     """Entangle the neutral brain with the speaker based on emotional intensity.
 
-    We simply adjust the amplitudes of the neutral brain's qubits to
-    reflect the strength of the emotional influence.  This is a
-    heuristic update for demonstration purposes: amplitudes are scaled
-    by (1 + emotion * 0.2) and then renormalised.  In a real model
-    you might implement entanglement using tensor products and more
-    sophisticated operations.
+    Both brains are combined into a joint :class:`EntangledBrainState`.
+    Each speaker qubit then controls a rotation of the matching neutral
+    qubit, with a strength equal to the emotional intensity, so the
+    neutral agent's measurements become correlated with the speaker's.
+    Returns the joint state; ``agent_slices`` gives each brain's qubits.
     """
-    amps = brain_neutral.amplitudes.copy()
-    amps *= (1.0 + emotion * 0.2)
-    # Renormalise each qubit's state
-    norms = np.linalg.norm(amps, axis=1, keepdims=True)
-    amps = amps / norms
-    brain_neutral.amplitudes = amps
+    joint = EntangledBrainState.from_brains(brain_speaker, brain_neutral, rng=brain_neutral.rng)
+    speaker, neutral = joint.agent_slices
+    for control, target in zip(range(speaker.start, speaker.stop), range(neutral.start, neutral.stop)):
+        joint.entangle(control, target, emotion)
+    return joint
 
 
 def run_simulation(steps: int = 5) -> None:
@@ -80,9 +79,9 @@ def run_simulation(steps: int = 5) -> None:
     The function prints the true and perceived internal states of the
     neutral agent at each step, along with the emotional intensity
     (randomly generated), the most active qubit probability and the
-    resulting colour designation.  The speaker agent's state is
-    currently unused except to illustrate how two brains might
-    interact.
+    resulting colour designation.  The neutral agent's qubits are
+    measured jointly with the speaker's, so their outcomes are
+    correlated.
     """
     # Initialise two brains with two qubits each
     brain_neutral = QubitBrainState.init_random(num_qubits=2)
@@ -97,10 +96,12 @@ def run_simulation(steps: int = 5) -> None:
         emotion = random.random()
 
         # Entangle the neutral brain with the speaker brain
-        entangle_brains(brain_neutral, brain_speaker, emotion)
+        joint = entangle_brains(brain_neutral, brain_speaker, emotion)
 
-        # Measure the qubits of the neutral brain
-        bits, probs = brain_neutral.measure()
+        # Measure both brains jointly and keep the neutral brain's qubits
+        all_bits, all_probs = joint.measure()
+        neutral = joint.agent_slices[1]
+        bits, probs = all_bits[neutral], all_probs[neutral]
 
         # Determine overall activity as the maximum probability
         activity_level = max(p[1] for p in probs)
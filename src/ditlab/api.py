@@ -18,6 +18,10 @@ POST /step
 GET /state
     Retrieve the current true environment state and the brain's
     perceived environment from the last step.
+
+GET /metrics
+    Per-phase step latency histograms, allocation counts and LLM token
+    sizes collected by the controller's profiler.
 ```
 
 Under the hood the API holds global references to an environment,
@@ -41,6 +45,7 @@ from .brain.qubits import QubitBrainState
 from .brain.perception import generate_perception
 from .llm.client_base import LLMClientBase
 from .lab.controller import SimulationController
+from .lab.profiling import StepProfiler
 
 
 class FakeLLMClient(LLMClientBase):
@@ -51,6 +56,8 @@ class FakeLLMClient(LLMClientBase):
     environment description based on the measured qubit bits.
     """
 
+    uses_prompt = False
+
     def __call__(self, prompt: str) -> str:
         # We don't parse the prompt here. In a real implementation,
         # the prompt would be inspected to tailor the response.
@@ -79,7 +86,8 @@ class StateResponse(BaseModel):
 _env = Simple1DEnvironment(size=10)
 _brain = QubitBrainState.init_random(num_qubits=3)
 _llm: LLMClientBase = FakeLLMClient()
-_controller = SimulationController(env=_env, brain=_brain, llm=_llm)
+_profiler = StepProfiler()
+_controller = SimulationController(env=_env, brain=_brain, llm=_llm, profiler=_profiler)
 
 app = FastAPI(title="DIT Lab Simulator API", version="0.0.1")
 
@@ -90,7 +98,7 @@ def reset_simulation() -> StateResponse:
     global _env, _brain, _controller
     _env.reset()
     _brain = QubitBrainState.init_random(num_qubits=3)
-    _controller = SimulationController(env=_env, brain=_brain, llm=_llm)
+    _controller = SimulationController(env=_env, brain=_brain, llm=_llm, profiler=_profiler)
     env_state, _ = _controller.step_once(action="stay")
     perceived = generate_perception(_controller.brain)
     return StateResponse(env_state=env_state.to_dict(), perceived=perceived)
@@ -117,4 +125,10 @@ def get_state() -> StateResponse:
     env_state = _controller.env.state
     # We'll derive perceived environment from the latest brain state via heuristic
     perceived = generate_perception(_controller.brain)
-    return StateResponse(env_state=env_state.to_dict(), perceived=perceived)
\ No newline at end of file
+    return StateResponse(env_state=env_state.to_dict(), perceived=perceived)
+
+
+@app.get("/metrics")
+def get_metrics() -> Dict[str, Any]:
+    """Return the step profiler's per-phase latency and token statistics."""
+    return _profiler.summary()
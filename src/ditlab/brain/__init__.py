@@ -7,13 +7,23 @@ functions, and metrics.
 """
 
 from .qubits import QubitBrainState  # noqa: F401
+from .batched import BatchedBrainState  # noqa: F401
+from .compact import CompactQubitBrainState  # noqa: F401
+from .entangled import EntangledBrainState  # noqa: F401
 from .dynamics import apply_qubit_update  # noqa: F401
+from .instructions import compile_instruction  # noqa: F401
 from .perception import generate_perception  # noqa: F401
-from .metrics import compute_entropy  # noqa: F401
+from .metrics import compute_entropy, MetricsEngine, RollingWindow  # noqa: F401
 
 __all__ = [
     "QubitBrainState",
+    "BatchedBrainState",
+    "CompactQubitBrainState",
+    "EntangledBrainState",
     "apply_qubit_update",
+    "compile_instruction",
     "generate_perception",
     "compute_entropy",
+    "MetricsEngine",
+    "RollingWindow",
 ]
\ No newline at end of file
@@ -0,0 +1,129 @@
+"""Batched ensemble of qubit brain states.
+
+This module defines :class:`BatchedBrainState`, which stores the
+amplitudes of many independent brains in a single ``(batch, n, 2)``
+array. Initialisation, measurement, updates and metrics are carried out
+with one vectorised NumPy call for the whole population instead of one
+Python call per brain, which makes population studies with thousands of
+agents practical.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Tuple
+
+from ditlab.util.random_seed import make_rng, spawn_rng
+from .qubits import QubitBrainState
+
+
+@dataclass
+class BatchedBrainState:
+    """A population of brains sharing one amplitude array.
+
+    The amplitudes have shape ``(batch, n, 2)``: the first axis indexes
+    the brain, the second the qubit and the last the basis state. Every
+    brain in the batch has the same number of qubits. The whole batch
+    draws from a single random stream, ``rng``. As with
+    :class:`QubitBrainState`, probabilities are cached until
+    ``amplitudes`` is reassigned or :meth:`invalidate` is called.
+    """
+
+    amplitudes: np.ndarray = field(default_factory=lambda: np.zeros((0, 0, 2), dtype=np.complex128))
+    rng: np.random.Generator = field(default_factory=make_rng, repr=False, compare=False)
+    _probs_cache: Optional[Tuple[np.ndarray, np.ndarray]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    @classmethod
+    def init_random(
+        cls, batch_size: int, num_qubits: int, rng: Optional[np.random.Generator] = None
+    ) -> BatchedBrainState:
+        """Initialise a batch of brains with random complex amplitudes.
+
+        Args:
+            batch_size: Number of brains in the batch.
+            num_qubits: Number of qubits in each brain.
+            rng: Random stream for the batch. A fresh stream is used if
+                omitted.
+
+        Returns:
+            A new ``BatchedBrainState`` with normalised random amplitudes.
+        """
+        rng = rng if rng is not None else make_rng()
+        shape = (batch_size, num_qubits, 2)
+        amps = rng.random(shape) + 1j * rng.random(shape)
+        # Normalise each qubit of each brain
+        norms = np.linalg.norm(amps, axis=-1, keepdims=True)
+        amps = amps / norms
+        return cls(amplitudes=amps, rng=rng)
+
+    @classmethod
+    def from_states(cls, states: Iterable[QubitBrainState]) -> BatchedBrainState:
+        """Stack individual brain states into a batch.
+
+        Args:
+            states: Brain states with the same number of qubits.
+
+        Returns:
+            A new ``BatchedBrainState`` holding a copy of the amplitudes.
+        """
+        return cls(amplitudes=np.stack([s.amplitudes for s in states]))
+
+    @property
+    def batch_size(self) -> int:
+        """Number of brains in the batch."""
+        return self.amplitudes.shape[0]
+
+    @property
+    def num_qubits(self) -> int:
+        """Number of qubits in each brain."""
+        return self.amplitudes.shape[1]
+
+    def __len__(self) -> int:
+        return self.batch_size
+
+    def __getitem__(self, index: int) -> QubitBrainState:
+        """Return a single brain of the batch as a :class:`QubitBrainState`.
+
+        The returned brain gets a child stream of the batch's generator.
+        """
+        return QubitBrainState(amplitudes=self.amplitudes[index].copy(), rng=spawn_rng(self.rng))
+
+    def probabilities(self) -> np.ndarray:
+        """Return the cached, read-only ``(batch, n, 2)`` probabilities."""
+        cache = self._probs_cache
+        if cache is not None and cache[0] is self.amplitudes:
+            return cache[1]
+        probs = np.abs(self.amplitudes) ** 2
+        probs.flags.writeable = False
+        self._probs_cache = (self.amplitudes, probs)
+        return probs
+
+    def invalidate(self) -> None:
+        """Drop cached probabilities after an in-place amplitude change."""
+        self._probs_cache = None
+
+    def measure(self, shots: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Measure every qubit of every brain.
+
+        Args:
+            shots: Number of independent shots per brain. If omitted a
+                single shot is drawn.
+
+        Returns:
+            A tuple ``(bits, probs)`` where ``bits`` has shape
+            ``(batch, n)``, or ``(shots, batch, n)`` if ``shots`` is given,
+            and ``probs`` has shape ``(batch, n, 2)``.
+        """
+        probs = self.probabilities()
+        size = self.amplitudes.shape[:-1]
+        if shots is not None:
+            size = (shots,) + size
+        bits = (self.rng.random(size) < probs[..., 1]).astype(int)
+        return bits, probs
+
+    def copy(self) -> BatchedBrainState:
+        """Return a copy of the batch sharing its random stream."""
+        return BatchedBrainState(amplitudes=self.amplitudes.copy(), rng=self.rng)
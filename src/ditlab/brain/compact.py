@@ -0,0 +1,156 @@
+"""Compact, allocation-free qubit brain representation.
+
+:class:`CompactQubitBrainState` offers the same ``measure``/``copy``
+surface as :class:`~ditlab.brain.qubits.QubitBrainState` but is tuned for
+long runs and large populations:
+
+* it uses ``__slots__`` instead of an instance dictionary;
+* amplitudes are stored as ``complex64`` by default, halving their size;
+* updates run in place on the existing amplitude array using
+  preallocated scratch buffers, so a step allocates almost nothing;
+* deep copies (as taken by snapshots) carry only the amplitudes and the
+  random stream, never the scratch buffers.
+"""
+
+from __future__ import annotations
+
+from copy import deepcopy
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from ditlab.util.random_seed import make_rng
+from .instructions import Workspace
+from .qubits import QubitBrainState
+
+
+class CompactQubitBrainState:
+    """A slotted brain state that is updated in place.
+
+    Args:
+        amplitudes: Initial ``(n, 2)`` amplitudes; they are converted to
+            ``dtype``.
+        rng: The brain's random stream. A fresh stream is used if omitted.
+        dtype: Complex dtype used for storage.
+    """
+
+    __slots__ = ("_amplitudes", "rng", "_probs", "_probs_valid", "_workspace")
+
+    #: Tells :func:`~ditlab.brain.dynamics.apply_qubit_update` to mutate
+    #: this state rather than returning an updated copy.
+    inplace_updates = True
+
+    def __init__(
+        self,
+        amplitudes: np.ndarray,
+        rng: Optional[np.random.Generator] = None,
+        dtype: Any = np.complex64,
+    ) -> None:
+        self._amplitudes = np.array(amplitudes, dtype=dtype, order="C")
+        self.rng = rng if rng is not None else make_rng()
+        self._probs: Optional[np.ndarray] = None
+        self._probs_valid = False
+        self._workspace: Optional[Workspace] = None
+
+    @classmethod
+    def init_random(
+        cls, num_qubits: int, rng: Optional[np.random.Generator] = None, dtype: Any = np.complex64
+    ) -> CompactQubitBrainState:
+        """Initialise a compact brain state with random complex amplitudes.
+
+        Args:
+            num_qubits: Number of qubits in the state.
+            rng: Random stream for the new brain.
+            dtype: Complex dtype used for storage.
+
+        Returns:
+            A new ``CompactQubitBrainState`` with normalised amplitudes.
+        """
+        state = QubitBrainState.init_random(num_qubits, rng=rng)
+        return cls.from_state(state, dtype=dtype)
+
+    @classmethod
+    def from_state(cls, state: QubitBrainState, dtype: Any = np.complex64) -> CompactQubitBrainState:
+        """Convert a :class:`QubitBrainState`, taking over its random stream."""
+        return cls(state.amplitudes, rng=state.rng, dtype=dtype)
+
+    @property
+    def amplitudes(self) -> np.ndarray:
+        """The ``(n, 2)`` amplitude array, updated in place between steps."""
+        return self._amplitudes
+
+    @amplitudes.setter
+    def amplitudes(self, value: np.ndarray) -> None:
+        # Keep the existing buffer when the shape allows it.
+        if value is not self._amplitudes:
+            if value.shape == self._amplitudes.shape:
+                self._amplitudes[...] = value
+            else:
+                self._amplitudes = np.array(value, dtype=self._amplitudes.dtype, order="C")
+                self._probs = None
+                self._workspace = None
+        self._probs_valid = False
+
+    @property
+    def workspace(self) -> Workspace:
+        """Scratch buffers for in-place updates, allocated on first use."""
+        if self._workspace is None:
+            self._workspace = Workspace(self._amplitudes.shape, self._amplitudes.dtype)
+        return self._workspace
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the amplitudes and any allocated scratch buffers."""
+        total = self._amplitudes.nbytes
+        if self._probs is not None:
+            total += self._probs.nbytes
+        if self._workspace is not None:
+            work = self._workspace
+            total += work.real.nbytes + work.complex.nbytes + work.norms.nbytes
+        return total
+
+    def invalidate(self) -> None:
+        """Mark cached probabilities stale after an in-place update."""
+        self._probs_valid = False
+
+    def probabilities(self) -> np.ndarray:
+        """Return the measurement probabilities of every qubit.
+
+        The result is a read-only view of an internal buffer that is
+        overwritten after the next update; copy it to keep it.
+        """
+        if self._probs is None:
+            self._probs = np.empty(self._amplitudes.shape, dtype=np.finfo(self._amplitudes.dtype).dtype)
+        if not self._probs_valid:
+            self._probs.flags.writeable = True
+            np.abs(self._amplitudes, out=self._probs)
+            np.square(self._probs, out=self._probs)
+            self._probs.flags.writeable = False
+            self._probs_valid = True
+        return self._probs
+
+    def measure(self, shots: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Measure all qubits; see :meth:`QubitBrainState.measure`."""
+        probs = self.probabilities()
+        n = self._amplitudes.shape[0]
+        size = n if shots is None else (shots, n)
+        bits = (self.rng.random(size) < probs[:, 1]).astype(int)
+        return bits, probs
+
+    def copy(self) -> CompactQubitBrainState:
+        """Return a copy with its own amplitudes, sharing the random stream."""
+        return CompactQubitBrainState(self._amplitudes, rng=self.rng, dtype=self._amplitudes.dtype)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> CompactQubitBrainState:
+        return CompactQubitBrainState(
+            self._amplitudes, rng=deepcopy(self.rng, memo), dtype=self._amplitudes.dtype
+        )
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {"amplitudes": self._amplitudes, "rng": self.rng}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(state["amplitudes"], rng=state["rng"], dtype=state["amplitudes"].dtype)
+
+    def __repr__(self) -> str:
+        return f"CompactQubitBrainState(amplitudes={self._amplitudes!r})"
@@ -2,43 +2,55 @@
 
 This module provides functions to apply updates to a :class:`QubitBrainState`
 based on high-level instructions. The instructions are typically
-generated by a language model and interpreted heuristically here.
+generated by a language model and are compiled into fused numeric
+programs by :mod:`ditlab.brain.instructions`.
 """
 
-from typing import Any
+from typing import Optional, TypeVar
 
-import numpy as np
+from .instructions import compile_instruction
 
-from .qubits import QubitBrainState
+# Either a single QubitBrainState or a BatchedBrainState; both expose
+# ``amplitudes`` with the basis state on the last axis, ``rng`` and ``copy()``.
+BrainT = TypeVar("BrainT")
 
 
-def apply_qubit_update(state: QubitBrainState, update_instruction: str) -> QubitBrainState:
+def apply_qubit_update(state: BrainT, update_instruction: str, inplace: Optional[bool] = None) -> BrainT:
     """Apply a simple update to the brain state based on a text instruction.
 
-    This is a placeholder implementation that demonstrates how high-level
-    textual instructions might be used to modify the qubit amplitudes. In a
-    more sophisticated model, this function would parse the instruction
-    and apply corresponding linear operations or quantum-inspired gates.
+    The instruction is compiled by
+    :func:`~ditlab.brain.instructions.compile_instruction`, which caches
+    the resulting program, so repeated instructions are not re-parsed.
+    Instructions that match no rule (such as ``"none"``) leave the state
+    untouched and the same object is returned without copying. Stochastic
+    operations draw from the brain's own random stream.
+
+    The update works on the last axis of the amplitude array, so a
+    :class:`~ditlab.brain.batched.BatchedBrainState` is updated in one
+    vectorised call, with the same instruction applied to every brain.
 
     Args:
         state: The current brain state.
         update_instruction: A string containing the update instruction.
+        inplace: Whether to mutate ``state`` instead of returning an
+            updated copy. Defaults to the state's ``inplace_updates``
+            attribute, which is set by
+            :class:`~ditlab.brain.compact.CompactQubitBrainState`. States
+            with a ``workspace`` are then updated without allocating.
 
     Returns:
-        A new brain state after applying the update.
+        A new brain state after applying the update, or ``state`` itself
+        if the instruction is a no-op or the update was done in place.
     """
+    program = compile_instruction(update_instruction)
+    if program.is_noop:
+        return state
+    if inplace is None:
+        inplace = getattr(state, "inplace_updates", False)
+    if inplace:
+        state.amplitudes = program.apply(state.amplitudes, state.rng, getattr(state, "workspace", None))
+        state.invalidate()
+        return state
     new_state = state.copy()
-    amps = new_state.amplitudes
-    # Example heuristic rules
-    if "bias towards state 1" in update_instruction.lower():
-        # Increase the probability of measuring 1 on all qubits
-        amps[:, 1] *= 1.1
-    if "decohere" in update_instruction.lower():
-        # Add random noise to all amplitudes
-        noise = (np.random.rand(*amps.shape) - 0.5) * 0.1
-        amps += noise + 1j * noise
-    # Renormalise each qubit
-    norms = np.linalg.norm(amps, axis=1, keepdims=True)
-    amps = amps / norms
-    new_state.amplitudes = amps
-    return new_state
\ No newline at end of file
+    new_state.amplitudes = program.apply(new_state.amplitudes, new_state.rng)
+    return new_state
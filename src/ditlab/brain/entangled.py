@@ -0,0 +1,243 @@
+"""Entangled multi-brain state backend.
+
+:class:`QubitBrainState` keeps one independent two-amplitude vector per
+qubit, so it cannot represent correlations between qubits, let alone
+between agents. :class:`EntangledBrainState` holds the joint state of all
+qubits of several brains. Small systems use a dense state vector of
+``2**n`` amplitudes; beyond a configurable number of qubits the state is
+kept as a matrix-product state (MPS) whose bond dimension is truncated,
+so memory grows linearly rather than exponentially with the qubit count.
+
+Both representations support vectorised single- and two-qubit gates,
+per-qubit marginal probabilities and joint sampling, behind the same
+``measure``/``copy`` surface as :class:`QubitBrainState`.
+"""
+
+from __future__ import annotations
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ditlab.util.random_seed import make_rng
+from .qubits import QubitBrainState
+
+#: Default number of qubits above which the MPS representation is used.
+DEFAULT_MAX_DENSE_QUBITS = 12
+
+SWAP = np.array(
+    [[1, 0, 0, 0], [0, 0, 1, 0], [0, 1, 0, 0], [0, 0, 0, 1]],
+    dtype=np.complex128,
+)
+
+
+def controlled_ry(theta: float) -> np.ndarray:
+    """Return the 4x4 controlled-RY gate; the first qubit is the control."""
+    c, s = np.cos(theta / 2), np.sin(theta / 2)
+    gate = np.eye(4, dtype=np.complex128)
+    gate[2:, 2:] = [[c, -s], [s, c]]
+    return gate
+
+
+class EntangledBrainState:
+    """Joint quantum-like state of the qubits of one or more brains.
+
+    Args:
+        num_qubits: Total number of qubits. The state starts as all zeros.
+        rng: Random stream used for sampling.
+        max_dense_qubits: Largest qubit count kept as a dense vector;
+            larger systems use the matrix-product-state representation.
+        max_bond: Maximum MPS bond dimension kept after a two-qubit gate.
+        cutoff: Singular values below ``cutoff`` times the largest one are
+            discarded when truncating MPS bonds.
+    """
+
+    def __init__(
+        self,
+        num_qubits: int,
+        rng: Optional[np.random.Generator] = None,
+        max_dense_qubits: int = DEFAULT_MAX_DENSE_QUBITS,
+        max_bond: int = 64,
+        cutoff: float = 1e-12,
+    ) -> None:
+        self.num_qubits = num_qubits
+        self.rng = rng if rng is not None else make_rng()
+        self.max_dense_qubits = max_dense_qubits
+        self.max_bond = max_bond
+        self.cutoff = cutoff
+        #: Qubit ranges belonging to each brain, in the order they were added.
+        self.agent_slices: List[slice] = [slice(0, num_qubits)]
+        zero = np.array([1.0, 0.0], dtype=np.complex128)
+        self._psi: Optional[np.ndarray] = None
+        self._tensors: Optional[List[np.ndarray]] = None
+        self._set_product([zero] * num_qubits)
+
+    @classmethod
+    def from_brains(cls, *brains: QubitBrainState, **kwargs) -> EntangledBrainState:
+        """Build the (initially unentangled) joint state of several brains.
+
+        Args:
+            *brains: Brain states whose qubits are concatenated in order.
+            **kwargs: Passed to the constructor.
+
+        Returns:
+            A product state over all qubits, with ``agent_slices`` mapping
+            each brain to its qubits.
+        """
+        vectors = [amp for brain in brains for amp in brain.amplitudes]
+        state = cls(len(vectors), **kwargs)
+        state._set_product(vectors)
+        slices, start = [], 0
+        for brain in brains:
+            n = brain.amplitudes.shape[0]
+            slices.append(slice(start, start + n))
+            start += n
+        state.agent_slices = slices
+        return state
+
+    @property
+    def backend(self) -> str:
+        """``"dense"`` or ``"mps"``."""
+        return "dense" if self._psi is not None else "mps"
+
+    def _set_product(self, vectors: Sequence[np.ndarray]) -> None:
+        vectors = [np.asarray(v, dtype=np.complex128) for v in vectors]
+        if self.num_qubits <= self.max_dense_qubits:
+            psi = np.ones((), dtype=np.complex128)
+            for v in vectors:
+                psi = np.multiply.outer(psi, v)
+            self._psi, self._tensors = psi, None
+        else:
+            self._psi, self._tensors = None, [v.reshape(1, 2, 1) for v in vectors]
+
+    def apply_gate(self, gate: np.ndarray, qubits: Optional[Sequence[int]] = None) -> None:
+        """Apply a 2x2 gate to each of ``qubits`` (all qubits by default)."""
+        qubits = range(self.num_qubits) if qubits is None else qubits
+        for q in qubits:
+            if self._psi is not None:
+                self._psi = np.moveaxis(np.tensordot(gate, self._psi, axes=([1], [q])), 0, q)
+            else:
+                self._tensors[q] = np.einsum("ij,ajb->aib", gate, self._tensors[q])
+
+    def apply_two_qubit_gate(self, gate: np.ndarray, q1: int, q2: int) -> None:
+        """Apply a 4x4 gate to qubits ``q1`` and ``q2``.
+
+        The gate acts on the basis ``|q1 q2>`` with ``q1`` as the most
+        significant bit. In the MPS representation non-adjacent qubits are
+        brought together with SWAP gates and moved back afterwards.
+        """
+        if q1 == q2:
+            raise ValueError("A two-qubit gate needs two distinct qubits.")
+        g = np.asarray(gate, dtype=np.complex128).reshape(2, 2, 2, 2)
+        if self._psi is not None:
+            out = np.tensordot(g, self._psi, axes=([2, 3], [q1, q2]))
+            self._psi = np.moveaxis(out, [0, 1], [q1, q2])
+            return
+        if q1 > q2:
+            q1, q2, g = q2, q1, g.transpose(1, 0, 3, 2)
+        # Move q2 next to q1, apply, then move it back.
+        for site in range(q2 - 1, q1, -1):
+            self._apply_adjacent(SWAP.reshape(2, 2, 2, 2), site)
+        self._apply_adjacent(g, q1)
+        for site in range(q1 + 1, q2):
+            self._apply_adjacent(SWAP.reshape(2, 2, 2, 2), site)
+
+    def _apply_adjacent(self, g: np.ndarray, site: int) -> None:
+        a, b = self._tensors[site], self._tensors[site + 1]
+        theta = np.einsum("aib,bjc->aijc", a, b)
+        theta = np.einsum("xyij,aijc->axyc", g, theta)
+        chi_l, chi_r = theta.shape[0], theta.shape[3]
+        u, s, vh = np.linalg.svd(theta.reshape(chi_l * 2, 2 * chi_r), full_matrices=False)
+        keep = int(np.count_nonzero(s > self.cutoff * s[0])) if s[0] > 0 else 1
+        keep = max(1, min(keep, self.max_bond))
+        u, s, vh = u[:, :keep], s[:keep], vh[:keep]
+        self._tensors[site] = u.reshape(chi_l, 2, keep)
+        self._tensors[site + 1] = (s[:, None] * vh).reshape(keep, 2, chi_r)
+
+    def entangle(self, q1: int, q2: int, strength: float) -> None:
+        """Correlate ``q2`` with ``q1`` through a controlled rotation.
+
+        Args:
+            q1: Control qubit.
+            q2: Target qubit.
+            strength: Rotation strength in ``[0, 1]``; 1 is a full
+                controlled flip, 0 leaves the state unchanged.
+        """
+        self.apply_two_qubit_gate(controlled_ry(np.pi * strength), q1, q2)
+
+    def _right_environments(self) -> List[np.ndarray]:
+        envs = [np.ones((1, 1), dtype=np.complex128)]
+        for a in reversed(self._tensors):
+            envs.append(np.einsum("asc,bsd,cd->ab", a, a.conj(), envs[-1]))
+        return envs[::-1]
+
+    def marginal_probabilities(self) -> np.ndarray:
+        """Return the ``(n, 2)`` per-qubit marginal probabilities."""
+        if self._psi is not None:
+            probs = np.abs(self._psi) ** 2
+            axes = tuple(range(self.num_qubits))
+            marginals = np.stack(
+                [probs.sum(axis=axes[:q] + axes[q + 1:]) for q in axes]
+            )
+        else:
+            right = self._right_environments()
+            left = np.ones((1, 1), dtype=np.complex128)
+            marginals = np.empty((self.num_qubits, 2))
+            for q, a in enumerate(self._tensors):
+                marginals[q] = np.einsum("ab,asc,bsd,cd->s", left, a, a.conj(), right[q + 1]).real
+                left = np.einsum("ab,asc,bsd->cd", left, a, a.conj())
+        return marginals / marginals.sum(axis=1, keepdims=True)
+
+    def measure(self, shots: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Sample all qubits jointly, preserving their correlations.
+
+        Args:
+            shots: Number of shots to draw in one vectorised call. If
+                omitted a single shot is drawn.
+
+        Returns:
+            A tuple ``(bits, probs)`` as for :meth:`QubitBrainState.measure`:
+            ``bits`` has shape ``(n,)`` or ``(shots, n)`` and ``probs`` holds
+            the per-qubit marginal probabilities.
+        """
+        count = 1 if shots is None else shots
+        n = self.num_qubits
+        if self._psi is not None:
+            p = (np.abs(self._psi) ** 2).ravel()
+            idx = self.rng.choice(p.size, size=count, p=p / p.sum())
+            bits = (idx[:, None] >> np.arange(n - 1, -1, -1)) & 1
+        else:
+            right = self._right_environments()
+            left = np.ones((count, 1), dtype=np.complex128)
+            bits = np.empty((count, n), dtype=int)
+            for q, a in enumerate(self._tensors):
+                branch = np.einsum("xa,asb->sxb", left, a)
+                weights = np.einsum("sxa,ab,sxb->sx", branch, right[q + 1], branch.conj()).real
+                p1 = weights[1] / weights.sum(axis=0)
+                bit = self.rng.random(count) < p1
+                bits[:, q] = bit
+                chosen = np.where(bit[:, None], branch[1], branch[0])
+                norms = np.sqrt(np.where(bit, weights[1], weights[0]))
+                left = chosen / norms[:, None]
+        bits = bits.astype(int)
+        return (bits[0] if shots is None else bits), self.marginal_probabilities()
+
+    def to_dense(self) -> np.ndarray:
+        """Return the full ``2**n`` state vector (qubit 0 most significant)."""
+        if self._psi is not None:
+            return self._psi.reshape(-1).copy()
+        psi = np.ones((1, 1), dtype=np.complex128)
+        for a in self._tensors:
+            psi = np.einsum("pa,asb->psb", psi, a).reshape(-1, a.shape[2])
+        return psi.reshape(-1)
+
+    def copy(self) -> EntangledBrainState:
+        """Return a copy with its own amplitudes, sharing the random stream."""
+        new = EntangledBrainState.__new__(EntangledBrainState)
+        new.__dict__.update(self.__dict__)
+        new.agent_slices = list(self.agent_slices)
+        if self._psi is not None:
+            new._psi = self._psi.copy()
+        else:
+            new._tensors = [t.copy() for t in self._tensors]
+        return new
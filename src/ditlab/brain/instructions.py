@@ -0,0 +1,202 @@
+"""Compilation of textual update instructions into numeric programs.
+
+The LLM describes brain updates in free text (for example ``"bias towards
+state 1"`` or ``"decohere"``). Rather than scanning that text on every
+step, :func:`compile_instruction` turns it once into an
+:class:`UpdateProgram`: a short sequence of per-qubit operations in which
+consecutive linear operations (scalings and gates) are fused into a single
+2x2 matrix. Compiled programs are kept in an LRU cache, so repeated
+instructions cost a dictionary lookup.
+
+Programs normally run on a freshly copied amplitude array. When given a
+:class:`Workspace` of preallocated scratch buffers they run entirely in
+place, which is how the compact brain avoids per-step allocations.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple, Union
+
+import numpy as np
+
+
+class Workspace:
+    """Preallocated scratch buffers for running programs in place.
+
+    Args:
+        shape: Shape of the amplitude array the buffers serve.
+        dtype: Complex dtype of the amplitudes; the real buffers use the
+            matching float precision.
+    """
+
+    __slots__ = ("real", "complex", "norms")
+
+    def __init__(self, shape: Tuple[int, ...], dtype: np.dtype) -> None:
+        real_dtype = np.finfo(dtype).dtype
+        self.real = np.empty(shape, dtype=real_dtype)
+        self.complex = np.empty(shape, dtype=dtype)
+        self.norms = np.empty(shape[:-1] + (1,), dtype=real_dtype)
+
+    def normalise(self, amps: np.ndarray) -> None:
+        """Renormalise every qubit of ``amps`` without allocating."""
+        np.abs(amps, out=self.real)
+        np.square(self.real, out=self.real)
+        np.sum(self.real, axis=-1, keepdims=True, out=self.norms)
+        np.sqrt(self.norms, out=self.norms)
+        amps /= self.norms
+
+
+@dataclass(frozen=True, eq=False)
+class LinearOp:
+    """A 2x2 operator applied to every qubit.
+
+    Attributes:
+        matrix: The operator, acting on the column vector of a qubit's
+            amplitudes.
+        unitary: Whether the operator preserves the norm, in which case no
+            renormalisation is needed afterwards.
+    """
+
+    matrix: np.ndarray
+    unitary: bool = False
+
+    @property
+    def is_diagonal(self) -> bool:
+        return self.matrix[0, 1] == 0 and self.matrix[1, 0] == 0
+
+    def then(self, other: LinearOp) -> LinearOp:
+        """Fuse this operator with ``other`` applied afterwards."""
+        return LinearOp(other.matrix @ self.matrix, self.unitary and other.unitary)
+
+    def apply(
+        self, amps: np.ndarray, rng: np.random.Generator, work: Optional[Workspace] = None
+    ) -> np.ndarray:
+        """Apply the operator in place where possible and return the result."""
+        if self.is_diagonal:
+            amps *= np.diagonal(self.matrix)
+            return amps
+        # Qubit amplitudes are row vectors, hence the transpose.
+        if work is None:
+            return amps @ self.matrix.T
+        np.matmul(amps, self.matrix.T, out=work.complex)
+        amps[...] = work.complex
+        return amps
+
+
+@dataclass(frozen=True)
+class NoiseOp:
+    """Uniform noise added equally to the real and imaginary parts.
+
+    Attributes:
+        scale: Width of the uniform noise distribution, centred on zero.
+    """
+
+    scale: float
+
+    def apply(
+        self, amps: np.ndarray, rng: np.random.Generator, work: Optional[Workspace] = None
+    ) -> np.ndarray:
+        if work is None:
+            noise = rng.random(amps.shape)
+        else:
+            noise = rng.random(dtype=work.real.dtype, out=work.real)
+        noise -= 0.5
+        noise *= self.scale
+        amps.real += noise
+        amps.imag += noise
+        return amps
+
+
+Op = Union[LinearOp, NoiseOp]
+
+_HADAMARD = np.array([[1, 1], [1, -1]], dtype=np.complex128) / np.sqrt(2)
+_FLIP = np.array([[0, 1], [1, 0]], dtype=np.complex128)
+
+# Keyword rules, applied in this order whenever the keyword occurs in the
+# lowercased instruction text.
+_RULES: List[Tuple[str, Callable[[], Op]]] = [
+    ("bias towards state 1", lambda: LinearOp(np.diag([1.0, 1.1]).astype(np.complex128))),
+    ("bias towards state 0", lambda: LinearOp(np.diag([1.1, 1.0]).astype(np.complex128))),
+    ("hadamard", lambda: LinearOp(_HADAMARD, unitary=True)),
+    ("flip", lambda: LinearOp(_FLIP, unitary=True)),
+    ("decohere", lambda: NoiseOp(0.1)),
+]
+
+
+@dataclass(frozen=True)
+class UpdateProgram:
+    """A compiled sequence of fused operations.
+
+    Attributes:
+        ops: The operations, in application order.
+        renormalise: Whether the qubits need renormalising afterwards.
+    """
+
+    ops: Tuple[Op, ...] = ()
+    renormalise: bool = False
+
+    @property
+    def is_noop(self) -> bool:
+        """Whether the program leaves the amplitudes unchanged."""
+        return not self.ops
+
+    def apply(
+        self, amps: np.ndarray, rng: np.random.Generator, work: Optional[Workspace] = None
+    ) -> np.ndarray:
+        """Run the program on ``amps``, mutating it where possible.
+
+        Args:
+            amps: Amplitude array with the basis state on the last axis.
+            rng: Random stream for stochastic operations such as noise.
+            work: Optional scratch buffers. When given, the program runs
+                fully in place without allocating.
+
+        Returns:
+            The updated amplitudes. This is ``amps`` itself unless a
+            non-diagonal gate forced a new array to be allocated, which
+            never happens when ``work`` is given.
+        """
+        for op in self.ops:
+            amps = op.apply(amps, rng, work)
+        if self.renormalise:
+            if work is None:
+                amps /= np.linalg.norm(amps, axis=-1, keepdims=True)
+            else:
+                work.normalise(amps)
+        return amps
+
+
+def _fuse(ops: List[Op]) -> Tuple[Op, ...]:
+    """Merge runs of consecutive linear operations into single matrices."""
+    fused: List[Op] = []
+    for op in ops:
+        if isinstance(op, LinearOp) and fused and isinstance(fused[-1], LinearOp):
+            fused[-1] = fused[-1].then(op)
+        else:
+            fused.append(op)
+    return tuple(fused)
+
+
+@lru_cache(maxsize=256)
+def compile_instruction(update_instruction: str) -> UpdateProgram:
+    """Compile a textual update instruction into an :class:`UpdateProgram`.
+
+    Results are memoised, so use ``compile_instruction.cache_info()`` to
+    inspect the hit rate and ``compile_instruction.cache_clear()`` to
+    reset it.
+
+    Args:
+        update_instruction: The instruction text, typically the
+            ``qubit_update`` field of an LLM response.
+
+    Returns:
+        The compiled program. Instructions that match no rule compile to
+        an empty, no-op program.
+    """
+    text = update_instruction.lower()
+    ops: List[Op] = [factory() for keyword, factory in _RULES if keyword in text]
+    renormalise = any(not (isinstance(op, LinearOp) and op.unitary) for op in ops)
+    return UpdateProgram(ops=_fuse(ops), renormalise=renormalise)
+
@@ -3,26 +3,191 @@
 This module contains functions to compute entropy and other summary
 statistics over the internal brain state. These metrics can be used
 to infer stress levels, integration levels, or overload conditions.
+
+:class:`MetricsEngine` evaluates several metrics at once and keeps
+rolling-window statistics for each of them over the last N steps.
 """
 
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
 import numpy as np
 from .qubits import QubitBrainState
+from .batched import BatchedBrainState
 
 
-def compute_entropy(state: QubitBrainState) -> float:
+def compute_entropy(state: Union[QubitBrainState, BatchedBrainState]) -> Union[float, np.ndarray]:
     """Compute a simple entropy metric for the brain state.
 
     The entropy is calculated as the sum of the Shannon entropy of each
     qubit’s probability distribution.
 
     Args:
-        state: The current brain state.
+        state: The current brain state, or a batch of brain states.
 
     Returns:
-        The total entropy across all qubits.
+        The total entropy across all qubits. For a batched state an array
+        of shape ``(batch,)`` with one entropy per brain is returned.
     """
-    probs = np.abs(state.amplitudes) ** 2
+    probs = state.probabilities()
     # Avoid log(0) by adding a small epsilon
     eps = 1e-12
-    entropy = -np.sum(probs * np.log2(probs + eps))
-    return float(entropy)
\ No newline at end of file
+    entropy = -np.sum(probs * np.log2(probs + eps), axis=(-2, -1))
+    if entropy.ndim == 0:
+        return float(entropy)
+    return entropy
+
+
+# A metric maps ``(probs, qubit_entropy)`` to one value per brain; the
+# leading (batch) axes of its result match those of ``qubit_entropy[..., 0]``.
+MetricFn = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+def _entropy(probs: np.ndarray, qubit_entropy: np.ndarray) -> np.ndarray:
+    return qubit_entropy.sum(axis=-1)
+
+
+def _purity(probs: np.ndarray, qubit_entropy: np.ndarray) -> np.ndarray:
+    # Mean over qubits of sum(p^2): 1 for definite qubits, 0.5 when maximally mixed.
+    return np.square(probs).sum(axis=-1).mean(axis=-1)
+
+
+def _bias(probs: np.ndarray, qubit_entropy: np.ndarray) -> np.ndarray:
+    # Per-qubit preference for 1 over 0, in [-1, 1].
+    return probs[..., 1] - probs[..., 0]
+
+
+def _overload(threshold: float) -> MetricFn:
+    def overload(probs: np.ndarray, qubit_entropy: np.ndarray) -> np.ndarray:
+        # Fraction of qubits whose entropy exceeds the threshold.
+        return (qubit_entropy > threshold).mean(axis=-1)
+
+    return overload
+
+
+class RollingWindow:
+    """Running mean and variance over the last ``size`` values.
+
+    Values may be scalars or arrays (for example one value per agent);
+    each push is O(1) regardless of the window size. The running sums are
+    recomputed exactly once per full window to stop rounding errors from
+    accumulating.
+
+    Args:
+        size: Number of most recent values to aggregate.
+    """
+
+    def __init__(self, size: int) -> None:
+        if size < 1:
+            raise ValueError("Window size must be at least 1.")
+        self.size = size
+        self.count = 0
+        self._pos = 0
+        self._values: Optional[np.ndarray] = None
+        self._sum: Optional[np.ndarray] = None
+        self._sumsq: Optional[np.ndarray] = None
+
+    def push(self, value: Union[float, np.ndarray]) -> None:
+        """Add a value, evicting the oldest one once the window is full."""
+        value = np.asarray(value, dtype=float)
+        if self._values is None:
+            self._values = np.zeros((self.size,) + value.shape)
+            self._sum = np.zeros(value.shape)
+            self._sumsq = np.zeros(value.shape)
+        if self.count == self.size:
+            old = self._values[self._pos]
+            self._sum -= old
+            self._sumsq -= old * old
+        else:
+            self.count += 1
+        self._values[self._pos] = value
+        self._sum += value
+        self._sumsq += value * value
+        self._pos = (self._pos + 1) % self.size
+        if self._pos == 0:
+            self._sum = self._values.sum(axis=0)
+            self._sumsq = np.square(self._values).sum(axis=0)
+
+    @property
+    def mean(self) -> np.ndarray:
+        """Mean of the values in the window."""
+        if not self.count:
+            raise ValueError("The window is empty.")
+        return self._sum / self.count
+
+    @property
+    def var(self) -> np.ndarray:
+        """Population variance of the values in the window."""
+        mean = self.mean
+        return np.maximum(self._sumsq / self.count - mean * mean, 0.0)
+
+
+class MetricsEngine:
+    """Compute all registered brain metrics in one vectorised pass.
+
+    Probabilities and per-qubit entropies are computed once per call and
+    shared by every metric. Each call to :meth:`update` also pushes the
+    values into a :class:`RollingWindow` per metric. Metrics work on a
+    single brain (scalar or per-qubit values) and on a batch (one value
+    per agent).
+
+    The default metrics are ``entropy`` (as :func:`compute_entropy`),
+    ``purity``, per-qubit ``bias`` and ``overload``, the fraction of
+    qubits whose entropy exceeds ``overload_threshold`` bits.
+
+    Args:
+        window: Number of steps in the rolling windows.
+        overload_threshold: Per-qubit entropy above which a qubit counts
+            as overloaded.
+    """
+
+    def __init__(self, window: int = 100, overload_threshold: float = 0.9) -> None:
+        self.window = window
+        self.metrics: Dict[str, MetricFn] = {
+            "entropy": _entropy,
+            "purity": _purity,
+            "bias": _bias,
+            "overload": _overload(overload_threshold),
+        }
+        self.windows: Dict[str, RollingWindow] = {}
+
+    def register(self, name: str, fn: MetricFn) -> None:
+        """Register an additional metric.
+
+        Args:
+            name: Name under which the metric is reported.
+            fn: Function of ``(probs, qubit_entropy)`` returning the metric
+                with the batch axes (if any) leading.
+        """
+        self.metrics[name] = fn
+
+    def compute(self, state: Any) -> Dict[str, np.ndarray]:
+        """Compute every registered metric without updating the windows.
+
+        Args:
+            state: A brain state exposing ``probabilities()`` (single,
+                batched or compact), or a raw amplitude array.
+
+        Returns:
+            A mapping from metric name to its value.
+        """
+        if isinstance(state, np.ndarray):
+            probs = np.abs(state) ** 2
+        else:
+            probs = state.probabilities()
+        eps = 1e-12
+        qubit_entropy = -np.sum(probs * np.log2(probs + eps), axis=-1)
+        return {name: fn(probs, qubit_entropy) for name, fn in self.metrics.items()}
+
+    def update(self, state: Any) -> Dict[str, np.ndarray]:
+        """Compute all metrics and push them into the rolling windows."""
+        values = self.compute(state)
+        for name, value in values.items():
+            window = self.windows.get(name)
+            if window is None:
+                window = self.windows[name] = RollingWindow(self.window)
+            window.push(value)
+        return values
+
+    def rolling(self) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """Return ``(mean, variance)`` over the window for every metric."""
+        return {name: (w.mean, w.var) for name, w in self.windows.items() if w.count}
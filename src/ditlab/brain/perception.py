@@ -6,23 +6,28 @@ environment looks like. These functions may also consider entropy or
 overload metrics to adjust the richness of the perception.
 """
 
-from typing import Dict
+from typing import Dict, Optional
+
+import numpy as np
 
 from .qubits import QubitBrainState
 
 
-def generate_perception(state: QubitBrainState) -> Dict[str, str]:
+def generate_perception(state: QubitBrainState, shots: Optional[int] = None) -> Dict[str, str]:
     """Generate a minimal perceived environment description from brain state.
 
     Args:
         state: The current brain state.
+        shots: Optional number of measurement shots. With several shots the
+            perception is based on the average number of qubits measured as
+            1, which is less noisy than a single shot.
 
     Returns:
         A dictionary describing the perceived environment.
     """
-    bits, probs = state.measure()
+    bits, probs = state.measure(shots=shots)
     # Simple heuristic: count the number of bits measured as 1
-    ones = bits.sum()
+    ones = np.rint(bits.sum(axis=-1).mean())
     if ones == 0:
         threat_level = "low"
         description = "calm and empty"
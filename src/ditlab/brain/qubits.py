@@ -4,13 +4,19 @@ This module defines a simple class to hold a collection of qubit-like
 states using complex amplitude vectors. It provides initialisation
 helpers and a measurement function that collapses the state into
 classical bits and returns measurement probabilities.
+
+Every brain draws from its own :class:`numpy.random.Generator` rather than
+the global NumPy state, so independent brains can be simulated in
+parallel and replayed exactly from a snapshot.
 """
 
 from __future__ import annotations
 
 import numpy as np
 from dataclasses import dataclass, field
-from typing import Any, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from ditlab.util.random_seed import make_rng
 
 
 @dataclass
@@ -20,41 +26,110 @@ class QubitBrainState:
     Each qubit is represented by a two-dimensional complex vector whose
     squared magnitudes sum to 1. Collectively, these vectors can be
     manipulated by high-level update rules before being measured.
+
+    The ``rng`` attribute is the brain's private random stream, used for
+    measurement and stochastic updates. It is part of the state: deep
+    copies (as taken by snapshots) capture its position in the stream.
+
+    Measurement probabilities are cached until ``amplitudes`` is
+    reassigned. Code that mutates the amplitude array in place must call
+    :meth:`invalidate` afterwards.
     """
 
     amplitudes: np.ndarray = field(default_factory=lambda: np.zeros((0, 2), dtype=np.complex128))
+    rng: np.random.Generator = field(default_factory=make_rng, repr=False, compare=False)
+    # (amplitude array, probabilities) pair for the probability cache
+    _probs_cache: Optional[Tuple[np.ndarray, np.ndarray]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     @classmethod
-    def init_random(cls, num_qubits: int) -> QubitBrainState:
+    def init_random(cls, num_qubits: int, rng: Optional[np.random.Generator] = None) -> QubitBrainState:
         """Initialise a brain state with random complex amplitudes.
 
         Args:
             num_qubits: Number of qubits in the state.
+            rng: Random stream for the new brain. A fresh stream from
+                :func:`~ditlab.util.random_seed.make_rng` is used if omitted.
 
         Returns:
             A new ``QubitBrainState`` with normalised random amplitudes.
         """
-        amps = np.random.rand(num_qubits, 2) + 1j * np.random.rand(num_qubits, 2)
+        rng = rng if rng is not None else make_rng()
+        amps = rng.random((num_qubits, 2)) + 1j * rng.random((num_qubits, 2))
         # Normalise each qubit
         norms = np.linalg.norm(amps, axis=1, keepdims=True)
         amps = amps / norms
-        return cls(amplitudes=amps)
+        return cls(amplitudes=amps, rng=rng)
 
-    def measure(self) -> Tuple[np.ndarray, np.ndarray]:
-        """Measure all qubits and return the resulting bits and probabilities.
+    def probabilities(self) -> np.ndarray:
+        """Return the measurement probabilities of every qubit.
 
-        Each qubit collapses to 0 or 1 with probability proportional to
-        the squared magnitude of the corresponding amplitude.
+        The result is cached until the amplitudes change and is marked
+        read-only, since it is shared between callers.
 
         Returns:
-            A tuple ``(bits, probs)`` where ``bits`` is a 1D array of
-            integers (0 or 1) and ``probs`` is the squared magnitude of
+            An array of shape ``(n, 2)`` with the squared magnitudes of
             the amplitudes.
         """
+        cache = self._probs_cache
+        if cache is not None and cache[0] is self.amplitudes:
+            return cache[1]
         probs = np.abs(self.amplitudes) ** 2  # shape (n,2)
-        bits = (np.random.rand(self.amplitudes.shape[0]) < probs[:, 1]).astype(int)
+        probs.flags.writeable = False
+        self._probs_cache = (self.amplitudes, probs)
+        return probs
+
+    def invalidate(self) -> None:
+        """Drop cached probabilities after an in-place amplitude change."""
+        self._probs_cache = None
+
+    def measure(self, shots: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Measure all qubits and return the resulting bits and probabilities.
+
+        Each qubit collapses to 0 or 1 with probability proportional to
+        the squared magnitude of the corresponding amplitude. Measuring
+        does not collapse the stored amplitudes, so repeated shots are
+        independent samples of the same state.
+
+        Args:
+            shots: Number of independent shots to draw in one vectorised
+                call. If omitted a single shot is drawn.
+
+        Returns:
+            A tuple ``(bits, probs)``. ``bits`` is a 1D array of integers
+            (0 or 1), or an array of shape ``(shots, n)`` if ``shots`` is
+            given. ``probs`` is the squared magnitude of the amplitudes.
+        """
+        probs = self.probabilities()
+        n = self.amplitudes.shape[0]
+        size = n if shots is None else (shots, n)
+        bits = (self.rng.random(size) < probs[:, 1]).astype(int)
         return bits, probs
 
+    def sample_counts(self, shots: int) -> Dict[str, int]:
+        """Measure ``shots`` times and return a histogram of bitstrings.
+
+        Args:
+            shots: Number of shots to draw.
+
+        Returns:
+            A mapping from bitstrings such as ``"0101"`` (qubit 0 first)
+            to the number of shots that produced them.
+        """
+        bits, _ = self.measure(shots=shots)
+        rows, counts = np.unique(bits, axis=0, return_counts=True)
+        return {"".join(map(str, row)): int(count) for row, count in zip(rows, counts)}
+
     def copy(self) -> QubitBrainState:
-        """Return a deep copy of the brain state."""
-        return QubitBrainState(amplitudes=self.amplitudes.copy())
\ No newline at end of file
+        """Return a copy of the brain state with its own amplitude array.
+
+        The copy shares the original's generator object, so it continues
+        the same sequence of draws. This is what an update step wants,
+        since the copy replaces the original, and creating a generator
+        would cost more than the rest of the step. A copy must therefore
+        not be kept and drawn from alongside its original: draws from
+        either advance both, and runs stop being reproducible. Use
+        :func:`copy.deepcopy` for an independent duplicate.
+        """
+        return QubitBrainState(amplitudes=self.amplitudes.copy(), rng=self.rng)
\ No newline at end of file
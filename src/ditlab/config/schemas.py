@@ -5,7 +5,7 @@ simulation laboratory. These configurations include parameters for the
 environment, brain, LLM settings, and lab controller.
 """
 
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from pydantic import BaseModel, Field
 
@@ -30,6 +30,38 @@ class BrainConfig(BaseModel):
         4,
         description="Number of qubits (superposition states) in the brain.",
     )
+    compact: bool = Field(
+        False,
+        description="Use the slotted, in-place CompactQubitBrainState.",
+    )
+    dtype: str = Field(
+        "complex64",
+        description="Complex dtype of the amplitudes when compact is enabled.",
+    )
+
+
+class PromptConfig(BaseModel):
+    """How prompts are encoded for the LLM."""
+
+    compact: bool = Field(
+        False,
+        description="Use minified keys, rounded probabilities and no indentation.",
+    )
+    precision: int = Field(
+        3,
+        ge=0,
+        description="Decimal places probabilities are rounded to in compact prompts.",
+    )
+    summary_threshold: int = Field(
+        8,
+        ge=0,
+        description="Above this many qubits, compact prompts give only P(1) per qubit.",
+    )
+    token_budget: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Maximum estimated size of a compact prompt in tokens.",
+    )
 
 
 class LLMConfig(BaseModel):
@@ -49,6 +81,40 @@ class LLMConfig(BaseModel):
         default_factory=dict,
         description="Any additional parameters passed to the LLM client.",
     )
+    prompt: PromptConfig = Field(
+        default_factory=PromptConfig,
+        description="Prompt encoding settings.",
+    )
+
+
+class CadenceConfig(BaseModel):
+    """When the controller calls the LLM; by default on every step.
+
+    The LLM is called when any of the configured conditions holds.
+    """
+
+    every_n: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Call the LLM at least once every this many steps.",
+    )
+    entropy_threshold: Optional[float] = Field(
+        None,
+        description="Call the LLM when the brain entropy (in bits) crosses this value.",
+    )
+    on_threat_distance_change: bool = Field(
+        False,
+        description="Call the LLM when the distance between agent and threat changes.",
+    )
+    min_bit_flips: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Call the LLM when at least this many measured bits flip.",
+    )
+    local_update: Optional[str] = Field(
+        None,
+        description="Update instruction for steps without an LLM call; repeats the last one if unset.",
+    )
 
 
 class LabConfig(BaseModel):
@@ -66,3 +132,19 @@ class LabConfig(BaseModel):
         default_factory=LLMConfig,
         description="LLM client configuration settings.",
     )
+    seed: Optional[int] = Field(
+        None,
+        description="Root seed for the run's random streams; random if unset.",
+    )
+    checkpoint_interval: Optional[int] = Field(
+        None,
+        ge=1,
+        description=(
+            "Keep a checkpoint every this many steps and rewind by replaying logged "
+            "LLM responses, instead of saving a snapshot every step."
+        ),
+    )
+    cadence: CadenceConfig = Field(
+        default_factory=CadenceConfig,
+        description="Policy deciding on which steps the LLM is called.",
+    )
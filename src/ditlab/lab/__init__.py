@@ -6,7 +6,51 @@ branching, and experiment definitions.
 """
 
 from .state import FullState, SnapshotManager  # noqa: F401
+from .snapshot_store import SnapshotStore  # noqa: F401
+from .timeline_tree import TimelineNode, TimelineTree  # noqa: F401
+from .replay import ReplayLog  # noqa: F401
+from .columnar import ColumnarTimeline  # noqa: F401
+from .profiling import StepProfiler  # noqa: F401
+from .cadence import (  # noqa: F401
+    AnyOf,
+    BitFlip,
+    CadencePolicy,
+    EntropyThreshold,
+    EveryN,
+    ThreatDistanceChange,
+)
 from .controller import SimulationController  # noqa: F401
+from .async_controller import AsyncSimulationController, run_concurrently  # noqa: F401
+from .pipeline import run_pipelined  # noqa: F401
 from .experiments import Experiment  # noqa: F401
+from .multiverse import Divergence, FanOut, Multiverse  # noqa: F401
+from .sweeps import SweepResult, SweepRunner, expand_grid, sample_random  # noqa: F401
 
-__all__ = ["FullState", "SnapshotManager", "SimulationController", "Experiment"]
\ No newline at end of file
+__all__ = [
+    "FullState",
+    "SnapshotManager",
+    "SnapshotStore",
+    "TimelineNode",
+    "TimelineTree",
+    "ReplayLog",
+    "ColumnarTimeline",
+    "StepProfiler",
+    "CadencePolicy",
+    "EveryN",
+    "EntropyThreshold",
+    "ThreatDistanceChange",
+    "BitFlip",
+    "AnyOf",
+    "SimulationController",
+    "AsyncSimulationController",
+    "run_concurrently",
+    "run_pipelined",
+    "Experiment",
+    "Divergence",
+    "FanOut",
+    "Multiverse",
+    "SweepResult",
+    "SweepRunner",
+    "expand_grid",
+    "sample_random",
+]
@@ -0,0 +1,121 @@
+"""Asynchronous simulation controller for many concurrent timelines.
+
+:meth:`SimulationController.step_once` blocks on the LLM call, so stepping
+200 agents means 200 serialised round-trips. :class:`AsyncSimulationController`
+awaits :meth:`LLMClientBase.acall` instead, and :func:`run_concurrently`
+steps many controllers on one event loop with a shared bound on the
+number of LLM calls in flight. Each controller still runs its own steps
+in order, and the CPU stages (environment, measurement, update and
+snapshot) run on the loop between awaits.
+"""
+
+import asyncio
+from contextlib import nullcontext
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from ditlab.env.base import EnvironmentState
+from ditlab.lab.controller import SimulationController
+
+# Per-controller actions for ``run_concurrently``: one action for all
+# steps, or one iterable of actions per controller.
+ActionsSpec = Union[None, str, Sequence[Optional[Iterable[Any]]]]
+
+
+class AsyncSimulationController(SimulationController):
+    """A :class:`SimulationController` whose steps await the LLM.
+
+    The constructor is the same as for :class:`SimulationController`.
+    If a step is cancelled while waiting for the LLM, the controller is
+    restored to the state before that step, so a cancelled run stops
+    cleanly at a step boundary.
+    """
+
+    async def astep_once(
+        self, action: Any = None, limiter: Optional[asyncio.Semaphore] = None
+    ) -> Tuple[EnvironmentState, Dict[str, Any]]:
+        """Advance the simulation by one time step, awaiting the LLM.
+
+        Args:
+            action: Optional action for the agent to take in the environment.
+            limiter: Semaphore bounding concurrent LLM calls, usually shared
+                between controllers.
+
+        Returns:
+            A tuple ``(env_state, perceived_env)`` as for :meth:`step_once`.
+        """
+        rollback = self._rollback_point()
+        uses_prompt = getattr(self.llm, "uses_prompt", True)
+        env_state, brain_summary = self._begin_step(action, summarise=uses_prompt)
+        if brain_summary is None:
+            return env_state, self._local_step(env_state)
+        prompt = self._build_prompt(env_state, brain_summary, uses_prompt)
+        try:
+            async with limiter if limiter is not None else nullcontext():
+                with self.profiler.phase("llm_call"):
+                    llm_response = await self.llm.acall(prompt)
+        except asyncio.CancelledError:
+            self._roll_back(rollback)
+            raise
+        self.profiler.record_tokens(prompt, llm_response)
+        perceived_env = self._finish_step(env_state, llm_response)
+        return env_state, perceived_env
+
+    async def arun(
+        self,
+        n_steps: int,
+        actions: Union[None, str, Iterable[Any]] = None,
+        limiter: Optional[asyncio.Semaphore] = None,
+    ) -> Tuple[Optional[EnvironmentState], Dict[str, Any]]:
+        """Run ``n_steps`` steps in order; see :meth:`SimulationController.run`.
+
+        Returns:
+            The ``(env_state, perceived_env)`` of the last step, or
+            ``(None, {})`` if no step was run.
+        """
+        if actions is None or isinstance(actions, str):
+            actions = [actions] * n_steps
+        result: Tuple[Optional[EnvironmentState], Dict[str, Any]] = (None, {})
+        for _, action in zip(range(n_steps), actions):
+            result = await self.astep_once(action, limiter=limiter)
+        return result
+
+
+async def run_concurrently(
+    controllers: Sequence[AsyncSimulationController],
+    n_steps: int,
+    actions: ActionsSpec = None,
+    max_concurrency: Optional[int] = 32,
+) -> List[Tuple[Optional[EnvironmentState], Dict[str, Any]]]:
+    """Step many controllers concurrently on the running event loop.
+
+    If any controller fails, or the caller is cancelled, the remaining
+    controllers are cancelled too and each is left at a step boundary.
+
+    Args:
+        controllers: The controllers to run.
+        n_steps: Number of steps for each controller.
+        actions: ``None`` or one action for every step of every controller,
+            or a sequence with the actions of each controller.
+        max_concurrency: Maximum number of LLM calls in flight across all
+            controllers; ``None`` for no limit.
+
+    Returns:
+        The last ``(env_state, perceived_env)`` of each controller, in the
+        order of ``controllers``.
+    """
+    limiter = asyncio.Semaphore(max_concurrency) if max_concurrency is not None else None
+    if actions is None or isinstance(actions, str):
+        per_controller = [actions] * len(controllers)
+    else:
+        per_controller = list(actions)
+    tasks = [
+        asyncio.ensure_future(controller.arun(n_steps, controller_actions, limiter=limiter))
+        for controller, controller_actions in zip(controllers, per_controller)
+    ]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -0,0 +1,159 @@
+"""Policies deciding on which steps the controller calls the LLM.
+
+The LLM call is by far the most expensive stage of a step. A cadence
+policy lets the controller call it only every N steps or when something
+noteworthy happens: the brain's entropy crosses a threshold, the distance
+to the threat changes, or measured bits flip. On the other steps the
+brain evolves with local dynamics and the last perceived environment is
+reused.
+
+Policies see every step through :meth:`CadencePolicy.should_call`, so
+event policies can compare against the previous step. They can be
+combined with :class:`AnyOf`, and :func:`build_cadence` builds the policy
+described by a :class:`~ditlab.config.schemas.CadenceConfig`.
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+
+
+@dataclass
+class StepContext:
+    """What a cadence policy sees of a step before the LLM would be called.
+
+    Attributes:
+        time_step: The step being run.
+        env_state: Environment state after the environment step.
+        bits: Bits measured from the brain on this step.
+        probs: The brain's measurement probabilities.
+        steps_since_call: Steps since the last LLM call, or ``None`` if
+            the LLM has not been called yet.
+    """
+
+    time_step: int
+    env_state: Any
+    bits: np.ndarray
+    probs: np.ndarray
+    steps_since_call: Optional[int]
+
+
+class CadencePolicy(ABC):
+    """Decides, step by step, whether to call the LLM."""
+
+    @abstractmethod
+    def should_call(self, ctx: StepContext) -> bool:
+        """Observe a step and return whether the LLM should be called."""
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """Forget previous observations, e.g. after a rewind."""
+
+
+class EveryN(CadencePolicy):
+    """Call the LLM once every ``n`` steps."""
+
+    def __init__(self, n: int) -> None:
+        if n < 1:
+            raise ValueError("n must be at least 1.")
+        self.n = n
+
+    def should_call(self, ctx: StepContext) -> bool:
+        return ctx.steps_since_call is None or ctx.steps_since_call >= self.n
+
+
+class EntropyThreshold(CadencePolicy):
+    """Call the LLM when the brain's entropy crosses ``threshold`` bits.
+
+    For a batched brain a crossing by any member counts.
+    """
+
+    def __init__(self, threshold: float) -> None:
+        self.threshold = threshold
+        self._above: Optional[np.ndarray] = None
+
+    def should_call(self, ctx: StepContext) -> bool:
+        probs = ctx.probs
+        entropy = -np.sum(probs * np.log2(probs + 1e-12), axis=(-2, -1))
+        above = np.asarray(entropy > self.threshold)
+        crossed = self._above is not None and bool(np.any(above != self._above))
+        self._above = above
+        return crossed
+
+    def reset(self) -> None:
+        self._above = None
+
+
+class ThreatDistanceChange(CadencePolicy):
+    """Call the LLM when the distance between agent and threat changes."""
+
+    def __init__(self) -> None:
+        self._distance: Optional[Any] = None
+
+    def should_call(self, ctx: StepContext) -> bool:
+        env = ctx.env_state
+        distance = abs(env.agent_position - env.threat_position)
+        changed = self._distance is not None and distance != self._distance
+        self._distance = distance
+        return changed
+
+    def reset(self) -> None:
+        self._distance = None
+
+
+class BitFlip(CadencePolicy):
+    """Call the LLM when at least ``min_flips`` measured bits flip."""
+
+    def __init__(self, min_flips: int = 1) -> None:
+        self.min_flips = min_flips
+        self._bits: Optional[np.ndarray] = None
+
+    def should_call(self, ctx: StepContext) -> bool:
+        bits = np.asarray(ctx.bits)
+        flipped = self._bits is not None and int(np.count_nonzero(bits != self._bits)) >= self.min_flips
+        self._bits = bits.copy()
+        return flipped
+
+    def reset(self) -> None:
+        self._bits = None
+
+
+class AnyOf(CadencePolicy):
+    """Call the LLM when any of several policies asks for it.
+
+    Every policy observes every step, so none misses a change.
+    """
+
+    def __init__(self, *policies: CadencePolicy) -> None:
+        self.policies = policies
+
+    def should_call(self, ctx: StepContext) -> bool:
+        decisions = [policy.should_call(ctx) for policy in self.policies]
+        return any(decisions)
+
+    def reset(self) -> None:
+        for policy in self.policies:
+            policy.reset()
+
+
+def build_cadence(config: Any) -> Optional[CadencePolicy]:
+    """Build the policy described by a ``CadenceConfig``.
+
+    Returns:
+        The policy, or ``None`` if the config asks for an LLM call on
+        every step.
+    """
+    policies = []
+    if config.every_n is not None:
+        policies.append(EveryN(config.every_n))
+    if config.entropy_threshold is not None:
+        policies.append(EntropyThreshold(config.entropy_threshold))
+    if config.on_threat_distance_change:
+        policies.append(ThreatDistanceChange())
+    if config.min_bit_flips is not None:
+        policies.append(BitFlip(config.min_bit_flips))
+    if not policies or (config.every_n == 1 and len(policies) == 1):
+        return None
+    return policies[0] if len(policies) == 1 else AnyOf(*policies)
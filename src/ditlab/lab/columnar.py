@@ -0,0 +1,179 @@
+"""Columnar, array-backed timeline for analytics over history.
+
+Snapshots are stored one object per step, so questions such as "entropy
+over time" or "threat distance histogram" would walk Python objects one
+step at a time. :class:`ColumnarTimeline` instead keeps one growable
+numpy array per field: the time step, every numeric attribute of the
+environment state (for :class:`Simple1DEnvironment` these are
+``agent_position``, ``threat_position``, ``light_level`` and so on) and
+the stacked amplitude tensor of the brain. Columns are exposed as views
+without copying, so they can be handed straight to
+:class:`~ditlab.brain.metrics.MetricsEngine` or to plotting code.
+"""
+
+from __future__ import annotations
+
+from numbers import Integral, Real
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from ditlab.brain.metrics import MetricsEngine
+
+
+def _numeric_fields(env_state: Any) -> Dict[str, Any]:
+    # Booleans and numbers only; other attributes stay in the snapshots.
+    values = getattr(env_state, "__dict__", {})
+    fields = {}
+    for name, value in values.items():
+        if isinstance(value, (bool, np.bool_)):
+            fields[name] = np.bool_
+        elif isinstance(value, Integral):
+            fields[name] = np.int64
+        elif isinstance(value, Real):
+            fields[name] = np.float64
+    return fields
+
+
+class ColumnarTimeline:
+    """Append-only timeline stored as one numpy array per field.
+
+    The environment columns are inferred from the first appended state.
+    Arrays grow geometrically, so appending is amortised O(1).
+
+    Args:
+        capacity: Initial number of rows to allocate.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self._capacity = max(1, capacity)
+        self._length = 0
+        self._columns: Dict[str, np.ndarray] = {}
+        self._env_fields: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def fields(self) -> List[str]:
+        """Names of all columns, including ``amplitudes``."""
+        return list(self._columns)
+
+    def __getitem__(self, key: Any) -> Any:
+        """Return a column by name, or a dict of column views for a slice."""
+        if isinstance(key, str):
+            return self.column(key)
+        return {name: self.column(name)[key] for name in self._columns}
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a read-only view of the filled part of a column.
+
+        The view shares memory with the timeline but does not see rows
+        appended after it was taken.
+        """
+        view = self._columns[name][: self._length]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def time_step(self) -> np.ndarray:
+        return self.column("time_step")
+
+    @property
+    def amplitudes(self) -> np.ndarray:
+        """The ``(steps, ...)`` amplitude tensor."""
+        return self.column("amplitudes")
+
+    def _allocate(self, env_state: Any, amps: np.ndarray) -> None:
+        self._env_fields = _numeric_fields(env_state)
+        self._columns["time_step"] = np.empty(self._capacity, dtype=np.int64)
+        for name, dtype in self._env_fields.items():
+            self._columns[name] = np.empty(self._capacity, dtype=dtype)
+        self._columns["amplitudes"] = np.empty((self._capacity,) + amps.shape, dtype=amps.dtype)
+
+    def _grow(self) -> None:
+        self._capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.empty((self._capacity,) + column.shape[1:], dtype=column.dtype)
+            grown[: self._length] = column[: self._length]
+            self._columns[name] = grown
+
+    def append(self, env_state: Any, brain_state: Any, time_step: int) -> None:
+        """Copy one step into the columns.
+
+        Args:
+            env_state: Environment state; its numeric attributes are stored.
+            brain_state: Brain state exposing ``amplitudes``.
+            time_step: The simulation time step.
+        """
+        amps = np.asarray(brain_state.amplitudes)
+        if not self._columns:
+            self._allocate(env_state, amps)
+        elif amps.shape != self._columns["amplitudes"].shape[1:]:
+            raise ValueError("Amplitude shape differs from earlier steps in the timeline.")
+        if self._length == self._capacity:
+            self._grow()
+        row = self._length
+        self._columns["time_step"][row] = time_step
+        for name in self._env_fields:
+            self._columns[name][row] = getattr(env_state, name)
+        self._columns["amplitudes"][row] = amps
+        self._length += 1
+
+    def truncate(self, length: int) -> None:
+        """Drop every row from ``length`` on; the storage is kept."""
+        self._length = min(self._length, max(0, length))
+
+    def extend(self, states: Iterable[Tuple[Any, Any, int]]) -> None:
+        """Append ``(env_state, brain_state, time_step)`` triples."""
+        for env_state, brain_state, time_step in states:
+            self.append(env_state, brain_state, time_step)
+
+    @classmethod
+    def from_snapshots(cls, snapshots: Any, node_id: Optional[int] = None) -> ColumnarTimeline:
+        """Build a timeline from the path to a node of a snapshot manager.
+
+        Args:
+            snapshots: A :class:`~ditlab.lab.state.SnapshotManager`.
+            node_id: Last node of the timeline; defaults to the head.
+
+        Returns:
+            A new timeline holding every snapshot from the root to the node.
+        """
+        path = snapshots.path(node_id)
+        timeline = cls(capacity=len(path) or 1)
+        for node in path:
+            state = snapshots.state(node.node_id)
+            timeline.append(state.env_state, state.brain_state, state.time_step)
+        return timeline
+
+    def probabilities(self) -> np.ndarray:
+        """Return the ``(steps, ...)`` measurement probabilities."""
+        return np.abs(self.amplitudes) ** 2
+
+    def metrics(self, engine: Optional[MetricsEngine] = None) -> Dict[str, np.ndarray]:
+        """Evaluate brain metrics for every step in one vectorised call.
+
+        Args:
+            engine: Metrics engine to use; a default one if omitted.
+
+        Returns:
+            A mapping from metric name to an array with one row per step.
+        """
+        engine = engine if engine is not None else MetricsEngine()
+        return engine.compute(self.amplitudes)
+
+    def entropy(self) -> np.ndarray:
+        """Total brain entropy at every step, as :func:`compute_entropy`."""
+        probs = self.probabilities()
+        eps = 1e-12
+        return -np.sum(probs * np.log2(probs + eps), axis=(-2, -1))
+
+    def threat_distance(self) -> np.ndarray:
+        """Absolute distance between agent and threat at every step."""
+        return np.abs(self.column("agent_position") - self.column("threat_position"))
+
+    def histogram(self, name: str, bins: Any = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``np.histogram`` of a column or of ``threat_distance``."""
+        values = self.threat_distance() if name == "threat_distance" else self.column(name)
+        return np.histogram(values, bins=bins)
@@ -6,26 +6,104 @@ simulation step by step. It uses the functions in the ``brain`` and
 ``llm`` modules to update the state and produce perceptions.
 """
 
-from typing import Tuple, Dict, Any
+from collections import OrderedDict
+from copy import deepcopy
+from itertools import repeat
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple, Union
+
+import numpy as np
 
 from ditlab.env.base import BaseEnvironment, EnvironmentState
 from ditlab.brain.qubits import QubitBrainState
+from ditlab.brain.batched import BatchedBrainState
 from ditlab.brain.dynamics import apply_qubit_update
 from ditlab.brain.perception import generate_perception
 from ditlab.llm.client_base import LLMClientBase
-from ditlab.llm.prompts import build_prompt, parse_response
-from ditlab.lab.state import SnapshotManager
+from ditlab.llm.prompts import PromptOptions, build_prompt, parse_response
+from ditlab.lab.cadence import CadencePolicy, StepContext
+from ditlab.lab.columnar import ColumnarTimeline
+from ditlab.lab.profiling import NULL_PROFILER, NullProfiler, StepProfiler
+from ditlab.lab.replay import ReplayLog
+from ditlab.lab.state import FullState, SnapshotManager
+from ditlab.util.random_seed import make_rng, spawn_rng
+
+# Called as ``hook(controller, env_state, perceived_env)`` by ``run``.
+StepHook = Callable[["SimulationController", EnvironmentState, Dict[str, Any]], None]
+
+# Number of distinct LLM responses whose parse result is kept, in LRU order.
+_PARSE_CACHE_SIZE = 1024
 
 
 class SimulationController:
-    """Coordinates a simulation of environment, brain, and LLM."""
+    """Coordinates a simulation of environment, brain, and LLM.
+
+    The brain may be a single :class:`QubitBrainState` or a
+    :class:`BatchedBrainState`; in the latter case the whole population is
+    measured and updated in one vectorised call per step.
+
+    The controller owns a random stream, ``rng``, from which the snapshot
+    manager and any branches derive their own independent streams.
+
+    With ``checkpoint_interval`` set, the controller stops saving a
+    snapshot every step. It instead keeps a :class:`ReplayLog` with a
+    checkpoint every ``checkpoint_interval`` steps and the raw LLM
+    response of every step, and :meth:`rewind_to` rebuilds any earlier
+    step by replaying the log from the nearest checkpoint. Replay is exact
+    only if the environment's dynamics depend on nothing but
+    ``env.state`` and the action, which holds for the bundled
+    environments.
+
+    With ``columnar`` set, every step is also appended to a
+    :class:`ColumnarTimeline`, ``columns``, for vectorised analytics.
+
+    Pass a :class:`StepProfiler` as ``profiler`` to record per-phase
+    latencies, allocations and token sizes of every step; the default
+    profiler does nothing.
+
+    A ``cadence`` policy (see :mod:`ditlab.lab.cadence`) limits the LLM
+    calls to the steps it selects; the first step always calls the LLM.
+    On the other steps the brain evolves with ``local_update``, or with
+    the last instruction from the LLM if that is ``None``, and the last
+    perceived environment is reused.
+
+    ``prompt_options`` selects the prompt encoding, e.g. a compact one
+    with a token budget (see :class:`~ditlab.llm.prompts.PromptOptions`).
+    """
 
-    def __init__(self, env: BaseEnvironment, brain: QubitBrainState, llm: LLMClientBase) -> None:
+    def __init__(
+        self,
+        env: BaseEnvironment,
+        brain: Union[QubitBrainState, BatchedBrainState],
+        llm: LLMClientBase,
+        rng: Optional[np.random.Generator] = None,
+        snapshots: Optional[SnapshotManager] = None,
+        checkpoint_interval: Optional[int] = None,
+        columnar: bool = False,
+        profiler: Union[StepProfiler, NullProfiler] = NULL_PROFILER,
+        cadence: Optional[CadencePolicy] = None,
+        local_update: Optional[str] = None,
+        prompt_options: Optional[PromptOptions] = None,
+    ) -> None:
         self.env = env
         self.brain = brain
         self.llm = llm
         self.time_step = 0
-        self.snapshots = SnapshotManager()
+        self.rng = rng if rng is not None else make_rng()
+        # Pass a SnapshotManager to configure keyframes and the memory budget
+        self.snapshots = snapshots if snapshots is not None else SnapshotManager(rng=spawn_rng(self.rng))
+        self.replay = ReplayLog(checkpoint_interval) if checkpoint_interval is not None else None
+        self._pending_action: Any = None
+        self.columns = ColumnarTimeline() if columnar else None
+        self.profiler = profiler
+        # Parsed responses keyed by their raw text; clients often repeat them.
+        self._parsed: "OrderedDict[str, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+        self.cadence = cadence
+        self.local_update = local_update
+        self.llm_calls = 0
+        self._last_call_step: Optional[int] = None
+        self._last_instruction = ""
+        self._last_perceived: Dict[str, Any] = {}
+        self.prompt_options = prompt_options
 
     def step_once(self, action: Any = None) -> Tuple[EnvironmentState, Dict[str, Any]]:
         """Advance the simulation by one time step.
@@ -37,32 +115,285 @@ class SimulationController:
             A tuple ``(env_state, perceived_env)`` where ``env_state`` is
             the true state of the environment after stepping, and
             ``perceived_env`` is the brain's perceived environment as
-            produced by the LLM.
+            produced by the LLM. Each step returns its own dictionary.
+        """
+        uses_prompt = getattr(self.llm, "uses_prompt", True)
+        env_state, brain_summary = self._begin_step(action, summarise=uses_prompt)
+        if brain_summary is None:
+            return env_state, self._local_step(env_state)
+        prompt = self._build_prompt(env_state, brain_summary, uses_prompt)
+        with self.profiler.phase("llm_call"):
+            llm_response = self.llm(prompt)
+        self.profiler.record_tokens(prompt, llm_response)
+        perceived_env = self._finish_step(env_state, llm_response)
+        return env_state, perceived_env
+
+    def run(
+        self,
+        n_steps: int,
+        actions: Union[None, str, Iterable[Any]] = None,
+        hooks: Sequence[StepHook] = (),
+        hook_every: int = 1,
+        snapshot_every: int = 1,
+    ) -> Tuple[Optional[EnvironmentState], Dict[str, Any]]:
+        """Run ``n_steps`` steps in a tight loop, for headless runs.
+
+        Each step goes through the same stages as :meth:`step_once`, so a
+        run is reproducible step for step. The prompt is only built if the
+        LLM client uses it (see :attr:`LLMClientBase.uses_prompt`).
+
+        The stages are not batched across steps: every measurement draws
+        from the brain left by the previous update, and every update waits
+        for that step's response. The savings over calling
+        :meth:`step_once` in a loop come from skipping the prompt and
+        from thinning snapshots with ``snapshot_every``; with a fake LLM
+        that is roughly 2.5x with a snapshot per step and 6x with one
+        every 100 steps.
+
+        Args:
+            n_steps: Number of steps to run.
+            actions: ``None`` to stay in place, one action for every step,
+                or an iterable with one action per step. The run stops
+                early if the iterable is exhausted.
+            hooks: Callables ``hook(controller, env_state, perceived_env)``
+                invoked after every ``hook_every``-th step.
+            hook_every: Number of steps between hook calls.
+            snapshot_every: Save a snapshot only every this many steps and
+                after the last step run. Saving snapshots is the
+                most expensive stage of a step, so long headless runs can
+                raise this to trade rewind granularity for throughput.
+                Has no effect with ``checkpoint_interval``, where every
+                step is logged.
+
+        Returns:
+            The ``(env_state, perceived_env)`` of the last step, or
+            ``(None, {})`` if no step was run.
+        """
+        if actions is None or isinstance(actions, str):
+            actions = repeat(actions, n_steps)
+        uses_prompt = getattr(self.llm, "uses_prompt", True)
+        env_state, perceived_env = None, {}
+        snapshot = True
+        for i, action in zip(range(n_steps), actions):
+            env_state, brain_summary = self._begin_step(action, summarise=uses_prompt)
+            snapshot = (i + 1) % snapshot_every == 0 or i == n_steps - 1
+            if brain_summary is None:
+                perceived_env = self._local_step(env_state, snapshot=snapshot)
+            else:
+                prompt = self._build_prompt(env_state, brain_summary, uses_prompt)
+                with self.profiler.phase("llm_call"):
+                    llm_response = self.llm(prompt)
+                self.profiler.record_tokens(prompt, llm_response)
+                perceived_env = self._finish_step(env_state, llm_response, snapshot=snapshot)
+            if hooks and (i + 1) % hook_every == 0:
+                for hook in hooks:
+                    hook(self, env_state, perceived_env)
+        if not snapshot and self.replay is None:
+            # The actions ran out before a scheduled snapshot.
+            self.snapshots.save(env_state, self.brain, self.time_step - 1)
+        return env_state, perceived_env
+
+    def _begin_step(
+        self,
+        action: Any,
+        summarise: bool = True,
+        consult_cadence: bool = True,
+        stepped_env: Optional[BaseEnvironment] = None,
+        replaying: bool = False,
+    ) -> Tuple[EnvironmentState, Optional[Dict[str, Any]]]:
+        """Run the stages before the LLM call: environment and measurement.
+
+        Args:
+            stepped_env: A copy of the environment that has already taken
+                ``action``, e.g. speculatively while the previous step
+                waited for the LLM. Its state is copied into ``env``
+                instead of stepping ``env`` again.
+            replaying: The step is replayed by :meth:`rewind_to`; it is
+                not profiled.
+
+        Returns:
+            The environment state and the brain summary for the prompt.
+            The summary is ``None`` if the cadence policy skips the LLM on
+            this step.
         """
+        action = action if action is not None else "stay"
+        profiler = NULL_PROFILER if replaying else self.profiler
+        if self.replay is not None:
+            self._pending_action = action
+            if self.replay.needs_checkpoint(self.time_step):
+                self.replay.checkpoint(self.env.state, self.brain, self.time_step)
+
         # 1. Update environment according to action
-        env_state = self.env.step(action if action is not None else "stay")
+        with profiler.phase("env_step"):
+            if stepped_env is None:
+                env_state = self.env.step(action)
+            else:
+                self.env.state = env_state = stepped_env.state
 
         # 2. Summarise brain state for the prompt
-        bits, probs = self.brain.measure()
+        with profiler.phase("measure"):
+            bits, probs = self.brain.measure()
+        if consult_cadence and self.cadence is not None:
+            # The policy observes every step; the first step always calls.
+            first = self._last_call_step is None
+            steps_since_call = None if first else self.time_step - self._last_call_step
+            ctx = StepContext(self.time_step, env_state, bits, probs, steps_since_call)
+            if not self.cadence.should_call(ctx) and not first:
+                return env_state, None
+        if not summarise:
+            return env_state, {}
         brain_summary = {
             "measured_bits": bits.tolist(),
             "probabilities": probs.tolist(),
         }
+        return env_state, brain_summary
+
+    def _build_prompt(self, env_state: EnvironmentState, brain_summary: Dict[str, Any], uses_prompt: bool) -> str:
+        if not uses_prompt:
+            return ""
+        with self.profiler.phase("build_prompt"):
+            return build_prompt(env_state.to_dict(), brain_summary, self.prompt_options)
 
-        # 3. Build and send prompt to the LLM
-        prompt = build_prompt(env_state.to_dict(), brain_summary)
-        llm_response = self.llm(prompt)
+    def _finish_step(
+        self, env_state: EnvironmentState, llm_response: str, replaying: bool = False, snapshot: bool = True
+    ) -> Dict[str, Any]:
+        """Run the stages after the LLM call and return the perception."""
+        # 3. Parse LLM response
+        profiler = NULL_PROFILER if replaying else self.profiler
+        with profiler.phase("parse_response"):
+            parsed = self._parsed.get(llm_response)
+            if parsed is None:
+                response_dict = parse_response(llm_response)
+                parsed = (response_dict.get("qubit_update", ""), response_dict.get("perceived_environment", {}))
+                self._parsed[llm_response] = parsed
+                if len(self._parsed) > _PARSE_CACHE_SIZE:
+                    self._parsed.popitem(last=False)
+            else:
+                self._parsed.move_to_end(llm_response)
+        # The cached perception stays pristine; callers get their own copy.
+        update_instr, self._last_perceived = parsed
+        perceived_env = deepcopy(self._last_perceived)
+        self._last_instruction = update_instr
+        self._last_call_step = self.time_step
+        if not replaying:
+            self.llm_calls += 1
+        return self._complete_step(env_state, update_instr, perceived_env, llm_response, replaying, snapshot)
 
-        # 4. Parse LLM response
-        response_dict = parse_response(llm_response)
-        update_instr = response_dict.get("qubit_update", "")
-        perceived_env = response_dict.get("perceived_environment", {})
+    def _local_step(
+        self, env_state: EnvironmentState, replaying: bool = False, snapshot: bool = True
+    ) -> Dict[str, Any]:
+        """Finish a step the cadence policy skipped, without the LLM."""
+        instruction = self.local_update if self.local_update is not None else self._last_instruction
+        perceived_env = deepcopy(self._last_perceived)
+        return self._complete_step(env_state, instruction, perceived_env, None, replaying, snapshot)
 
-        # 5. Apply update to brain state
-        self.brain = apply_qubit_update(self.brain, update_instr)
+    def _complete_step(
+        self,
+        env_state: EnvironmentState,
+        update_instr: str,
+        perceived_env: Dict[str, Any],
+        llm_response: Optional[str],
+        replaying: bool,
+        snapshot: bool,
+    ) -> Dict[str, Any]:
+        # 4. Apply update to brain state; replayed steps are not profiled
+        profiler = NULL_PROFILER if replaying else self.profiler
+        with profiler.phase("apply_update"):
+            self.brain = apply_qubit_update(self.brain, update_instr)
 
-        # 6. Save snapshot
-        self.snapshots.save(env_state, self.brain, self.time_step)
+        # 5. Log the step for replay, or save a full snapshot
+        with profiler.phase("snapshot"):
+            if self.replay is not None:
+                if not replaying:
+                    self.replay.record(self.time_step, self._pending_action, llm_response)
+            elif snapshot:
+                self.snapshots.save(env_state, self.brain, self.time_step)
+            if self.columns is not None and not replaying:
+                # After a rewind the new steps replace the old continuation.
+                self.columns.truncate(self.time_step)
+                self.columns.append(env_state, self.brain, self.time_step)
+        profiler.end_step(self.time_step)
         self.time_step += 1
+        return perceived_env
+
+    def rewind_to(self, step: int) -> FullState:
+        """Restore the state at the start of ``step`` by replaying the log.
 
-        return env_state, perceived_env
\ No newline at end of file
+        The nearest checkpoint at or before ``step`` is restored and the
+        logged steps after it are re-run with their recorded actions and
+        LLM responses; the LLM is not called. The brain's random stream is
+        part of each checkpoint, so the replayed steps reproduce the
+        original ones exactly.
+
+        Args:
+            step: Time step to return to, between 0 and the number of
+                logged steps. Steps after it stay in the log until a new
+                step overwrites them, so one can also rewind forwards.
+
+        Returns:
+            The restored state; it references the live environment state
+            and brain.
+        """
+        if self.replay is None:
+            raise RuntimeError("rewind_to needs a controller created with checkpoint_interval.")
+        if not 0 <= step <= len(self.replay):
+            raise IndexError(f"Step {step} is outside the logged range 0..{len(self.replay)}.")
+        checkpoint = self.replay.nearest(step)
+        self.env.state = checkpoint.env_state
+        self.brain = checkpoint.brain_state
+        self.time_step = checkpoint.time_step
+        self._restore_last_call(checkpoint.time_step)
+        for t in range(checkpoint.time_step, step):
+            env_state, _ = self._begin_step(
+                self.replay.actions[t], summarise=False, consult_cadence=False, replaying=True
+            )
+            response = self.replay.responses[t]
+            if response is None:
+                self._local_step(env_state, replaying=True)
+            else:
+                self._finish_step(env_state, response, replaying=True)
+        if self.cadence is not None:
+            # Event policies start observing afresh from the rewound step.
+            self.cadence.reset()
+        return FullState(self.env.state, self.brain, self.time_step)
+
+    def _rollback_point(self) -> Tuple[Any, ...]:
+        # Everything the stages before the LLM call may change.
+        added_checkpoint = self.replay is not None and self.replay.needs_checkpoint(self.time_step)
+        return (
+            deepcopy(self.env.state),
+            self.brain,
+            self.brain.rng.bit_generator.state,
+            deepcopy(self.cadence),
+            self._pending_action,
+            added_checkpoint,
+        )
+
+    def _roll_back(self, rollback: Tuple[Any, ...]) -> None:
+        # Undo a step abandoned while waiting for the LLM.
+        self.env.state, self.brain, rng_state, self.cadence, self._pending_action, added_checkpoint = rollback
+        self.brain.rng.bit_generator.state = rng_state
+        if added_checkpoint:
+            del self.replay.checkpoints[self.time_step]
+        self.profiler.discard_step()
+
+    def _restore_last_call(self, step: int) -> None:
+        # Find the LLM call in effect before ``step`` for local steps.
+        self._last_call_step = None
+        self._last_instruction, self._last_perceived = "", {}
+        for t in range(step - 1, -1, -1):
+            response = self.replay.responses[t]
+            if response is not None:
+                response_dict = parse_response(response)
+                self._last_instruction = response_dict.get("qubit_update", "")
+                self._last_perceived = response_dict.get("perceived_environment", {})
+                self._last_call_step = t
+                break
+
+    def branch(self) -> None:
+        """Start a new timeline branch from the current state.
+
+        The brain switches to the branch's own random stream, so sibling
+        branches diverge while each remains reproducible.
+        """
+        self.brain.rng = self.snapshots.branch()
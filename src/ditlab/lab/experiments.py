@@ -11,9 +11,13 @@ from typing import Optional, Any
 from ditlab.config.schemas import LabConfig
 from ditlab.env.simple_1d import Simple1DEnvironment
 from ditlab.brain.qubits import QubitBrainState
+from ditlab.brain.compact import CompactQubitBrainState
 from ditlab.llm.client_base import LLMClientBase
 from ditlab.llm.openai_client import OpenAIClient
+from ditlab.llm.prompts import PromptOptions
+from ditlab.lab.cadence import build_cadence
 from ditlab.lab.controller import SimulationController
+from ditlab.util.random_seed import make_rng, spawn_rng
 
 
 @dataclass
@@ -30,12 +34,25 @@ class Experiment:
             env = Simple1DEnvironment(size=self.config.environment.size)
         else:
             raise ValueError(f"Unknown environment type: {self.config.environment.env_type}")
+        # Random streams: the controller owns the root, the brain a child
+        rng = make_rng(self.config.seed)
         # Instantiate brain
-        brain = QubitBrainState.init_random(self.config.brain.num_qubits)
+        brain = QubitBrainState.init_random(self.config.brain.num_qubits, rng=spawn_rng(rng))
+        if self.config.brain.compact:
+            brain = CompactQubitBrainState.from_state(brain, dtype=self.config.brain.dtype)
         # Instantiate LLM client
         llm = (
             self.llm_client
             if self.llm_client is not None
             else OpenAIClient(model_name=self.config.llm.model_name, temperature=self.config.llm.temperature)
         )
-        return SimulationController(env, brain, llm)
\ No newline at end of file
+        return SimulationController(
+            env,
+            brain,
+            llm,
+            rng=rng,
+            checkpoint_interval=self.config.checkpoint_interval,
+            cadence=build_cadence(self.config.cadence),
+            local_update=self.config.cadence.local_update,
+            prompt_options=PromptOptions(**self.config.llm.prompt.model_dump()),
+        )
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""Fan out many divergent branches from one snapshot.
+
+A :class:`Multiverse` holds a starting point (an environment, a brain and
+the LLM client) and advances K sibling branches from it, each with its
+own action sequence or random seed. Branches are independent, so they can
+run inline or on any :class:`concurrent.futures.Executor`, including a
+process pool. Every branch records a
+:class:`~ditlab.lab.columnar.ColumnarTimeline`, which makes the
+divergence metrics between branches (position spread, entropy spread and
+perception disagreement) single vectorised operations over stacked
+columns.
+"""
+
+import json
+from collections import Counter
+from concurrent.futures import Executor
+from copy import deepcopy
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ditlab.env.base import BaseEnvironment
+from ditlab.llm.client_base import LLMClientBase
+from ditlab.lab.columnar import ColumnarTimeline
+from ditlab.lab.controller import SimulationController
+from ditlab.util.random_seed import make_rng
+
+
+@dataclass
+class BranchResult:
+    """The trajectory of one branch.
+
+    Attributes:
+        index: Position of the branch in the fan-out.
+        timeline: Per-step environment columns and amplitudes.
+        perceptions: Perceived environment reported at every step.
+        final_env: Environment state after the last step.
+        final_brain: Brain state after the last step.
+    """
+
+    index: int
+    timeline: ColumnarTimeline
+    perceptions: List[Dict[str, Any]]
+    final_env: Any
+    final_brain: Any
+
+
+@dataclass
+class Divergence:
+    """Per-step divergence between the branches of a fan-out.
+
+    Attributes:
+        position_spread: Standard deviation of the agent position across
+            branches, one value per step.
+        entropy_spread: Standard deviation of the brain entropy across
+            branches, one value per step.
+        perception_disagreement: Fraction of branches whose perception
+            differs from the most common one, one value per step.
+    """
+
+    position_spread: np.ndarray
+    entropy_spread: np.ndarray
+    perception_disagreement: np.ndarray
+
+
+@dataclass
+class FanOut:
+    """Branches of one fan-out together with their divergence."""
+
+    branches: List[BranchResult]
+    divergence: Divergence
+
+
+def _run_branch(
+    index: int,
+    env: BaseEnvironment,
+    brain: Any,
+    llm: LLMClientBase,
+    time_step: int,
+    n_steps: int,
+    actions: Optional[Sequence[Any]],
+) -> BranchResult:
+    # Module level so that process pools can pickle it.
+    controller = SimulationController(env, brain, llm, columnar=True)
+    controller.time_step = time_step
+    perceptions: List[Dict[str, Any]] = []
+    controller.run(
+        n_steps,
+        actions=actions,
+        hooks=[lambda c, env_state, perceived: perceptions.append(perceived)],
+        snapshot_every=max(n_steps, 1),
+    )
+    return BranchResult(index, controller.columns, perceptions, controller.env.state, controller.brain)
+
+
+def divergence(branches: Sequence[BranchResult]) -> Divergence:
+    """Compute the per-step divergence between branches.
+
+    Branches are truncated to the shortest of them.
+    """
+    steps = min(len(b.timeline) for b in branches)
+    positions = np.stack([b.timeline.column("agent_position")[:steps] for b in branches])
+    entropy = np.stack([b.timeline.entropy()[:steps] for b in branches])
+    disagreement = np.empty(steps)
+    for t in range(steps):
+        keys = [json.dumps(b.perceptions[t], sort_keys=True, default=str) for b in branches]
+        disagreement[t] = 1.0 - Counter(keys).most_common(1)[0][1] / len(keys)
+    return Divergence(positions.std(axis=0), entropy.std(axis=0), disagreement)
+
+
+class Multiverse:
+    """Advance K sibling branches from a common starting point.
+
+    Args:
+        env: Environment whose current state is the starting point; every
+            branch works on its own copy.
+        brain: Brain state at the starting point; copied per branch.
+        llm: LLM client shared by the branches. It must be picklable when
+            a process pool is used.
+        time_step: Time step of the first branch step.
+    """
+
+    def __init__(self, env: BaseEnvironment, brain: Any, llm: LLMClientBase, time_step: int = 0) -> None:
+        self.env = deepcopy(env)
+        self.brain = deepcopy(brain)
+        self.llm = llm
+        self.time_step = time_step
+
+    @classmethod
+    def from_controller(cls, controller: SimulationController, node_id: Optional[int] = None) -> "Multiverse":
+        """Start from a controller's live state or from one of its snapshots.
+
+        Args:
+            controller: The controller to branch from.
+            node_id: Snapshot node to start from; the live state if omitted.
+        """
+        if node_id is None:
+            return cls(controller.env, controller.brain, controller.llm, controller.time_step)
+        snapshot = controller.snapshots.state(node_id)
+        multiverse = cls(controller.env, snapshot.brain_state, controller.llm, snapshot.time_step + 1)
+        multiverse.env.state = snapshot.env_state
+        return multiverse
+
+    def fan_out(
+        self,
+        n_steps: int,
+        actions: Optional[Sequence[Optional[Sequence[Any]]]] = None,
+        seeds: Optional[Sequence[int]] = None,
+        executor: Optional[Executor] = None,
+    ) -> FanOut:
+        """Run one branch per action sequence and/or seed.
+
+        Args:
+            n_steps: Number of steps per branch.
+            actions: One action sequence per branch (``None`` entries stay
+                in place). Omit to stay in place in every branch.
+            seeds: One seed per branch for the brain's random stream. Omit
+                to give every branch a copy of the starting stream, so
+                branches differ only in their actions.
+            executor: Executor on which branches run; inline if omitted.
+
+        Returns:
+            The branch trajectories and their divergence.
+        """
+        if actions is None and seeds is None:
+            raise ValueError("Pass action sequences, seeds or both to fan out.")
+        count = len(actions) if actions is not None else len(seeds)
+        if actions is not None and seeds is not None and len(seeds) != count:
+            raise ValueError("actions and seeds must have one entry per branch.")
+        jobs = []
+        for index in range(count):
+            env = deepcopy(self.env)
+            brain = deepcopy(self.brain)
+            if seeds is not None:
+                brain.rng = make_rng(seeds[index])
+            branch_actions = actions[index] if actions is not None else None
+            jobs.append((index, env, brain, self.llm, self.time_step, n_steps, branch_actions))
+        if executor is None:
+            branches = [_run_branch(*job) for job in jobs]
+        else:
+            futures = [executor.submit(_run_branch, *job) for job in jobs]
+            branches = [future.result() for future in futures]
+        return FanOut(branches, divergence(branches))
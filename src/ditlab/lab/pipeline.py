@@ -0,0 +1,189 @@
+"""Pipelined stepping of many timelines on separate CPU and LLM pools.
+
+:meth:`SimulationController.step_once` runs its stages strictly in
+sequence, so a step costs the sum of the CPU stages and the LLM latency.
+:func:`run_pipelined` splits every step of every timeline into a CPU
+stage (environment step, measurement and prompt) and an LLM stage, and
+runs them on two thread pools. While timeline A waits for its LLM
+response, the CPU pool finishes timeline B's previous step and prepares
+its next prompt, so with enough timelines the wall-clock time per step is
+bound by the LLM alone.
+
+The actions of a run are known in advance, and the environment's next
+state depends only on its current state and the action. With
+``speculative`` set, a copy of the environment therefore takes the next
+action while the LLM call is in flight, and the next step only measures
+the updated brain and builds its prompt. The copy costs a ``deepcopy``,
+so speculation only pays off for environments whose step is expensive.
+
+Unlike :func:`~ditlab.lab.async_controller.run_concurrently`, this needs
+no event loop and works with any synchronous, thread-safe LLM client.
+"""
+
+import itertools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from copy import deepcopy
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from ditlab.env.base import BaseEnvironment, EnvironmentState
+from ditlab.lab.controller import SimulationController
+
+# Per-controller actions: one action for all steps, or one iterable of
+# actions per controller.
+ActionsSpec = Union[None, str, Sequence[Optional[Iterable[Any]]]]
+
+StepResult = Tuple[Optional[EnvironmentState], Dict[str, Any]]
+
+# Marks the end of a timeline's actions.
+_END = object()
+
+
+def _speculate(env: BaseEnvironment, action: Any) -> BaseEnvironment:
+    stepped = deepcopy(env)
+    stepped.step(action if action is not None else "stay")
+    return stepped
+
+
+class _Timeline:
+    """One controller's progress through a pipelined run."""
+
+    def __init__(self, controller: SimulationController, actions: Iterator[Any], n_steps: int) -> None:
+        self.controller = controller
+        self.actions = actions
+        self.remaining = n_steps
+        self.uses_prompt = getattr(controller.llm, "uses_prompt", True)
+        self.next_action: Any = next(actions, _END) if n_steps else _END
+        self.speculation: Optional["Future[BaseEnvironment]"] = None
+        self.result: StepResult = (None, {})
+        # Controller state before the step in progress, if one is.
+        self.rollback: Optional[Tuple[Any, ...]] = None
+
+
+class _Pipeline:
+    def __init__(self, cpu: ThreadPoolExecutor, llm: ThreadPoolExecutor, speculative: bool, count: int) -> None:
+        self.cpu = cpu
+        self.llm = llm
+        self.speculative = speculative
+        self.pending = count
+        self.error: Optional[BaseException] = None
+        self.finished = threading.Event()
+        self._lock = threading.Lock()
+        if count == 0:
+            self.finished.set()
+
+    def _guard(self, stage: Any, *args: Any) -> None:
+        # Runs a stage on a pool; the first failure stops the whole run.
+        if self.error is not None:
+            return
+        try:
+            stage(*args)
+        except BaseException as exc:  # noqa: B902 - reported to the caller
+            with self._lock:
+                if self.error is None:
+                    self.error = exc
+            self.finished.set()
+
+    def _done(self) -> None:
+        with self._lock:
+            self.pending -= 1
+            if self.pending == 0:
+                self.finished.set()
+
+    def begin(self, tl: _Timeline) -> None:
+        # CPU stage: environment step, measurement and prompt. Steps the
+        # cadence policy skips are completed here without the LLM.
+        controller = tl.controller
+        while tl.next_action is not _END:
+            action = tl.next_action
+            stepped = tl.speculation.result() if tl.speculation is not None else None
+            tl.speculation = None
+            tl.remaining -= 1
+            tl.next_action = next(tl.actions, _END) if tl.remaining else _END
+            tl.rollback = controller._rollback_point()
+            env_state, summary = controller._begin_step(action, summarise=tl.uses_prompt, stepped_env=stepped)
+            if summary is None:
+                tl.result = (env_state, controller._local_step(env_state))
+                tl.rollback = None
+                continue
+            prompt = controller._build_prompt(env_state, summary, tl.uses_prompt)
+            if self.speculative and tl.next_action is not _END:
+                # Submitted first, so it is queued before ``finish``.
+                tl.speculation = self.cpu.submit(_speculate, controller.env, tl.next_action)
+            self.llm.submit(self._guard, self.call, tl, env_state, prompt)
+            return
+        self._done()
+
+    def call(self, tl: _Timeline, env_state: EnvironmentState, prompt: str) -> None:
+        # LLM stage, on the LLM pool.
+        controller = tl.controller
+        with controller.profiler.phase("llm_call"):
+            response = controller.llm(prompt)
+        controller.profiler.record_tokens(prompt, response)
+        self.cpu.submit(self._guard, self.finish, tl, env_state, response)
+
+    def finish(self, tl: _Timeline, env_state: EnvironmentState, response: str) -> None:
+        # CPU stage: parse, update and snapshot, then start the next step.
+        tl.result = (env_state, tl.controller._finish_step(env_state, response))
+        tl.rollback = None
+        self.begin(tl)
+
+
+def run_pipelined(
+    controllers: Sequence[SimulationController],
+    n_steps: int,
+    actions: ActionsSpec = None,
+    max_concurrency: int = 32,
+    cpu_workers: int = 1,
+    speculative: bool = False,
+) -> List[StepResult]:
+    """Step many controllers with their CPU and LLM stages overlapped.
+
+    Each controller still runs its own steps in order, and each step runs
+    the same stages as :meth:`SimulationController.step_once`, so a
+    pipelined run gives the same result as stepping the controllers one
+    after another. Controllers must not share a brain, environment or
+    profiler; they may share a thread-safe LLM client.
+
+    Args:
+        controllers: The controllers to run.
+        n_steps: Number of steps for each controller.
+        actions: ``None`` or one action for every step of every controller,
+            or a sequence with the actions of each controller.
+        max_concurrency: Maximum number of LLM calls in flight across all
+            controllers.
+        cpu_workers: Threads for the CPU stages. One avoids contention for
+            the GIL; more help only if the stages release it.
+        speculative: Step a copy of each environment with the next action
+            while the LLM call is in flight.
+
+    Returns:
+        The last ``(env_state, perceived_env)`` of each controller, in the
+        order of ``controllers``.
+
+    Raises:
+        Exception: The first exception raised by any stage. Steps that
+            were started but not finished are rolled back, so every
+            controller is left at a step boundary.
+    """
+    if actions is None or isinstance(actions, str):
+        per_controller: List[Iterable[Any]] = [itertools.repeat(actions)] * len(controllers)
+    else:
+        per_controller = [a if a is not None else itertools.repeat(None) for a in actions]
+    timelines = [
+        _Timeline(controller, iter(controller_actions), n_steps)
+        for controller, controller_actions in zip(controllers, per_controller)
+    ]
+    with ThreadPoolExecutor(cpu_workers) as cpu, ThreadPoolExecutor(max_concurrency) as llm:
+        pipeline = _Pipeline(cpu, llm, speculative, len(timelines))
+        for tl in timelines:
+            cpu.submit(pipeline._guard, pipeline.begin, tl)
+        pipeline.finished.wait()
+    # Leaving the pools waits for in-flight stages, which skip their work
+    # once an error is set.
+    if pipeline.error is not None:
+        for tl in timelines:
+            if tl.rollback is not None:
+                tl.controller._roll_back(tl.rollback)
+        raise pipeline.error
+    return [tl.result for tl in timelines]
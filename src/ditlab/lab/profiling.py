@@ -0,0 +1,194 @@
+"""Per-phase step profiling for the simulation controller.
+
+A step runs through several phases: environment step, measurement,
+prompt building, the LLM call, response parsing, the brain update and the
+snapshot. :class:`StepProfiler` times each phase of every step into a
+fixed log-spaced latency histogram, counts the memory blocks allocated
+in it (via :func:`sys.getallocatedblocks`) and records the approximate
+token size of every prompt and response. A step's samples are added to
+the statistics when the step ends, so a step that is abandoned half way
+can be discarded without a trace. The controller uses the
+:data:`NULL_PROFILER` by default, whose hooks do nothing, so
+instrumentation costs almost nothing when it is off.
+"""
+
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from ditlab.io.logging import JSONLLogger
+from ditlab.llm.prompts import estimate_tokens
+
+#: Upper edges, in seconds, of the latency histogram buckets: four per
+#: decade from 1 microsecond to 10 seconds. Slower phases fall in a final
+#: overflow bucket.
+BUCKET_EDGES = np.logspace(-6, 1, 29)
+
+
+class PhaseStats:
+    """Latency histogram and allocation count of one phase."""
+
+    __slots__ = ("count", "total", "max", "allocated_blocks", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.allocated_blocks = 0
+        self.buckets = np.zeros(len(BUCKET_EDGES) + 1, dtype=np.int64)
+
+    def add(self, seconds: float, blocks: int) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.allocated_blocks += blocks
+        self.buckets[np.searchsorted(BUCKET_EDGES, seconds)] += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bucket edge below which a fraction ``q`` of calls fell."""
+        if not self.count:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.buckets), q * self.count))
+        return float(BUCKET_EDGES[index]) if index < len(BUCKET_EDGES) else self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_s": self.total,
+            "mean_s": self.total / self.count if self.count else 0.0,
+            "p50_s": self.quantile(0.5),
+            "p99_s": self.quantile(0.99),
+            "max_s": self.max,
+            "allocated_blocks": self.allocated_blocks,
+            "histogram": self.buckets.tolist(),
+        }
+
+
+class StepProfiler:
+    """Collect per-phase latencies, allocations and token sizes.
+
+    Args:
+        track_allocations: Whether to count allocated memory blocks per
+            phase. The count is a net figure: blocks freed within the
+            phase are subtracted.
+        keep_steps: Number of most recent per-step records kept for
+            :meth:`dump_jsonl`.
+    """
+
+    enabled = True
+
+    def __init__(self, track_allocations: bool = True, keep_steps: int = 10000) -> None:
+        self.track_allocations = track_allocations
+        self.phases: Dict[str, PhaseStats] = {}
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.steps: Deque[Dict[str, Any]] = deque(maxlen=keep_steps)
+        self._current: Dict[str, Any] = {}
+        # (phase, seconds, blocks) samples of the current step.
+        self._samples: List[Tuple[str, float, int]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as phase ``name`` of the current step."""
+        blocks = sys.getallocatedblocks() if self.track_allocations else 0
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if self.track_allocations:
+                blocks = sys.getallocatedblocks() - blocks
+            self._samples.append((name, elapsed, blocks))
+            self._current[name] = elapsed
+
+    def record_tokens(self, prompt: str, response: str) -> None:
+        """Record the approximate token sizes of one LLM exchange."""
+        self._current["prompt_tokens"] = estimate_tokens(prompt)
+        self._current["response_tokens"] = estimate_tokens(response)
+
+    def end_step(self, time_step: int) -> None:
+        """Close the record of the current step and add it to the statistics."""
+        for name, elapsed, blocks in self._samples:
+            stats = self.phases.get(name)
+            if stats is None:
+                stats = self.phases[name] = PhaseStats()
+            stats.add(elapsed, blocks)
+        self.prompt_tokens += self._current.get("prompt_tokens", 0)
+        self.response_tokens += self._current.get("response_tokens", 0)
+        self._current["time_step"] = time_step
+        self.steps.append(self._current)
+        self._current = {}
+        self._samples = []
+
+    def discard_step(self) -> None:
+        """Drop what was recorded for the current step, e.g. after a cancel."""
+        self._current = {}
+        self._samples = []
+
+    def summary(self) -> Dict[str, Any]:
+        """Return aggregate statistics, suitable for JSON serialisation."""
+        return {
+            "steps": len(self.steps),
+            "phases": {name: stats.summary() for name, stats in self.phases.items()},
+            "tokens": {"prompt": self.prompt_tokens, "response": self.response_tokens},
+        }
+
+    def dump_jsonl(self, filepath: str) -> None:
+        """Append the kept per-step records to a JSON Lines file.
+
+        Each line holds the phase latencies in seconds, the token sizes and
+        the time step of one step.
+        """
+        logger = JSONLLogger(filepath)
+        for record in self.steps:
+            logger.log(record)
+
+    def reset(self) -> None:
+        """Discard everything recorded so far."""
+        self.phases.clear()
+        self.prompt_tokens = self.response_tokens = 0
+        self.steps.clear()
+        self._current = {}
+        self._samples = []
+
+
+class _NullContext:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class NullProfiler:
+    """A profiler whose hooks do nothing; the controller's default."""
+
+    enabled = False
+
+    def phase(self, name: str) -> _NullContext:
+        return _NULL_CONTEXT
+
+    def record_tokens(self, prompt: str, response: str) -> None:
+        pass
+
+    def end_step(self, time_step: int) -> None:
+        pass
+
+    def discard_step(self) -> None:
+        pass
+
+    def summary(self) -> Dict[str, Any]:
+        return {"steps": 0, "phases": {}, "tokens": {"prompt": 0, "response": 0}}
+
+
+#: Shared do-nothing profiler.
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,71 @@
+"""Sparse checkpoints and response log for replay-based rewinding.
+
+Instead of snapshotting every step, a controller can keep a
+:class:`ReplayLog`: a full checkpoint every ``interval`` steps plus the
+action and raw LLM response of every step. Rewinding to step ``t``
+restores the nearest checkpoint at or before ``t`` and replays the logged
+steps without calling the LLM again. This bounds the replay cost to
+``interval - 1`` steps while cutting snapshot memory by ``interval``
+times.
+"""
+
+from copy import deepcopy
+from typing import Any, Dict, List, Optional
+
+from ditlab.lab.state import FullState
+
+
+class ReplayLog:
+    """Checkpoints every ``interval`` steps and a log of every step.
+
+    Args:
+        interval: Number of steps between checkpoints.
+    """
+
+    def __init__(self, interval: int) -> None:
+        if interval < 1:
+            raise ValueError("Checkpoint interval must be at least 1.")
+        self.interval = interval
+        self.checkpoints: Dict[int, FullState] = {}
+        self.actions: List[Any] = []
+        # ``None`` marks a step on which the LLM was not called.
+        self.responses: List[Optional[str]] = []
+
+    def __len__(self) -> int:
+        return len(self.responses)
+
+    def needs_checkpoint(self, time_step: int) -> bool:
+        """Whether a checkpoint should be taken before ``time_step`` runs."""
+        return time_step % self.interval == 0 and time_step not in self.checkpoints
+
+    def checkpoint(self, env_state: Any, brain_state: Any, time_step: int) -> None:
+        """Store copies of the state at the start of ``time_step``."""
+        self.checkpoints[time_step] = FullState(deepcopy(env_state), deepcopy(brain_state), time_step)
+
+    def record(self, time_step: int, action: Any, response: Optional[str]) -> None:
+        """Log the action and LLM response of ``time_step``.
+
+        Recording a step that is already logged means the timeline has
+        diverged after a rewind, so the old continuation is discarded.
+        """
+        if time_step < len(self.responses):
+            self.truncate(time_step)
+        self.actions.append(action)
+        self.responses.append(response)
+
+    def truncate(self, time_step: int) -> None:
+        """Drop log entries from ``time_step`` and checkpoints after it."""
+        del self.actions[time_step:]
+        del self.responses[time_step:]
+        for step in [s for s in self.checkpoints if s > time_step]:
+            del self.checkpoints[step]
+
+    def nearest(self, time_step: int) -> FullState:
+        """Return a copy of the latest checkpoint at or before ``time_step``."""
+        step = (time_step // self.interval) * self.interval
+        while step not in self.checkpoints:
+            step -= self.interval
+            if step < 0:
+                raise IndexError(f"No checkpoint at or before step {time_step}.")
+        checkpoint = self.checkpoints[step]
+        return FullState(deepcopy(checkpoint.env_state), deepcopy(checkpoint.brain_state), step)
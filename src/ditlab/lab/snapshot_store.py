@@ -0,0 +1,329 @@
+"""Compact snapshot storage with keyframes, deltas and disk spilling.
+
+Deep-copying the full environment and brain on every step makes long
+runs hold millions of complete copies in memory. :class:`SnapshotStore`
+instead keeps a full *keyframe* every ``keyframe_interval`` records and,
+in between, only *deltas* against the parent record:
+
+* environment attributes that changed since the parent;
+* the amplitude rows that changed (unchanged amplitudes are shared);
+* the brain's random-generator state.
+
+Records are grouped into segments. When the estimated resident size
+exceeds ``max_bytes`` the least recently used segments are pickled to a
+spill directory and loaded back on demand. Reading a record rebuilds the
+state from its nearest keyframe.
+"""
+
+from __future__ import annotations
+
+import pickle
+import shutil
+import tempfile
+from collections import OrderedDict
+from copy import deepcopy
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Rough per-record bookkeeping overhead used for the memory estimate.
+_RECORD_OVERHEAD = 256
+
+
+@dataclass
+class _Record:
+    """One stored snapshot; either a keyframe or a delta against ``parent``."""
+
+    parent: int
+    time_step: int
+    depth: int  # records since the last keyframe; 0 for keyframes
+    env: Any  # keyframe: EnvironmentState copy; delta: changed attributes
+    brain: Any = None  # keyframe: brain copy; delta: None
+    amps: Any = None  # delta: None, full array or (row indices, rows)
+    rng_state: Optional[Dict[str, Any]] = None
+    nbytes: int = _RECORD_OVERHEAD
+
+    @property
+    def is_keyframe(self) -> bool:
+        return self.depth == 0
+
+
+# Immutable attribute types that can be stored without copying.
+_ATOMIC = frozenset({int, float, bool, complex, str, bytes, type(None)})
+
+
+def _copy_vars(values: Dict[str, Any]) -> Dict[str, Any]:
+    # Most environment states hold only scalars; skip deepcopy for those.
+    if all(type(v) in _ATOMIC for v in values.values()):
+        return dict(values)
+    return deepcopy(values)
+
+
+def _equal(a: Any, b: Any) -> bool:
+    if type(a) in _ATOMIC:
+        return type(a) is type(b) and a == b
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return isinstance(a, np.ndarray) and isinstance(b, np.ndarray) and np.array_equal(a, b)
+    return type(a) is type(b) and a == b
+
+
+def _attrs_size(values: Optional[Dict[str, Any]]) -> int:
+    # Rough size of a dictionary of small attribute values.
+    return 64 * len(values) if values else 0
+
+
+def _rng_state(brain: Any) -> Optional[Dict[str, Any]]:
+    rng = getattr(brain, "rng", None)
+    return rng.bit_generator.state if rng is not None else None
+
+
+class SnapshotStore:
+    """Append-only store of snapshots encoded as keyframes plus deltas.
+
+    Each record names its parent record, which is the previous record by
+    default; deltas are taken against the parent. Records are addressed
+    by the integer id returned from :meth:`append`.
+
+    Args:
+        keyframe_interval: Maximum number of delta records between
+            keyframes; bounds the cost of rebuilding a record.
+        max_bytes: Resident memory budget in bytes. Older segments are
+            spilled to disk when it is exceeded. ``None`` disables
+            spilling.
+        spill_dir: Directory for spilled segments. A temporary directory
+            is created on first spill if omitted.
+        segment_size: Number of records per spill segment. Defaults to
+            ``keyframe_interval``.
+    """
+
+    def __init__(
+        self,
+        keyframe_interval: int = 32,
+        max_bytes: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        segment_size: Optional[int] = None,
+    ) -> None:
+        self.keyframe_interval = keyframe_interval
+        self.max_bytes = max_bytes
+        self.segment_size = segment_size or keyframe_interval
+        self._spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self._owns_spill_dir = spill_dir is None
+        self._records: List[Optional[_Record]] = []
+        # Resident segments in least-recently-used order, with their sizes.
+        self._resident: "OrderedDict[int, int]" = OrderedDict()
+        self._spilled: Dict[int, Path] = {}
+        self.nbytes = 0
+        # Private copy of the last appended state, used to compute deltas.
+        self._head: Optional[int] = None
+        self._head_type: Optional[type] = None
+        self._head_env: Optional[Dict[str, Any]] = None
+        self._head_amps: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __getitem__(self, index: int) -> Tuple[Any, Any, int]:
+        if index < 0:
+            index += len(self._records)
+        if not 0 <= index < len(self._records):
+            raise IndexError("Snapshot index out of range.")
+        return self.get(index)
+
+    def __iter__(self) -> Iterator[Tuple[Any, Any, int]]:
+        for index in range(len(self._records)):
+            yield self.get(index)
+
+    @property
+    def spilled_segments(self) -> int:
+        """Number of segments currently held on disk only."""
+        return sum(1 for k in self._spilled if k not in self._resident)
+
+    def append(self, env_state: Any, brain_state: Any, time_step: int, parent: Optional[int] = None) -> int:
+        """Store a snapshot and return its record id.
+
+        Args:
+            env_state: The environment state; it is copied, not referenced.
+            brain_state: The brain state; it is copied, not referenced.
+            time_step: The simulation time step of the snapshot.
+            parent: Id of the record this one follows. Defaults to the
+                most recently appended record.
+
+        Returns:
+            The id of the new record.
+        """
+        if parent is None:
+            parent = len(self._records) - 1
+        env_vars = getattr(env_state, "__dict__", None)
+        amps = getattr(brain_state, "amplitudes", None)
+        parent_depth = self._record(parent).depth if parent >= 0 else 0
+        delta_ok = (
+            parent >= 0
+            and parent == self._head
+            and type(brain_state) is self._head_type
+            and parent_depth + 1 < self.keyframe_interval
+            and env_vars is not None
+            and amps is not None
+            and self._head_amps is not None
+            and amps.shape == self._head_amps.shape
+            and amps.dtype == self._head_amps.dtype
+        )
+        env_copy = _copy_vars(env_vars) if env_vars is not None else None
+        if delta_ok:
+            record = self._delta(parent, time_step, parent_depth + 1, env_copy, amps, brain_state)
+        else:
+            record = _Record(parent, time_step, 0, deepcopy(env_state), brain=deepcopy(brain_state))
+            record.nbytes += getattr(amps, "nbytes", 0) + _attrs_size(env_copy)
+        record_id = len(self._records)
+        self._records.append(record)
+        self._head = record_id
+        self._head_type = type(brain_state)
+        self._head_env = env_copy
+        self._head_amps = amps.copy() if amps is not None else None
+        self._account(record_id, record.nbytes)
+        return record_id
+
+    def _delta(
+        self, parent: int, time_step: int, depth: int, env_copy: Dict[str, Any], amps: np.ndarray, brain: Any
+    ) -> _Record:
+        last_env = self._head_env
+        env_delta = {k: v for k, v in env_copy.items() if k not in last_env or not _equal(last_env[k], v)}
+        width = amps.shape[-1]
+        rows = amps.reshape(-1, width)
+        changed = np.flatnonzero((rows != self._head_amps.reshape(-1, width)).any(axis=1))
+        if changed.size == 0:
+            amps_delta = None
+        elif changed.size * 2 > rows.shape[0]:
+            amps_delta = amps.copy()
+        else:
+            amps_delta = (changed, rows[changed].copy())
+        record = _Record(parent, time_step, depth, env_delta, amps=amps_delta, rng_state=_rng_state(brain))
+        if isinstance(amps_delta, np.ndarray):
+            record.nbytes += amps_delta.nbytes
+        elif amps_delta is not None:
+            record.nbytes += amps_delta[0].nbytes + amps_delta[1].nbytes
+        record.nbytes += _attrs_size(env_delta)
+        return record
+
+    def get(self, record_id: int) -> Tuple[Any, Any, int]:
+        """Rebuild the snapshot stored under ``record_id``.
+
+        The state is rebuilt from the nearest keyframe by replaying the
+        deltas along the parent chain. The returned objects are fresh
+        copies that the caller may mutate.
+
+        Returns:
+            A tuple ``(env_state, brain_state, time_step)``.
+        """
+        chain = []
+        record = self._record(record_id)
+        while not record.is_keyframe:
+            chain.append(record)
+            record = self._record(record.parent)
+        env_state = deepcopy(record.env)
+        brain_state = deepcopy(record.brain)
+        amps = getattr(brain_state, "amplitudes", None)
+        if chain:
+            amps = amps.copy()
+        rng_state = None
+        for delta in reversed(chain):
+            for key, value in delta.env.items():
+                setattr(env_state, key, deepcopy(value))
+            if isinstance(delta.amps, np.ndarray):
+                amps[...] = delta.amps
+            elif delta.amps is not None:
+                rows, values = delta.amps
+                amps.reshape(-1, amps.shape[-1])[rows] = values
+            rng_state = delta.rng_state
+        if chain:
+            brain_state.amplitudes = amps
+            if rng_state is not None:
+                brain_state.rng.bit_generator.state = rng_state
+        return env_state, brain_state, self._record(record_id).time_step
+
+    def truncate(self, length: int) -> None:
+        """Drop every record with an id of ``length`` or more."""
+        if length < len(self._records):
+            first = length // self.segment_size
+            if first in self._spilled and first not in self._resident:
+                self._load_segment(first)
+            # Spill files of the cut segments no longer match their contents.
+            for segment in [k for k in self._spilled if k >= first]:
+                self._spilled.pop(segment).unlink(missing_ok=True)
+            for index in range(length, len(self._records)):
+                record = self._records[index]
+                if record is not None:
+                    self.nbytes -= record.nbytes
+                    self._resident[index // self.segment_size] -= record.nbytes
+            del self._records[length:]
+            last = (length - 1) // self.segment_size if length else -1
+            for segment in [k for k in self._resident if k > last]:
+                self.nbytes -= self._resident.pop(segment)
+        self._head = None
+        self._head_type = None
+        self._head_env = None
+        self._head_amps = None
+
+    def close(self) -> None:
+        """Remove the spill directory if the store created it."""
+        if self._owns_spill_dir and self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+            self._spilled.clear()
+
+    def _record(self, record_id: int) -> _Record:
+        record = self._records[record_id]
+        if record is None:
+            self._load_segment(record_id // self.segment_size)
+            record = self._records[record_id]
+        else:
+            segment = record_id // self.segment_size
+            if segment in self._resident:
+                self._resident.move_to_end(segment)
+        return record
+
+    def _account(self, record_id: int, nbytes: int) -> None:
+        segment = record_id // self.segment_size
+        self._resident[segment] = self._resident.get(segment, 0) + nbytes
+        self._resident.move_to_end(segment)
+        self.nbytes += nbytes
+        self._enforce_budget(keep=segment)
+
+    def _enforce_budget(self, keep: int) -> None:
+        if self.max_bytes is None:
+            return
+        # The segment still being appended to is never spilled.
+        growing = (len(self._records) - 1) // self.segment_size
+        for segment in list(self._resident):
+            if self.nbytes <= self.max_bytes:
+                break
+            if segment not in (keep, growing):
+                self._spill_segment(segment)
+
+    def _segment_range(self, segment: int) -> Tuple[int, int]:
+        start = segment * self.segment_size
+        return start, min(start + self.segment_size, len(self._records))
+
+    def _spill_segment(self, segment: int) -> None:
+        start, stop = self._segment_range(segment)
+        if segment not in self._spilled:
+            if self._spill_dir is None:
+                self._spill_dir = Path(tempfile.mkdtemp(prefix="ditlab-snapshots-"))
+            self._spill_dir.mkdir(parents=True, exist_ok=True)
+            path = self._spill_dir / f"segment_{segment}.pkl"
+            with path.open("wb") as f:
+                pickle.dump(self._records[start:stop], f, protocol=pickle.HIGHEST_PROTOCOL)
+            self._spilled[segment] = path
+        for index in range(start, stop):
+            self._records[index] = None
+        self.nbytes -= self._resident.pop(segment)
+
+    def _load_segment(self, segment: int) -> None:
+        with self._spilled[segment].open("rb") as f:
+            records = pickle.load(f)
+        start, _ = self._segment_range(segment)
+        self._records[start:start + len(records)] = records
+        self._resident[segment] = sum(r.nbytes for r in records)
+        self.nbytes += self._resident[segment]
+        self._enforce_budget(keep=segment)
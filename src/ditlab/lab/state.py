@@ -2,20 +2,31 @@
 
 This module defines data structures for encapsulating the complete
 simulation state and provides a snapshot manager for rewinding and
-branching timelines.
+branching timelines. Snapshots are held in a
+:class:`~ditlab.lab.snapshot_store.SnapshotStore`, which stores periodic
+keyframes plus compact deltas and can spill old segments to disk, and are
+organised as a :class:`~ditlab.lab.timeline_tree.TimelineTree`.
 """
 
 from dataclasses import dataclass
-from typing import Any, List, Tuple
-from copy import deepcopy
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
 
 from ditlab.env.base import EnvironmentState
 from ditlab.brain.qubits import QubitBrainState
+from ditlab.lab.snapshot_store import SnapshotStore
+from ditlab.lab.timeline_tree import TimelineNode, TimelineTree
+from ditlab.util.random_seed import keyed_rng, make_rng
 
 
 @dataclass
 class FullState:
-    """A complete snapshot of the environment and brain state."""
+    """A complete snapshot of the environment and brain state.
+
+    The brain state carries its random generator, so restoring a snapshot
+    also restores the position in the brain's random stream.
+    """
 
     env_state: EnvironmentState
     brain_state: QubitBrainState
@@ -23,43 +34,118 @@ class FullState:
 
 
 class SnapshotManager:
-    """Manage a timeline of simulation snapshots with branching support."""
+    """Manage a tree of simulation snapshots with branching support.
+
+    Snapshots form a persistent :class:`~ditlab.lab.timeline_tree.TimelineTree`
+    in which branches share their common history. The manager tracks two
+    nodes: the *tip* of the current timeline, whose root-to-tip path is
+    what :meth:`rewind` indexes into, and the *head*, the snapshot the
+    simulation is currently at. Saving after a rewind therefore starts a
+    new branch from the rewound snapshot, and the original continuation
+    remains in the tree.
+
+    Args:
+        rng: Generator from which each new branch derives its own random
+            stream, keyed by the branch point. A fresh generator is used
+            if omitted.
+        keyframe_interval: Maximum number of delta snapshots between full
+            keyframes.
+        max_bytes: Resident memory budget for the snapshots; older
+            segments are spilled to disk beyond it. ``None`` keeps
+            everything in memory.
+        spill_dir: Directory for spilled segments; a temporary directory
+            is used if omitted.
+    """
+
+    def __init__(
+        self,
+        rng: Optional[np.random.Generator] = None,
+        keyframe_interval: int = 32,
+        max_bytes: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+    ) -> None:
+        self.store = SnapshotStore(keyframe_interval, max_bytes, spill_dir)
+        self.tree = TimelineTree()
+        self.head: Optional[int] = None
+        self.tip: Optional[int] = None
+        self.rng = rng if rng is not None else make_rng()
+        # Number of branches started from each node; None is the empty tree.
+        self._branches: Dict[Optional[int], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.tree)
+
+    @property
+    def current_index(self) -> int:
+        """Depth of the head along the current timeline, or -1 if empty."""
+        return self.tree[self.head].depth if self.head is not None else -1
 
-    def __init__(self) -> None:
-        self.history: List[FullState] = []
-        self.current_index: int = -1
-        self.branches: List[List[FullState]] = []
+    def save(self, env_state: EnvironmentState, brain_state: QubitBrainState, time_step: int) -> int:
+        """Append a new snapshot after the head and return its node id."""
+        parent_record = self.tree[self.head].record_id if self.head is not None else -1
+        record_id = self.store.append(env_state, brain_state, time_step, parent=parent_record)
+        node = self.tree.add(self.head, time_step, record_id)
+        self.head = self.tip = node.node_id
+        return node.node_id
 
-    def save(self, env_state: EnvironmentState, brain_state: QubitBrainState, time_step: int) -> None:
-        """Append a new snapshot to the current timeline."""
-        state = FullState(deepcopy(env_state), deepcopy(brain_state), time_step)
-        self.history.append(state)
-        self.current_index = len(self.history) - 1
+    def state(self, node_id: int) -> FullState:
+        """Rebuild the snapshot of any node as a fresh copy."""
+        return FullState(*self.store.get(self.tree[node_id].record_id))
 
     def rewind(self, index: int = None) -> FullState:
-        """Return an earlier snapshot from the history without removing it.
+        """Return an earlier snapshot from the timeline without removing it.
 
         Args:
-            index: Optional index to rewind to. Defaults to the previous
-                snapshot in the history.
+            index: Optional position along the current timeline (0 is the
+                first snapshot) to rewind to. Defaults to the snapshot
+                before the head.
 
         Returns:
-            The snapshot at the specified index.
+            The snapshot at the specified index, rebuilt from the nearest
+            keyframe as a fresh copy.
         """
-        if not self.history:
+        if self.tip is None:
             raise IndexError("No snapshots available to rewind to.")
         if index is None:
             index = max(0, self.current_index - 1)
-        self.current_index = index
-        state = self.history[self.current_index]
-        return deepcopy(state)
+        node = self.tree.ancestor(self.tip, index)
+        self.head = node.node_id
+        return self.state(node.node_id)
 
-    def branch(self) -> None:
-        """Start a new branch from the current state.
+    def checkout(self, node_id: int) -> FullState:
+        """Move the head and tip to any node and return its snapshot."""
+        self.head = self.tip = node_id
+        return self.state(node_id)
 
-        The current history is copied to the branches list, and a fresh
-        history is started for the new branch.
+    def branch(self, node_id: Optional[int] = None) -> np.random.Generator:
+        """Start a new branch from a snapshot in O(1).
+
+        The next :meth:`save` adds a child of the branch point; existing
+        descendants are kept in the tree.
+
+        Args:
+            node_id: Snapshot to branch from. Defaults to the head.
+
+        Returns:
+            An independent random stream for the new branch, derived from
+            the branch point and the number of earlier branches from that
+            same point. It does not depend on branches taken elsewhere in
+            the tree.
         """
-        self.branches.append(self.history[: self.current_index + 1])
-        self.history = []
-        self.current_index = -1
\ No newline at end of file
+        if node_id is not None:
+            self.head = node_id
+        self.tip = self.head
+        n = self._branches.get(self.head, 0)
+        self._branches[self.head] = n + 1
+        # Node ids are shifted by one so that the empty tree has a key too.
+        node_key = self.head + 1 if self.head is not None else 0
+        return keyed_rng(self.rng, node_key, n)
+
+    def path(self, node_id: Optional[int] = None) -> List[TimelineNode]:
+        """Return the nodes from the root to ``node_id`` (default: the tip)."""
+        node_id = self.tip if node_id is None else node_id
+        return self.tree.path(node_id) if node_id is not None else []
+
+    def leaves(self) -> List[TimelineNode]:
+        """Return the tip node of every timeline explored so far."""
+        return self.tree.leaves()
@@ -0,0 +1,253 @@
+"""Parameter sweeps over experiment configurations.
+
+:class:`~ditlab.lab.experiments.Experiment` runs one :class:`LabConfig`.
+Studies such as chaos versus stability need many configurations times
+many seeds. This module expands a grid or a random specification over
+``LabConfig`` fields (addressed by dotted paths such as
+``"brain.num_qubits"``), fans the runs out to a process pool with one
+seed per run, and yields results as they finish. Finished runs can be
+memoised on disk under a hash of their configuration, seed and run
+function, so a resumed sweep skips the cells it has already completed.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import pickle
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+from ditlab.config.schemas import LabConfig
+
+# A sweep run maps a fully specified config (including its seed) to a
+# picklable result. It must be a module-level function to reach the workers.
+RunFn = Callable[[LabConfig], Any]
+
+
+def with_overrides(config: LabConfig, overrides: Dict[str, Any]) -> LabConfig:
+    """Return a validated copy of ``config`` with dotted-path overrides.
+
+    Args:
+        config: The base configuration.
+        overrides: Mapping from dotted field paths, such as
+            ``"environment.size"``, to new values.
+
+    Returns:
+        A new configuration; ``config`` is not modified.
+    """
+    data = config.model_dump()
+    for path, value in overrides.items():
+        *parents, name = path.split(".")
+        target = data
+        for part in parents:
+            target = target[part]
+        if name not in target:
+            raise KeyError(f"Unknown config field: {path}")
+        target[name] = value
+    return LabConfig.model_validate(data)
+
+
+def expand_grid(base: LabConfig, grid: Dict[str, Sequence[Any]]) -> List[LabConfig]:
+    """Return one config per point of the Cartesian product of ``grid``.
+
+    Args:
+        base: Configuration supplying every field not in ``grid``.
+        grid: Mapping from dotted field paths to the values to try.
+
+    Returns:
+        The configurations, in row-major order of ``grid``.
+    """
+    paths = list(grid)
+    return [
+        with_overrides(base, dict(zip(paths, values)))
+        for values in itertools.product(*(grid[p] for p in paths))
+    ]
+
+
+def sample_random(
+    base: LabConfig, space: Dict[str, Any], num_samples: int, seed: Optional[int] = None
+) -> List[LabConfig]:
+    """Draw configurations at random from ``space``.
+
+    Args:
+        base: Configuration supplying every field not in ``space``.
+        space: Mapping from dotted field paths to a list of choices, or to
+            a ``(low, high)`` tuple. Integer bounds are sampled as integers
+            including ``high``; other bounds uniformly in ``[low, high)``.
+        num_samples: Number of configurations to draw.
+        seed: Seed for the sampling, making the sweep reproducible.
+
+    Returns:
+        The sampled configurations.
+    """
+    rng = np.random.default_rng(seed)
+    configs = []
+    for _ in range(num_samples):
+        overrides = {}
+        for path, spec in space.items():
+            if isinstance(spec, tuple):
+                low, high = spec
+                if isinstance(low, int) and isinstance(high, int):
+                    overrides[path] = int(rng.integers(low, high, endpoint=True))
+                else:
+                    overrides[path] = float(rng.uniform(low, high))
+            else:
+                overrides[path] = spec[int(rng.integers(len(spec)))]
+        configs.append(with_overrides(base, overrides))
+    return configs
+
+
+def run_key(config: LabConfig, run_fn: Optional[RunFn] = None) -> str:
+    """Return a stable hash of a configuration, seed included.
+
+    Args:
+        config: The configuration of the run.
+        run_fn: The run function. If given, its qualified name is part of
+            the hash, so different functions never share a result.
+    """
+    data: Dict[str, Any] = {"config": config.model_dump(mode="json")}
+    if run_fn is not None:
+        data["run_fn"] = _qualified_name(run_fn)
+    payload = json.dumps(data, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _qualified_name(fn: Callable[..., Any]) -> str:
+    name = getattr(fn, "__qualname__", None)
+    if name is None:
+        # E.g. functools.partial, whose repr includes its arguments.
+        return repr(fn)
+    return f"{fn.__module__}.{name}"
+
+
+def derive_seeds(num_seeds: int, root_seed: Optional[int] = None) -> List[int]:
+    """Derive independent per-run seeds from one root seed."""
+    children = np.random.SeedSequence(root_seed).spawn(num_seeds)
+    return [int(child.generate_state(1)[0]) for child in children]
+
+
+@dataclass
+class SweepResult:
+    """The outcome of one sweep cell.
+
+    Attributes:
+        config: The configuration that was run, with its seed set.
+        key: The memoisation key of the run.
+        result: The value returned by the run function.
+        cached: Whether the result was loaded from the memo cache.
+    """
+
+    config: LabConfig
+    key: str
+    result: Any
+    cached: bool = False
+
+
+class SweepRunner:
+    """Run a function over many configurations and seeds in parallel.
+
+    Args:
+        run_fn: Module-level function mapping a config to a picklable
+            result. The config's ``seed`` is set for each run.
+        max_workers: Number of worker processes. ``0`` runs every cell in
+            the calling process, which helps with debugging.
+        cache_dir: Directory in which finished runs are memoised. Caching
+            is disabled if omitted. Runs are keyed by their config and
+            the name of ``run_fn`` only: parameters the function takes
+            from elsewhere, such as a default argument or a global, must
+            move into the config to be memoised correctly. Use a fresh
+            directory after changing the function's body.
+        executor: An executor to use instead of creating a process pool.
+    """
+
+    def __init__(
+        self,
+        run_fn: RunFn,
+        max_workers: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self.run_fn = run_fn
+        self.max_workers = max_workers
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.executor = executor
+
+    def cells(
+        self, configs: Sequence[LabConfig], seeds: Union[int, Sequence[int]], root_seed: Optional[int] = None
+    ) -> List[LabConfig]:
+        """Pair every config with every seed.
+
+        Args:
+            configs: Configurations to run.
+            seeds: Explicit seeds, or a number of seeds to derive from
+                ``root_seed``.
+            root_seed: Root seed used when ``seeds`` is a count.
+
+        Returns:
+            One config per cell with its ``seed`` field set.
+        """
+        if isinstance(seeds, int):
+            seeds = derive_seeds(seeds, root_seed)
+        return [config.model_copy(update={"seed": seed}) for config in configs for seed in seeds]
+
+    def run(
+        self, configs: Sequence[LabConfig], seeds: Union[int, Sequence[int]] = 1, root_seed: Optional[int] = None
+    ) -> Iterator[SweepResult]:
+        """Run every cell and yield results as they finish.
+
+        Cells found in the memo cache are yielded first, without running.
+        The others are yielded in completion order, not submission order.
+
+        Args:
+            configs: Configurations to run.
+            seeds: Explicit seeds, or a number of seeds per config derived
+                from ``root_seed``.
+            root_seed: Root seed used when ``seeds`` is a count.
+
+        Yields:
+            One :class:`SweepResult` per cell.
+        """
+        pending = []
+        for config in self.cells(configs, seeds, root_seed):
+            key = run_key(config, self.run_fn)
+            path = self._cache_path(key)
+            if path is not None and path.exists():
+                with path.open("rb") as f:
+                    yield SweepResult(config, key, pickle.load(f), cached=True)
+            else:
+                pending.append((config, key))
+        if not pending:
+            return
+        if self.max_workers == 0 and self.executor is None:
+            for config, key in pending:
+                yield self._finish(config, key, self.run_fn(config))
+            return
+        executor = self.executor or ProcessPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {executor.submit(self.run_fn, config): (config, key) for config, key in pending}
+            for future in as_completed(futures):
+                config, key = futures[future]
+                yield self._finish(config, key, future.result())
+        finally:
+            if self.executor is None:
+                # Abandon queued cells if the caller stops iterating early.
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    def _cache_path(self, key: str) -> Optional[Path]:
+        return self.cache_dir / f"{key}.pkl" if self.cache_dir is not None else None
+
+    def _finish(self, config: LabConfig, key: str, result: Any) -> SweepResult:
+        path = self._cache_path(key)
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with tmp.open("wb") as f:
+                pickle.dump(result, f)
+            # Atomic, so an interrupted sweep never leaves a partial result.
+            os.replace(tmp, path)
+        return SweepResult(config, key, result)
@@ -1,10 +1,10 @@
 """Timeline utilities.
 
-This module re-exports the SnapshotManager for backwards compatibility
-and potential extensions. In future versions additional timeline
-manipulation functions may be added here.
+This module re-exports the SnapshotManager for backwards compatibility,
+together with the persistent timeline tree it uses for branching.
 """
 
 from .state import SnapshotManager  # noqa: F401
+from .timeline_tree import TimelineNode, TimelineTree  # noqa: F401
 
-__all__ = ["SnapshotManager"]
\ No newline at end of file
+__all__ = ["SnapshotManager", "TimelineNode", "TimelineTree"]
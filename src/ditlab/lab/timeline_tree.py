@@ -0,0 +1,99 @@
+"""Persistent timeline tree for branching simulations.
+
+Timelines form a tree: each snapshot is a node that points at its parent,
+so sibling branches share their common history instead of copying it.
+Creating a branch from any node is O(1), looking up the path from the
+root to a node is O(depth), and the current set of leaves (the tips of
+all timelines explored so far) is maintained incrementally, which keeps
+thousands of branches cheap for multiverse exploration.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class TimelineNode:
+    """One snapshot in the timeline tree.
+
+    Attributes:
+        node_id: Identifier of the node within its tree.
+        parent: The preceding node, or ``None`` for a root.
+        depth: Number of ancestors; roots have depth 0.
+        time_step: Simulation time step of the snapshot.
+        record_id: Id of the snapshot in the backing
+            :class:`~ditlab.lab.snapshot_store.SnapshotStore`.
+        children: Ids of the nodes that follow this one.
+    """
+
+    node_id: int
+    parent: Optional[TimelineNode]
+    depth: int
+    time_step: int
+    record_id: int
+    children: List[int] = field(default_factory=list)
+
+
+class TimelineTree:
+    """A tree of timeline nodes with structural sharing of ancestors."""
+
+    def __init__(self) -> None:
+        self.nodes: List[TimelineNode] = []
+        # Leaves keyed by node id; a dict keeps them in creation order.
+        self._leaves: Dict[int, None] = {}
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def __getitem__(self, node_id: int) -> TimelineNode:
+        return self.nodes[node_id]
+
+    def add(self, parent_id: Optional[int], time_step: int, record_id: int) -> TimelineNode:
+        """Append a node after ``parent_id`` (or as a new root) in O(1).
+
+        Args:
+            parent_id: Id of the parent node, or ``None`` for a root.
+            time_step: Simulation time step of the snapshot.
+            record_id: Id of the snapshot in the backing store.
+
+        Returns:
+            The new node.
+        """
+        parent = self.nodes[parent_id] if parent_id is not None else None
+        node = TimelineNode(
+            node_id=len(self.nodes),
+            parent=parent,
+            depth=parent.depth + 1 if parent is not None else 0,
+            time_step=time_step,
+            record_id=record_id,
+        )
+        self.nodes.append(node)
+        if parent is not None:
+            parent.children.append(node.node_id)
+            self._leaves.pop(parent.node_id, None)
+        self._leaves[node.node_id] = None
+        return node
+
+    def path(self, node_id: int) -> List[TimelineNode]:
+        """Return the nodes from the root down to ``node_id`` in O(depth)."""
+        path = []
+        node: Optional[TimelineNode] = self.nodes[node_id]
+        while node is not None:
+            path.append(node)
+            node = node.parent
+        return path[::-1]
+
+    def ancestor(self, node_id: int, depth: int) -> TimelineNode:
+        """Return the ancestor of ``node_id`` at ``depth`` (0 is the root)."""
+        node = self.nodes[node_id]
+        if not 0 <= depth <= node.depth:
+            raise IndexError("Depth is outside the node's path.")
+        while node.depth > depth:
+            node = node.parent
+        return node
+
+    def leaves(self) -> List[TimelineNode]:
+        """Return the tip of every timeline, in creation order."""
+        return [self.nodes[node_id] for node_id in self._leaves]
@@ -2,11 +2,30 @@
 
 This package defines abstract interfaces for connecting to large language
 models and concrete implementations for specific providers. It also
-contains helper functions for constructing prompts.
+contains helper functions for constructing prompts and parsing responses,
+a response cache that wraps any client, clients that record and replay
+exchanges, and a surrogate client distilled from recordings.
 """
 
+from .cache import CachedLLMClient  # noqa: F401
 from .client_base import LLMClientBase  # noqa: F401
 from .openai_client import OpenAIClient  # noqa: F401
-from .prompts import build_prompt  # noqa: F401
+from .parsing import StreamingJSONParser, extract_json, iter_json_objects  # noqa: F401
+from .prompts import PromptOptions, build_prompt, estimate_tokens  # noqa: F401
+from .recording import RecordingLLMClient, ReplayLLMClient  # noqa: F401
+from .surrogate import SurrogateLLMClient  # noqa: F401
 
-__all__ = ["LLMClientBase", "OpenAIClient", "build_prompt"]
\ No newline at end of file
+__all__ = [
+    "CachedLLMClient",
+    "LLMClientBase",
+    "OpenAIClient",
+    "PromptOptions",
+    "RecordingLLMClient",
+    "ReplayLLMClient",
+    "StreamingJSONParser",
+    "SurrogateLLMClient",
+    "build_prompt",
+    "estimate_tokens",
+    "extract_json",
+    "iter_json_objects",
+]
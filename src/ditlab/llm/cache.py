@@ -0,0 +1,273 @@
+"""Response cache for LLM clients.
+
+Many steps produce identical prompts, especially in small environments
+with few distinct states, and each of them would otherwise cost a model
+call. :class:`CachedLLMClient` wraps any :class:`LLMClientBase` with two
+tiers: an in-memory LRU for the hot set and an optional SQLite file that
+persists responses across runs and processes. Entries are keyed by a hash
+of the client's :meth:`~LLMClientBase.settings` and the prompt, expire
+after an optional time to live, and both tiers are capped in size.
+
+Disk hits only buffer the new access time. Buffered access times are
+written with the next stored response or on :meth:`CachedLLMClient.close`,
+so a hit costs a single indexed read. The store counts its rows and
+evicts the least recently used tenth once it exceeds its cap, rather
+than trimming on every write.
+
+Brain probabilities rarely repeat exactly, so prompts that differ only in
+the last digits of a probability would never share an entry. With
+``quantize`` set, floats in the prompt are rounded for the key (never for
+the prompt sent to the model), trading exactness for hit rate.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from .client_base import LLMClientBase
+
+_FLOAT = re.compile(r"-?\d+\.\d+(?:[eE][-+]?\d+)?")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+)
+"""
+
+_INDEX = "CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)"
+
+# Fraction of the SQLite cap evicted at once when the store overflows.
+_EVICT_FRACTION = 0.1
+
+
+class CachedLLMClient(LLMClientBase):
+    """Wrap an LLM client with an in-memory LRU and an on-disk store.
+
+    Args:
+        client: The client whose responses are cached.
+        max_entries: Maximum number of responses kept in memory.
+        db_path: SQLite file for the persistent tier; memory only if
+            omitted.
+        ttl: Seconds after which an entry expires; ``None`` to keep
+            entries until they are evicted.
+        max_db_entries: Maximum number of rows in the SQLite store; the
+            least recently used rows are deleted beyond it.
+        quantize: Number of decimal places floats in the prompt are
+            rounded to when computing the key; ``None`` for exact keys.
+
+    Attributes:
+        hits: Number of lookups answered from either tier.
+        misses: Number of lookups that found nothing, i.e. calls
+            forwarded to the wrapped client.
+        memory_hits: Hits answered from the in-memory tier.
+        disk_hits: Hits answered from the SQLite tier.
+    """
+
+    def __init__(
+        self,
+        client: LLMClientBase,
+        max_entries: int = 4096,
+        db_path: Optional[str] = None,
+        ttl: Optional[float] = None,
+        max_db_entries: Optional[int] = 100_000,
+        quantize: Optional[int] = None,
+    ) -> None:
+        self.client = client
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_db_entries = max_db_entries
+        self.quantize = quantize
+        self.uses_prompt = getattr(client, "uses_prompt", True)
+        self.hits = self.misses = self.memory_hits = self.disk_hits = 0
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._settings = json.dumps(client.settings(), sort_keys=True, default=str)
+        self._db: Optional[sqlite3.Connection] = None
+        # Access times and expired keys not yet written to the store.
+        self._touched: Dict[str, float] = {}
+        self._expired_keys: Set[str] = set()
+        self._rows = 0
+        if db_path is not None:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(_SCHEMA)
+            self._db.execute(_INDEX)
+            self._db.commit()
+            self._rows = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def settings(self) -> Dict[str, Any]:
+        return self.client.settings()
+
+    def key(self, prompt: str) -> str:
+        """Return the cache key of ``prompt``."""
+        if self.quantize is not None:
+            places = self.quantize
+            prompt = _FLOAT.sub(lambda m: f"{float(m.group()):.{places}f}", prompt)
+        digest = hashlib.sha256(self._settings.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        """Look ``key`` up in both tiers without calling the client.
+
+        Counts a hit or a miss.
+        """
+        now = time.time()
+        with self._lock:
+            response = self._lookup(key, now)
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return response
+
+    def _lookup(self, key: str, now: float) -> Optional[str]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            if not self._expired(entry[1], now):
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[0]
+            del self._memory[key]
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or key in self._expired_keys:
+            return None
+        if self._expired(row[1], now):
+            self._expired_keys.add(key)
+            return None
+        self._touched[key] = now
+        self._remember(key, row[0], row[1])
+        self.disk_hits += 1
+        return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        """Store ``response`` under ``key`` in both tiers."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            if self._db is None:
+                return
+            self._flush()
+            inserted = self._db.execute(
+                "INSERT OR IGNORE INTO responses VALUES (?, ?, ?, ?)", (key, response, now, now)
+            ).rowcount
+            if inserted:
+                self._rows += 1
+            else:
+                self._db.execute(
+                    "UPDATE responses SET response = ?, created = ?, accessed = ? WHERE key = ?",
+                    (response, now, now, key),
+                )
+            if self.max_db_entries is not None and self._rows > self.max_db_entries:
+                self._evict()
+            self._db.commit()
+
+    def _flush(self) -> None:
+        # Write buffered access times and expiries; the caller commits.
+        if self._expired_keys:
+            deleted = self._db.executemany(
+                "DELETE FROM responses WHERE key = ?", [(key,) for key in self._expired_keys]
+            ).rowcount
+            self._rows -= max(deleted, 0)
+            self._expired_keys.clear()
+        if self._touched:
+            self._db.executemany(
+                "UPDATE responses SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def _evict(self) -> None:
+        # Other processes may share the file, so recount before evicting.
+        self._rows = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        target = int(self.max_db_entries * (1.0 - _EVICT_FRACTION))
+        if self._rows > self.max_db_entries:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                (self._rows - target,),
+            )
+            self._rows = target
+
+    def _remember(self, key: str, response: str, created: float) -> None:
+        self._memory[key] = (response, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def __call__(self, prompt: str) -> str:
+        key = self.key(prompt)
+        response = self.get(key)
+        if response is not None:
+            return response
+        response = self.client(prompt)
+        self.put(key, response)
+        return response
+
+    async def acall(self, prompt: str) -> str:
+        key = self.key(prompt)
+        response = self.get(key)
+        if response is not None:
+            return response
+        response = await self.client.acall(prompt)
+        self.put(key, response)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the hit and miss counters and the hit rate."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def clear(self) -> None:
+        """Drop every cached response from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            self._expired_keys.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+                self._rows = 0
+
+    def close(self) -> None:
+        """Write buffered access times and close the SQLite store.
+
+        The memory tier stays usable.
+        """
+        with self._lock:
+            if self._db is not None:
+                self._flush()
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Connections and locks cannot be pickled; a copy sent to a worker
+        # process keeps only the memory tier.
+        state = self.__dict__.copy()
+        state["_db"] = None
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -3,13 +3,33 @@
 LLM clients should implement the ``__call__`` method to accept a prompt
 string and return a model response string. Concrete implementations
 may require authentication and additional configuration parameters.
+
+Clients with a native asynchronous transport can also override
+:meth:`LLMClientBase.acall`; for sync-only clients it runs ``__call__`` in
+a worker thread so the event loop is never blocked. Likewise
+:meth:`LLMClientBase.call_many` sends a batch of prompts from a bounded
+thread pool unless a client has a native batch transport.
 """
 
+import asyncio
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
 
 
 class LLMClientBase(ABC):
-    """Abstract base class for any large language model client."""
+    """Abstract base class for any large language model client.
+
+    Attributes:
+        uses_prompt: Whether the client reads the prompt. Clients that
+            ignore it (such as fakes for testing) set this to ``False`` so
+            the controller can skip building prompts.
+        max_concurrency: Default number of prompts :meth:`call_many`
+            sends at once.
+    """
+
+    uses_prompt: bool = True
+    max_concurrency: int = 8
 
     @abstractmethod
     def __call__(self, prompt: str) -> str:
@@ -21,4 +41,50 @@ class LLMClientBase(ABC):
         Returns:
             The raw model response as a string.
         """
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    def settings(self) -> Dict[str, Any]:
+        """Return the settings that influence the model's responses.
+
+        Wrappers such as the response cache include these in their keys,
+        so two clients with different models never share a response.
+        Subclasses with a model name, temperature and so on should extend
+        the result.
+        """
+        return {"client": type(self).__name__}
+
+    async def acall(self, prompt: str) -> str:
+        """Asynchronously send the prompt to the model.
+
+        The default implementation runs :meth:`__call__` in the event
+        loop's default thread pool. Clients with an async transport should
+        override it.
+
+        Args:
+            prompt: The prompt text to send to the model.
+
+        Returns:
+            The raw model response as a string.
+        """
+        return await asyncio.to_thread(self, prompt)
+
+    def call_many(self, prompts: Sequence[str], max_concurrency: Optional[int] = None) -> List[str]:
+        """Send a batch of prompts and return the responses in order.
+
+        The default implementation calls :meth:`__call__` from a thread
+        pool, so at most ``max_concurrency`` requests are in flight.
+
+        Args:
+            prompts: The prompts to send.
+            max_concurrency: Maximum number of concurrent calls; the
+                client's :attr:`max_concurrency` if omitted.
+
+        Returns:
+            One raw response per prompt. If any call fails, its exception
+            is raised once the calls already in flight have finished.
+        """
+        workers = min(max_concurrency or self.max_concurrency, len(prompts))
+        if workers <= 1:
+            return [self(prompt) for prompt in prompts]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(self, prompts))
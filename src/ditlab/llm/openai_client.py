@@ -3,33 +3,196 @@
 This implementation shows how to integrate an OpenAI API client with the
 DIT Lab simulation. The details such as API keys and endpoint URLs
 should be provided via environment variables or configuration files.
+
+The client talks to the chat completions endpoint directly over
+:mod:`http.client`, so any OpenAI-compatible server can be used through
+``base_url``. Connections are kept alive in a small pool and shared by
+the threads of :meth:`~LLMClientBase.call_many`. Each request has a
+timeout, and rate-limit (429) and server (5xx) errors are retried with
+exponential backoff, honouring ``Retry-After`` when the server sends it.
 """
 
+import http.client
+import json
 import os
-from typing import Any
-
-import openai  # type: ignore
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
 
 from .client_base import LLMClientBase
 
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+# Statuses worth retrying: rate limiting and transient server errors.
+_RETRY_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+
+class OpenAIRequestError(RuntimeError):
+    """A request to the API failed and was not, or no longer, retried.
+
+    Attributes:
+        status: HTTP status of the last response, or ``None`` if no
+            response was received.
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class _ConnectionPool:
+    """Keep-alive connections to one host, shared between threads."""
+
+    def __init__(self, base_url: str, size: int, timeout: float) -> None:
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port
+        self.path = parts.path.rstrip("/")
+        self.size = size
+        self.timeout = timeout
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> http.client.HTTPConnection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def release(self, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
 
 class OpenAIClient(LLMClientBase):
-    """Call OpenAI's API to obtain a response to a prompt."""
+    """Call OpenAI's API to obtain a response to a prompt.
 
-    def __init__(self, model_name: str = "gpt-3.5-turbo", **kwargs: Any) -> None:
+    Args:
+        model_name: Model identifier sent with every request.
+        api_key: API key; read from ``OPENAI_API_KEY`` if omitted. Only
+            required for the default OpenAI endpoint.
+        base_url: Root URL of an OpenAI-compatible API; read from
+            ``OPENAI_BASE_URL`` if omitted, else OpenAI's.
+        timeout: Seconds to wait for connecting and for each response.
+        max_retries: Retries after a rate-limit, server or connection
+            error before giving up.
+        backoff: Delay in seconds before the first retry; doubled for
+            every further retry, with jitter.
+        max_backoff: Upper bound of a single retry delay.
+        pool_size: Number of keep-alive connections kept, which is also
+            the default concurrency of :meth:`call_many`.
+        **kwargs: Extra request parameters, such as ``temperature``.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "gpt-3.5-turbo",
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: float = 60.0,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        pool_size: int = 8,
+        **kwargs: Any,
+    ) -> None:
         self.model_name = model_name
-        self.api_key = os.getenv("OPENAI_API_KEY")
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_concurrency = pool_size
         # Additional parameters can be stored for later use
         self.extra_args = kwargs
+        self._pool = _ConnectionPool(self.base_url, pool_size, timeout)
+
+    def settings(self) -> Dict[str, Any]:
+        """Return the model name and extra request arguments."""
+        return {**super().settings(), "model": self.model_name, **self.extra_args}
 
     def __call__(self, prompt: str) -> str:
         """Send the prompt to the OpenAI API and return the response text."""
-        if not self.api_key:
+        if not self.api_key and self.base_url == DEFAULT_BASE_URL:
             raise RuntimeError("OPENAI_API_KEY environment variable not set")
-        response = openai.ChatCompletion.create(
-            model=self.model_name,
-            messages=[{"role": "user", "content": prompt}],
-            **self.extra_args
-        )
+        payload = {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            **self.extra_args,
+        }
+        response = self._post("/chat/completions", payload)
         # Extract the content from the first choice
-        return response["choices"][0]["message"]["content"]
\ No newline at end of file
+        return response["choices"][0]["message"]["content"]
+
+    def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        body = json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        attempt = 0
+        while True:
+            conn = self._pool.acquire()
+            retry_after: Optional[float] = None
+            try:
+                conn.request("POST", self._pool.path + path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as exc:
+                # Timeouts, resets and stale keep-alive connections.
+                conn.close()
+                error = OpenAIRequestError(f"Request to {self.base_url} failed: {exc}")
+            else:
+                if response.will_close:
+                    conn.close()
+                else:
+                    self._pool.release(conn)
+                if response.status < 300:
+                    return json.loads(data)
+                error = OpenAIRequestError(
+                    f"{self.base_url} returned {response.status}: {data[:200].decode('utf-8', 'replace')}",
+                    status=response.status,
+                )
+                if response.status not in _RETRY_STATUSES:
+                    raise error
+                retry_after = _parse_retry_after(response.getheader("Retry-After"))
+            if attempt == self.max_retries:
+                raise error
+            delay = min(self.backoff * 2**attempt, self.max_backoff) * random.uniform(0.5, 1.0)
+            time.sleep(max(delay, retry_after or 0.0))
+            attempt += 1
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self._pool.close()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Connections cannot be pickled; a copy opens its own.
+        state = self.__dict__.copy()
+        del state["_pool"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._pool = _ConnectionPool(self.base_url, self.max_concurrency, self.timeout)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
@@ -0,0 +1,239 @@
+"""Tolerant parsing of LLM responses.
+
+Models often wrap the JSON they were asked for in prose or Markdown code
+fences, so a bare ``json.loads`` throws away a response that was paid
+for. This module finds the first balanced JSON object in arbitrary text
+with a small scanner that jumps between structural characters (braces,
+quotes and backslashes) using regular expressions, so the Python loop
+runs per brace rather than per character. :class:`StreamingJSONParser`
+runs the same scanner over streamed chunks and returns the object as
+soon as it closes.
+
+Decoded objects are checked against a :class:`ResponseSchema` compiled
+once at import time, which fills in missing fields and coerces
+near-misses (such as a plain string for ``perceived_environment``)
+instead of rejecting them. A well-formed response is decoded with a
+single ``json.loads`` call and no exception handling; exceptions are
+only caught for text that looks like JSON but is not.
+"""
+
+import json
+import re
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+_OUTSIDE = re.compile(r'[{}"]')
+_INSIDE = re.compile(r'["\\]')
+
+# A field's accepted types, the factory of its default value and a
+# function coercing a value of another type (returning None to reject).
+FieldSpec = Tuple[Tuple[type, ...], Callable[[], Any], Callable[[Any], Any]]
+
+
+class _Scanner:
+    """Incremental scanner for the extent of one balanced JSON object."""
+
+    __slots__ = ("start", "depth", "in_string", "pos")
+
+    def __init__(self, pos: int = 0) -> None:
+        self.start = -1
+        self.depth = 0
+        self.in_string = False
+        self.pos = pos
+
+    def scan(self, text: str) -> int:
+        """Scan ``text`` from the saved position.
+
+        Returns:
+            The index just past the closing brace, or ``-1`` if the text
+            ends before the object does. The position is saved, so the
+            scan can continue once more text has arrived.
+        """
+        pos = self.pos
+        end = len(text)
+        while pos < end:
+            if self.in_string:
+                match = _INSIDE.search(text, pos)
+                if match is None:
+                    pos = end
+                    break
+                pos = match.end()
+                if match.group() == "\\":
+                    if pos == end:
+                        # The escaped character has not arrived yet.
+                        pos -= 1
+                        break
+                    pos += 1
+                else:
+                    self.in_string = False
+                continue
+            match = _OUTSIDE.search(text, pos)
+            if match is None:
+                pos = end
+                break
+            char = match.group()
+            pos = match.end()
+            if char == "{":
+                if self.depth == 0:
+                    self.start = match.start()
+                self.depth += 1
+            elif self.depth == 0:
+                # Quotes and stray braces in the surrounding prose.
+                continue
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.pos = pos
+                    return pos
+            else:
+                self.in_string = True
+        self.pos = pos
+        return -1
+
+
+def _decode(candidate: str, schema: Optional["ResponseSchema"]) -> Optional[Dict[str, Any]]:
+    try:
+        obj = json.loads(candidate)
+    except ValueError:
+        # Balanced but not JSON, e.g. single quotes or trailing commas.
+        return None
+    if schema is not None:
+        return schema.validate(obj)
+    return obj if isinstance(obj, dict) else None
+
+
+class ResponseSchema:
+    """A precompiled, coercing validator for response objects.
+
+    Args:
+        fields: For each expected key, its accepted types, the factory of
+            its default value and a coercion for other types.
+    """
+
+    def __init__(self, fields: Dict[str, FieldSpec]) -> None:
+        self._fields = tuple((name, types, default, coerce) for name, (types, default, coerce) in fields.items())
+        self._names = frozenset(fields)
+
+    def validate(self, obj: Any) -> Optional[Dict[str, Any]]:
+        """Return ``obj`` with every field present and well typed.
+
+        Returns:
+            The normalised object, or ``None`` if ``obj`` is not an object
+            with at least one expected key or a field cannot be coerced.
+        """
+        if not isinstance(obj, dict) or self._names.isdisjoint(obj):
+            return None
+        result = dict(obj)
+        for name, types, default, coerce in self._fields:
+            value = obj.get(name)
+            if value is None:
+                result[name] = default()
+            elif not isinstance(value, types):
+                value = coerce(value)
+                if value is None:
+                    return None
+                result[name] = value
+        return result
+
+
+def _perception_from(value: Any) -> Optional[Dict[str, Any]]:
+    return {"description": value} if isinstance(value, str) else None
+
+
+#: Schema of the responses the controller asks for.
+RESPONSE_SCHEMA = ResponseSchema(
+    {
+        "qubit_update": ((str,), str, lambda value: None if isinstance(value, (dict, list)) else str(value)),
+        "perceived_environment": ((dict,), dict, _perception_from),
+    }
+)
+
+
+def extract_json(text: str, schema: Optional[ResponseSchema] = None) -> Optional[Dict[str, Any]]:
+    """Return the first balanced JSON object in ``text`` that decodes.
+
+    Args:
+        text: Arbitrary model output.
+        schema: If given, objects that fail validation are skipped and
+            the validated object is returned.
+
+    Returns:
+        The object, or ``None`` if the text holds no suitable object.
+    """
+    stripped = text.strip()
+    if stripped[:1] == "{" and stripped[-1:] == "}":
+        # Fast path for bare JSON, the common case.
+        obj = _decode(stripped, schema)
+        if obj is not None:
+            return obj
+    scanner = _Scanner()
+    while True:
+        end = scanner.scan(text)
+        if end < 0:
+            return None
+        obj = _decode(text[scanner.start : end], schema)
+        if obj is not None:
+            return obj
+        # Not the response; look for the next object after this one.
+        scanner = _Scanner(scanner.start + 1)
+
+
+def iter_json_objects(text: str) -> Iterator[Dict[str, Any]]:
+    """Yield every top-level JSON object in ``text``, in order.
+
+    Balanced spans that do not decode are skipped, as in
+    :func:`extract_json`; objects nested in a yielded one are not
+    yielded separately.
+    """
+    scanner = _Scanner()
+    while True:
+        end = scanner.scan(text)
+        if end < 0:
+            return
+        obj = _decode(text[scanner.start : end], None)
+        if obj is not None:
+            yield obj
+            scanner = _Scanner(end)
+        else:
+            scanner = _Scanner(scanner.start + 1)
+
+
+class StreamingJSONParser:
+    """Find the first valid JSON object in a stream of text chunks.
+
+    Args:
+        schema: Schema objects must pass; any object if omitted.
+
+    Attributes:
+        result: The object once found, else ``None``.
+    """
+
+    def __init__(self, schema: Optional[ResponseSchema] = None) -> None:
+        self.schema = schema
+        self.result: Optional[Dict[str, Any]] = None
+        self._buffer = ""
+        self._scanner = _Scanner()
+
+    @property
+    def done(self) -> bool:
+        """Whether an object was found, so the stream may be closed."""
+        return self.result is not None
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """Scan one more chunk.
+
+        Returns:
+            The object as soon as it is complete, else ``None``.
+        """
+        if self.result is not None:
+            return self.result
+        self._buffer += chunk
+        while True:
+            end = self._scanner.scan(self._buffer)
+            if end < 0:
+                return None
+            start = self._scanner.start
+            obj = _decode(self._buffer[start:end], self.schema)
+            if obj is not None:
+                self.result = obj
+                return obj
+            self._scanner = _Scanner(start + 1)
@@ -3,53 +3,212 @@
 This module contains helper functions to assemble prompts for the LLM
 client from the environment and brain state. It also provides
 parsing helpers to interpret the model response.
+
+By default prompts are indented JSON, which is easy to read but costly:
+the probability matrix alone grows linearly with the qubit count. A
+:class:`PromptOptions` with ``compact`` set switches to minified keys
+(explained by a one-line legend), rounded probabilities, per-qubit
+summaries for large brains and an optional hard token budget, measured
+with the tokenizer-free :func:`estimate_tokens`.
 """
 
 import json
-from typing import Dict, Tuple
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .parsing import RESPONSE_SCHEMA, extract_json
+
+_INSTRUCTION = (
+    "Return a JSON object with keys: 'qubit_update' (string) "
+    "and 'perceived_environment' (an object describing the perceived "
+    "environment)."
+)
+
+# Short names used by compact prompts; other keys are kept as they are.
+_SHORT_KEYS = {
+    "agent_position": "ap",
+    "threat_position": "tp",
+    "size": "sz",
+    "measured_bits": "b",
+    "probabilities": "p",
+    "p_one": "p1",
+    "omitted_qubits": "om",
+}
+
+_LEGEND = {
+    "p": "per-qubit [P(0),P(1)]",
+    "p1": "per-qubit P(1)",
+    "om": "qubits left out",
+}
+
+# Words, up to three digits at a time, and single punctuation marks are
+# roughly one token each in common BPE vocabularies.
+_TOKEN_PIECES = re.compile(r" ?[A-Za-z]+|\d{1,3}|\s+|[^\sA-Za-z\d]")
+
 
+@dataclass
+class PromptOptions:
+    """How :func:`build_prompt` encodes the prompt.
 
-def build_prompt(env_state: Dict[str, any], brain_summary: Dict[str, any]) -> str:
+    Attributes:
+        compact: Use the compact encoding; all other options apply only
+            to it.
+        precision: Decimal places probabilities are rounded to.
+        summary_threshold: Above this many qubits, each qubit is
+            summarised by ``P(1)`` alone instead of both probabilities.
+        token_budget: Maximum estimated prompt size in tokens. Larger
+            prompts are shrunk by summarising, lowering precision and
+            finally leaving out trailing qubits; if even the fixed text
+            exceeds the budget, the smallest prompt is returned.
+    """
+
+    compact: bool = False
+    precision: int = 3
+    summary_threshold: int = 8
+    token_budget: Optional[int] = None
+
+
+def build_prompt(
+    env_state: Dict[str, any], brain_summary: Dict[str, any], options: Optional[PromptOptions] = None
+) -> str:
     """Build a string prompt from environment and brain summaries.
 
     Args:
         env_state: A dictionary describing the true environment state.
         brain_summary: A dictionary summarising the brain state (e.g., qubit
             measurement bits and probabilities).
+        options: Encoding options; the readable indented encoding if
+            omitted or not compact.
 
     Returns:
         A formatted prompt string for the LLM.
     """
+    if options is not None and options.compact:
+        return _build_compact_prompt(env_state, brain_summary, options)
     return (
         "You are a cognitive modeling assistant.\n"
         "True environment state (JSON):\n"
         f"{json.dumps(env_state, indent=2)}\n"
         "Brain summary (JSON):\n"
         f"{json.dumps(brain_summary, indent=2)}\n"
-        "Return a JSON object with keys: 'qubit_update' (string)
-        and 'perceived_environment' (an object describing the perceived
-        environment)."
+        f"{_INSTRUCTION}"
     )
 
 
+def _minify(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {_SHORT_KEYS.get(key, key): value for key, value in data.items()}
+
+
+def _compact_brain(
+    brain_summary: Dict[str, Any], precision: int, summarise: bool, keep: Optional[int]
+) -> Dict[str, Any]:
+    summary = dict(brain_summary)
+    probs = summary.pop("probabilities", None)
+    bits = summary.pop("measured_bits", None)
+    if bits is not None:
+        bits = np.asarray(bits)
+        summary["measured_bits"] = bits[..., :keep].tolist()
+    if probs is not None:
+        probs = np.asarray(probs, dtype=float)
+        if summarise:
+            summary["p_one"] = np.round(probs[..., :keep, 1], precision).tolist()
+        else:
+            summary["probabilities"] = np.round(probs[..., :keep, :], precision).tolist()
+        omitted = probs.shape[-2] - (probs.shape[-2] if keep is None else min(keep, probs.shape[-2]))
+        if omitted:
+            summary["omitted_qubits"] = omitted
+    return summary
+
+
+def _render_compact(env_state: Dict[str, Any], brain: Dict[str, Any]) -> str:
+    env_min, brain_min = _minify(env_state), _minify(brain)
+    used = [key for key in _SHORT_KEYS if key in env_state or key in brain]
+    legend = ",".join(
+        f"{_SHORT_KEYS[key]}={_LEGEND.get(_SHORT_KEYS[key], key)}" for key in used
+    )
+    separators = (",", ":")
+    return (
+        "You are a cognitive modeling assistant.\n"
+        f"Keys: {legend}\n"
+        f"Env: {json.dumps(env_min, separators=separators)}\n"
+        f"Brain: {json.dumps(brain_min, separators=separators)}\n"
+        f"{_INSTRUCTION}"
+    )
+
+
+def _build_compact_prompt(
+    env_state: Dict[str, Any], brain_summary: Dict[str, Any], options: PromptOptions
+) -> str:
+    probs = brain_summary.get("probabilities")
+    num_qubits = np.shape(probs)[-2] if probs is not None and np.ndim(probs) >= 2 else 0
+    summarise = num_qubits > options.summary_threshold
+    prompt = _render_compact(env_state, _compact_brain(brain_summary, options.precision, summarise, None))
+    budget = options.token_budget
+    if budget is None or estimate_tokens(prompt) <= budget:
+        return prompt
+
+    # Shrink step by step: P(1) only (P(0) is redundant), then coarser
+    # probabilities.
+    for precision in range(options.precision, 0, -1):
+        prompt = _render_compact(env_state, _compact_brain(brain_summary, precision, True, None))
+        if estimate_tokens(prompt) <= budget:
+            return prompt
+
+    # Finally leave out trailing qubits: the most that still fit.
+    precision = min(options.precision, 1)
+    low, high = 0, num_qubits
+    while low < high:
+        mid = (low + high + 1) // 2
+        candidate = _render_compact(env_state, _compact_brain(brain_summary, precision, True, mid))
+        if estimate_tokens(candidate) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    return _render_compact(env_state, _compact_brain(brain_summary, precision, True, low))
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly estimate the number of tokens in ``text`` without a tokenizer.
+
+    Words count as one token per four letters, digits as one token per
+    group of three and every punctuation mark as one token, which tracks
+    BPE tokenizers much better than a plain character count on the
+    number-heavy JSON in prompts. Good enough for budgets and statistics.
+    """
+    tokens = 0
+    for piece in _TOKEN_PIECES.findall(text):
+        if piece[-1].isalpha():
+            tokens += (len(piece.lstrip()) + 3) // 4
+        elif not piece.isspace() or len(piece) > 1:
+            tokens += 1
+    return tokens
+
+
 def parse_response(text: str) -> Dict[str, any]:
     """Parse the LLM response into a Python dictionary.
 
+    The response object is taken from anywhere in the text, so JSON
+    wrapped in prose or code fences is recovered (see
+    :mod:`ditlab.llm.parsing`).
+
     Args:
         text: The raw response text returned by the LLM.
 
     Returns:
         A dictionary with keys ``qubit_update`` and ``perceived_environment``.
     """
-    try:
-        return json.loads(text)
-    except json.JSONDecodeError:
-        # Fall back to an empty update and perceived environment
-        return {
-            "qubit_update": "",
-            "perceived_environment": {
-                "description": "unknown",
-                "threat_level": "unknown",
-                "self_state": "unknown",
-            },
-        }
\ No newline at end of file
+    response = extract_json(text, RESPONSE_SCHEMA)
+    if response is not None:
+        return response
+    # Fall back to an empty update and perceived environment
+    return {
+        "qubit_update": "",
+        "perceived_environment": {
+            "description": "unknown",
+            "threat_level": "unknown",
+            "self_state": "unknown",
+        },
+    }
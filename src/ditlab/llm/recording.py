@@ -0,0 +1,146 @@
+"""Record LLM exchanges and replay them without the model.
+
+:class:`RecordingLLMClient` wraps any client and appends every prompt and
+response to a JSON Lines file, one record per call. Each record carries
+the SHA-256 of its prompt, so :class:`ReplayLLMClient` can index the file
+in one pass and then answer each call with a dictionary lookup, in
+microseconds and without a network. Regression runs and load tests then
+see the responses the real model gave.
+
+A prompt that was recorded several times is replayed with its responses
+in the recorded order, the last one repeating, so runs against a
+non-deterministic model replay faithfully. Records also carry the
+recorded client's :meth:`~LLMClientBase.settings`, which the replay
+client reports as its own, so caches keep replays of different models
+apart.
+"""
+
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ditlab.io.logging import JSONLLogger
+
+from .client_base import LLMClientBase
+
+
+def prompt_key(prompt: str) -> str:
+    """Return the key under which recordings index ``prompt``."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class RecordingLLMClient(LLMClientBase):
+    """Forward calls to a client and record every exchange.
+
+    Args:
+        client: The client whose exchanges are recorded.
+        filepath: JSON Lines file the records are appended to.
+    """
+
+    def __init__(self, client: LLMClientBase, filepath: str) -> None:
+        self.client = client
+        self.uses_prompt = getattr(client, "uses_prompt", True)
+        self.logger = JSONLLogger(filepath)
+        self.recorded = 0
+        self._lock = threading.Lock()
+
+    def settings(self) -> Dict[str, Any]:
+        return self.client.settings()
+
+    def __call__(self, prompt: str) -> str:
+        response = self.client(prompt)
+        self._record(prompt, response)
+        return response
+
+    async def acall(self, prompt: str) -> str:
+        response = await self.client.acall(prompt)
+        self._record(prompt, response)
+        return response
+
+    def _record(self, prompt: str, response: str) -> None:
+        with self._lock:
+            self.logger.log(
+                {
+                    "index": self.recorded,
+                    "key": prompt_key(prompt),
+                    "settings": self.client.settings(),
+                    "prompt": prompt,
+                    "response": response,
+                }
+            )
+            self.recorded += 1
+
+
+class ReplayLLMClient(LLMClientBase):
+    """Serve responses from a recording made by :class:`RecordingLLMClient`.
+
+    Args:
+        filepath: The recording to replay.
+        fallback: Client asked for prompts missing from the recording;
+            a missing prompt raises :class:`KeyError` if omitted.
+
+    Attributes:
+        misses: Number of calls for prompts missing from the recording.
+
+    Raises:
+        ValueError: If the recording holds records made with different
+            settings.
+    """
+
+    def __init__(self, filepath: str, fallback: Optional[LLMClientBase] = None) -> None:
+        self.fallback = fallback
+        self.misses = 0
+        self._responses: Dict[str, List[str]] = {}
+        self._served: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._settings: Optional[Dict[str, Any]] = None
+        with Path(filepath).open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self._responses.setdefault(record["key"], []).append(record["response"])
+                    settings = record.get("settings")
+                    if settings is None:
+                        continue
+                    if self._settings is None:
+                        self._settings = settings
+                    elif settings != self._settings:
+                        raise ValueError(f"{filepath} mixes records made with different settings.")
+
+    def settings(self) -> Dict[str, Any]:
+        # The recorded client's settings, so replays of different models
+        # never share a cache entry.
+        return dict(self._settings) if self._settings is not None else super().settings()
+
+    def __len__(self) -> int:
+        """Number of distinct recorded prompts."""
+        return len(self._responses)
+
+    def __call__(self, prompt: str) -> str:
+        key = prompt_key(prompt)
+        responses = self._responses.get(key)
+        if responses is None:
+            with self._lock:
+                self.misses += 1
+            if self.fallback is None:
+                raise KeyError(f"Prompt not in the recording: {prompt[:80]!r}")
+            return self.fallback(prompt)
+        with self._lock:
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+        return responses[min(served, len(responses) - 1)]
+
+    async def acall(self, prompt: str) -> str:
+        # Lookups are too cheap to be worth a worker thread.
+        if self.fallback is not None and prompt_key(prompt) not in self._responses:
+            with self._lock:
+                self.misses += 1
+            return await self.fallback.acall(prompt)
+        return self(prompt)
+
+    def rewind(self) -> None:
+        """Serve every prompt's responses from the first one again."""
+        with self._lock:
+            self._served.clear()
@@ -0,0 +1,219 @@
+"""Local stand-in for the OpenAI chat completions endpoint.
+
+:class:`StubChatServer` answers ``POST .../chat/completions`` like an
+OpenAI-compatible API, after a delay drawn from a configurable latency
+distribution and with a configurable fraction of rate-limit and server
+errors. Pointing :class:`~ditlab.llm.openai_client.OpenAIClient` at it
+(``base_url=server.url``) lets the controller, the API and the client's
+pooling and retries be benchmarked offline.
+
+It can also be run from the command line::
+
+    python -m ditlab.llm.stub_server --port 8001 --latency lognormal:0.3,0.5 --error-rate 0.05
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+# Draws one latency in seconds from the given random stream.
+LatencyFn = Callable[[random.Random], float]
+
+# Builds the reply content from the prompt.
+ReplyFn = Callable[[str], str]
+
+DEFAULT_REPLY = json.dumps(
+    {
+        "qubit_update": "decohere",
+        "perceived_environment": {"description": "stub", "threat_level": "unknown", "self_state": "unknown"},
+    }
+)
+
+
+def constant(seconds: float) -> LatencyFn:
+    """Always wait ``seconds``."""
+    return lambda rng: seconds
+
+
+def uniform(low: float, high: float) -> LatencyFn:
+    """Wait a uniformly distributed time between ``low`` and ``high``."""
+    return lambda rng: rng.uniform(low, high)
+
+
+def lognormal(median: float, sigma: float) -> LatencyFn:
+    """Wait a log-normally distributed time, with a long tail like real APIs."""
+    return lambda rng: median * rng.lognormvariate(0.0, sigma)
+
+
+def parse_latency(spec: str) -> LatencyFn:
+    """Parse ``"0.2"``, ``"uniform:0.1,0.3"`` or ``"lognormal:0.3,0.5"``."""
+    kind, _, args = spec.partition(":")
+    if not args:
+        return constant(float(kind))
+    params = [float(x) for x in args.split(",")]
+    factories: Dict[str, Callable[..., LatencyFn]] = {
+        "constant": constant,
+        "uniform": uniform,
+        "lognormal": lognormal,
+    }
+    if kind not in factories:
+        raise ValueError(f"Unknown latency distribution: {kind}")
+    return factories[kind](*params)
+
+
+class StubChatServer:
+    """An OpenAI-compatible chat endpoint on a background thread.
+
+    Args:
+        host: Interface to listen on.
+        port: Port to listen on; ``0`` picks a free one.
+        latency: Distribution of the response delay; none if omitted.
+        error_rate: Fraction of requests answered with an error.
+        error_statuses: Statuses errors are drawn from.
+        reply: Builds the reply content from the prompt; a fixed valid
+            DIT Lab response if omitted.
+        seed: Seed of the latency and error draws.
+
+    Attributes:
+        requests: Number of requests received.
+        errors: Number of requests answered with an error.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: Optional[LatencyFn] = None,
+        error_rate: float = 0.0,
+        error_statuses: Sequence[int] = (429, 500, 503),
+        reply: Optional[ReplyFn] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.reply = reply if reply is not None else (lambda prompt: DEFAULT_REPLY)
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL to pass to an OpenAI-compatible client."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _draw(self) -> Tuple[float, int]:
+        with self._lock:
+            self.requests += 1
+            delay = max(self.latency(self._rng), 0.0) if self.latency is not None else 0.0
+            status = 200
+            if self.error_rate and self._rng.random() < self.error_rate:
+                status = self._rng.choice(self.error_statuses)
+                self.errors += 1
+        return delay, status
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this,
+            # Nagle and delayed ACKs add ~40 ms to every keep-alive reply.
+            disable_nagle_algorithm = True
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": "not found"}})
+                    return
+                delay, status = server._draw()
+                time.sleep(delay)
+                if status != 200:
+                    self._send(status, {"error": {"message": "injected error"}}, retry_after="0")
+                    return
+                prompt = body.get("messages", [{}])[-1].get("content", "")
+                content = server.reply(prompt)
+                self._send(
+                    200,
+                    {
+                        "object": "chat.completion",
+                        "model": body.get("model", "stub"),
+                        "choices": [
+                            {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                        ],
+                    },
+                )
+
+            def _send(self, status: int, payload: Dict[str, Any], retry_after: Optional[str] = None) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if retry_after is not None:
+                    self.send_header("Retry-After", retry_after)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+    def serve_forever(self) -> None:
+        """Serve on the calling thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def start(self) -> "StubChatServer":
+        """Serve on a daemon thread and return the server."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubChatServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", default="0", help="E.g. 0.2, uniform:0.1,0.3 or lognormal:0.3,0.5.")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    server = StubChatServer(
+        args.host, args.port, latency=parse_latency(args.latency), error_rate=args.error_rate, seed=args.seed
+    )
+    print(f"Serving a stub chat endpoint at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
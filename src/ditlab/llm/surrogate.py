@@ -0,0 +1,270 @@
+"""A local surrogate for the LLM, distilled from recorded exchanges.
+
+Most responses are a function of a small, discrete part of the prompt:
+the agent and threat positions, other environment readings and the
+measured bits. :class:`SurrogateLLMClient` reduces every prompt to such
+a feature key (floats are binned, probabilities ignored) and keeps a
+table of the responses seen for each key, learned from recordings made
+by :class:`~ditlab.llm.recording.RecordingLLMClient` or online from the
+wrapped client.
+
+A call is answered locally when the key's most common response accounts
+for at least ``min_confidence`` of at least ``min_support`` observations.
+Otherwise the nearest key with the same non-numeric features (L1
+distance over numeric features and bits) is used if it is within
+``max_distance`` and confident itself. Anything else is deferred to the
+real client. The counters and :meth:`SurrogateLLMClient.stats` expose
+how often each path is taken.
+"""
+
+import json
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .client_base import LLMClientBase
+from .parsing import iter_json_objects
+
+# A discretised prompt: sorted (name, value) pairs.
+FeatureKey = Tuple[Tuple[str, Any], ...]
+
+
+def prompt_features(prompt: str, float_step: float = 0.1) -> Optional[FeatureKey]:
+    """Reduce a prompt to its discretised feature key.
+
+    The first JSON object in the prompt is taken as the environment state
+    and the second as the brain summary, which holds for both the
+    indented and the compact encodings of
+    :func:`~ditlab.llm.prompts.build_prompt`.
+
+    Args:
+        prompt: The prompt text.
+        float_step: Width of the bins floats are rounded into; a float
+            feature is the index of its bin.
+
+    Returns:
+        The key, or ``None`` if the prompt holds no environment object.
+    """
+    objects = iter_json_objects(prompt)
+    env = next(objects, None)
+    if env is None:
+        return None
+    brain = next(objects, {})
+    features: List[Tuple[str, Any]] = []
+    for name, value in env.items():
+        if isinstance(value, (bool, int, str)):
+            features.append((name, value))
+        elif isinstance(value, float):
+            features.append((name, round(value / float_step)))
+    bits = brain.get("measured_bits", brain.get("b"))
+    if bits is not None:
+        features.append(("bits", tuple(np.ravel(bits).astype(int).tolist())))
+    return tuple(sorted(features))
+
+
+def _split(key: FeatureKey) -> Tuple[FeatureKey, np.ndarray]:
+    # Non-numeric features, which must match exactly, and the numeric
+    # ones (bits expanded) as a vector.
+    fixed: List[Tuple[str, Any]] = []
+    numeric: List[float] = []
+    for name, value in key:
+        if isinstance(value, tuple):
+            fixed.append((name, len(value)))
+            numeric.extend(value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            fixed.append((name, None))
+            numeric.append(value)
+        else:
+            fixed.append((name, value))
+    return tuple(fixed), np.asarray(numeric, dtype=float)
+
+
+class _Group:
+    """Keys sharing one signature of non-numeric features, with their vectors.
+
+    Vectors are stored in an array that doubles when full, so adding a key
+    costs amortised constant time.
+    """
+
+    __slots__ = ("keys", "vectors")
+
+    def __init__(self, width: int) -> None:
+        self.keys: List[FeatureKey] = []
+        self.vectors = np.empty((4, width))
+
+    def add(self, key: FeatureKey, vector: np.ndarray) -> None:
+        size = len(self.keys)
+        if size == self.vectors.shape[0]:
+            grown = np.empty((2 * size, self.vectors.shape[1]))
+            grown[:size] = self.vectors
+            self.vectors = grown
+        self.vectors[size] = vector
+        self.keys.append(key)
+
+    def view(self) -> Tuple[np.ndarray, List[FeatureKey]]:
+        # Rows below the current size are never written again, so the
+        # view stays valid while other threads add keys.
+        size = len(self.keys)
+        return self.vectors[:size], self.keys[:size]
+
+
+class SurrogateLLMClient(LLMClientBase):
+    """Answer from a learned table when confident, else ask ``client``.
+
+    Args:
+        client: The real client, asked when the surrogate is not
+            confident; with ``None`` such calls raise :class:`KeyError`.
+        min_confidence: Share of a key's observations its most common
+            response needs to be answered locally.
+        min_support: Observations a key needs to be answered locally.
+        max_distance: Largest L1 feature distance at which the nearest
+            neighbour's answer is used, with floats measured in bins;
+            ``0`` disables the fallback.
+        float_step: Width of the bins floats are rounded into.
+        learn: Add the real client's answers to the table.
+
+    Attributes:
+        table_hits: Calls answered from the key's own entry.
+        neighbour_hits: Calls answered from the nearest neighbour.
+        deferred: Calls passed to the real client.
+    """
+
+    def __init__(
+        self,
+        client: Optional[LLMClientBase] = None,
+        min_confidence: float = 0.9,
+        min_support: int = 3,
+        max_distance: float = 1.0,
+        float_step: float = 0.1,
+        learn: bool = True,
+    ) -> None:
+        self.client = client
+        self.min_confidence = min_confidence
+        self.min_support = min_support
+        self.max_distance = max_distance
+        self.float_step = float_step
+        self.learn = learn
+        self.table_hits = self.neighbour_hits = self.deferred = 0
+        self._table: Dict[FeatureKey, Counter] = {}
+        # Keys grouped by signature for the nearest-neighbour search.
+        self._groups: Dict[FeatureKey, _Group] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_recording(
+        cls, filepath: str, client: Optional[LLMClientBase] = None, **kwargs: Any
+    ) -> "SurrogateLLMClient":
+        """Train a surrogate on a recording made by ``RecordingLLMClient``.
+
+        Args:
+            filepath: The JSON Lines recording.
+            client: The real client for calls the surrogate defers.
+            **kwargs: Further constructor arguments.
+        """
+        surrogate = cls(client, **kwargs)
+        with Path(filepath).open(encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    surrogate.observe(record["prompt"], record["response"])
+        return surrogate
+
+    def __len__(self) -> int:
+        """Number of distinct feature keys learned."""
+        return len(self._table)
+
+    def observe(self, prompt: str, response: str) -> None:
+        """Learn one prompt and the response the real model gave."""
+        key = prompt_features(prompt, self.float_step)
+        if key is None:
+            return
+        with self._lock:
+            counts = self._table.get(key)
+            if counts is None:
+                counts = self._table[key] = Counter()
+                fixed, vector = _split(key)
+                group = self._groups.get(fixed)
+                if group is None:
+                    group = self._groups[fixed] = _Group(len(vector))
+                group.add(key, vector)
+            counts[response] += 1
+
+    def _confident(self, counts: Counter) -> Optional[str]:
+        response, count = counts.most_common(1)[0]
+        total = sum(counts.values())
+        if total >= self.min_support and count / total >= self.min_confidence:
+            return response
+        return None
+
+    def _nearest(self, key: FeatureKey) -> Optional[Counter]:
+        fixed, vector = _split(key)
+        with self._lock:
+            group = self._groups.get(fixed)
+            if group is None:
+                return None
+            vectors, keys = group.view()
+        distances = np.abs(vectors - vector).sum(axis=1)
+        best = int(np.argmin(distances))
+        return self._table[keys[best]] if distances[best] <= self.max_distance else None
+
+    def predict(self, prompt: str) -> Optional[str]:
+        """Return the local answer for ``prompt``, or ``None`` to defer.
+
+        Counts a table hit, a neighbour hit or a deferral.
+        """
+        key = prompt_features(prompt, self.float_step)
+        response = None
+        if key is not None:
+            with self._lock:
+                counts = self._table.get(key)
+                if counts is not None:
+                    response = self._confident(counts)
+                    if response is not None:
+                        self.table_hits += 1
+            if counts is None and self.max_distance > 0 and self._table:
+                neighbour = self._nearest(key)
+                if neighbour is not None:
+                    with self._lock:
+                        response = self._confident(neighbour)
+                        if response is not None:
+                            self.neighbour_hits += 1
+        if response is None:
+            with self._lock:
+                self.deferred += 1
+        return response
+
+    def __call__(self, prompt: str) -> str:
+        response = self.predict(prompt)
+        if response is not None:
+            return response
+        if self.client is None:
+            raise KeyError("The surrogate is not confident and has no client to defer to.")
+        response = self.client(prompt)
+        if self.learn:
+            self.observe(prompt, response)
+        return response
+
+    async def acall(self, prompt: str) -> str:
+        response = self.predict(prompt)
+        if response is not None:
+            return response
+        if self.client is None:
+            raise KeyError("The surrogate is not confident and has no client to defer to.")
+        response = await self.client.acall(prompt)
+        if self.learn:
+            self.observe(prompt, response)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the answer counters and the fallback rate."""
+        total = self.table_hits + self.neighbour_hits + self.deferred
+        return {
+            "keys": len(self._table),
+            "table_hits": self.table_hits,
+            "neighbour_hits": self.neighbour_hits,
+            "deferred": self.deferred,
+            "fallback_rate": self.deferred / total if total else 0.0,
+        }
@@ -1,5 +1,5 @@
 """Utility functions and helpers for DIT Lab."""
 
-from .random_seed import set_random_seed  # noqa: F401
+from .random_seed import set_random_seed, make_rng, spawn_rng, keyed_rng  # noqa: F401
 
-__all__ = ["set_random_seed"]
\ No newline at end of file
+__all__ = ["set_random_seed", "make_rng", "spawn_rng", "keyed_rng"]
@@ -1,10 +1,17 @@
 """Basic tests for the brain module."""
 
+from copy import deepcopy
+
 import numpy as np
 from ditlab.brain.qubits import QubitBrainState
+from ditlab.brain.batched import BatchedBrainState
+from ditlab.brain.compact import CompactQubitBrainState
+from ditlab.brain.entangled import EntangledBrainState
 from ditlab.brain.dynamics import apply_qubit_update
+from ditlab.brain.instructions import compile_instruction
 from ditlab.brain.perception import generate_perception
-from ditlab.brain.metrics import compute_entropy
+from ditlab.brain.metrics import compute_entropy, MetricsEngine
+from ditlab.util.random_seed import make_rng
 
 
 def test_qubit_initialisation() -> None:
@@ -31,4 +38,103 @@ def test_perception_generation() -> None:
 def test_entropy_computation() -> None:
     state = QubitBrainState.init_random(2)
     entropy = compute_entropy(state)
-    assert entropy >= 0.0
\ No newline at end of file
+    assert entropy >= 0.0
+
+
+def test_batched_brain() -> None:
+    batch = BatchedBrainState.init_random(batch_size=5, num_qubits=3)
+    assert batch.amplitudes.shape == (5, 3, 2)
+    assert np.allclose(np.linalg.norm(batch.amplitudes, axis=-1), 1.0)
+    bits, probs = batch.measure()
+    assert bits.shape == (5, 3)
+    assert probs.shape == (5, 3, 2)
+    updated = apply_qubit_update(batch, "bias towards state 1")
+    assert isinstance(updated, BatchedBrainState)
+    assert np.allclose(np.linalg.norm(updated.amplitudes, axis=-1), 1.0)
+    entropies = compute_entropy(batch)
+    assert entropies.shape == (5,)
+    assert np.isclose(entropies[2], compute_entropy(batch[2]))
+
+
+def test_compiled_update_program() -> None:
+    program = compile_instruction("Bias towards state 1, then Hadamard")
+    # The scaling and the gate are fused into one operation.
+    assert len(program.ops) == 1
+    assert compile_instruction("Bias towards state 1, then Hadamard") is program
+    state = QubitBrainState.init_random(3)
+    updated = apply_qubit_update(state, "bias towards state 1 and hadamard")
+    assert np.allclose(np.linalg.norm(updated.amplitudes, axis=1), 1.0)
+    # No-op instructions return the state untouched, without a copy.
+    assert apply_qubit_update(state, "none") is state
+
+
+def test_brain_random_streams_are_reproducible() -> None:
+    first = QubitBrainState.init_random(4, rng=make_rng(7))
+    second = QubitBrainState.init_random(4, rng=make_rng(7))
+    assert np.array_equal(first.amplitudes, second.amplitudes)
+    # A deep copy freezes the stream position, so it replays the same draws.
+    frozen = deepcopy(first)
+    bits, _ = first.measure()
+    replayed, _ = frozen.measure()
+    assert np.array_equal(bits, replayed)
+    assert np.array_equal(bits, second.measure()[0])
+
+
+def test_multi_shot_measurement() -> None:
+    state = QubitBrainState.init_random(3)
+    bits, probs = state.measure(shots=500)
+    assert bits.shape == (500, 3)
+    # Probabilities are cached until the amplitudes change.
+    assert state.probabilities() is probs
+    counts = state.sample_counts(200)
+    assert sum(counts.values()) == 200
+    assert all(len(key) == 3 for key in counts)
+    state.amplitudes = state.amplitudes[:, ::-1].copy()
+    assert state.probabilities() is not probs
+    assert "threat_level" in generate_perception(state, shots=50)
+
+
+def test_compact_brain_updates_in_place() -> None:
+    state = CompactQubitBrainState.init_random(4)
+    assert state.amplitudes.dtype == np.complex64
+    buffer = state.amplitudes
+    updated = apply_qubit_update(state, "bias towards state 1, hadamard, decohere")
+    assert updated is state
+    assert state.amplitudes is buffer
+    assert np.allclose(np.linalg.norm(state.amplitudes, axis=1), 1.0, atol=1e-5)
+    snapshot = deepcopy(state)
+    assert snapshot.amplitudes is not buffer
+    assert np.array_equal(snapshot.measure()[0], state.measure()[0])
+
+
+def test_entangled_backends_agree() -> None:
+    brains = [QubitBrainState.init_random(3) for _ in range(2)]
+    dense = EntangledBrainState.from_brains(*brains)
+    mps = EntangledBrainState.from_brains(*brains, max_dense_qubits=2)
+    assert (dense.backend, mps.backend) == ("dense", "mps")
+    for state in (dense, mps):
+        state.entangle(0, 3, 0.8)
+        state.entangle(4, 1, 0.5)
+    assert np.allclose(dense.to_dense(), mps.to_dense())
+    assert np.allclose(dense.marginal_probabilities(), mps.marginal_probabilities())
+    bits, probs = mps.measure(shots=10)
+    assert bits.shape == (10, 6)
+    assert probs.shape == (6, 2)
+    assert dense.copy().measure()[0].shape == (6,)
+
+
+def test_metrics_engine_rolling_statistics() -> None:
+    engine = MetricsEngine(window=3)
+    batch = BatchedBrainState.init_random(batch_size=4, num_qubits=2)
+    history = []
+    for instruction in ["decohere", "bias towards state 1", "decohere", "hadamard"]:
+        batch = apply_qubit_update(batch, instruction)
+        values = engine.update(batch)
+        history.append(values["entropy"])
+    assert values["bias"].shape == (4, 2)
+    assert np.allclose(values["entropy"], compute_entropy(batch))
+    mean, var = engine.rolling()["entropy"]
+    assert np.allclose(mean, np.mean(history[-3:], axis=0))
+    assert np.allclose(var, np.var(history[-3:], axis=0))
+    single = engine.compute(batch[0])
+    assert np.isclose(single["purity"], values["purity"][0])
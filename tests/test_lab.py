@@ -1,9 +1,32 @@
 """Basic tests for the lab controller."""
 
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+
+import numpy as np
+import pytest
+
 from ditlab.env.simple_1d import Simple1DEnvironment
 from ditlab.brain.qubits import QubitBrainState
+from ditlab.brain.dynamics import apply_qubit_update
+from ditlab.brain.metrics import compute_entropy
 from ditlab.llm.client_base import LLMClientBase
+from ditlab.config.schemas import LabConfig
+from ditlab.lab.async_controller import AsyncSimulationController, run_concurrently
+from ditlab.lab.cadence import ThreatDistanceChange
+from ditlab.lab.columnar import ColumnarTimeline
 from ditlab.lab.controller import SimulationController
+from ditlab.lab.experiments import Experiment
+from ditlab.lab.multiverse import Multiverse
+from ditlab.lab.pipeline import run_pipelined
+from ditlab.lab.profiling import StepProfiler
+from ditlab.lab.state import SnapshotManager
+from ditlab.lab.sweeps import SweepRunner, expand_grid, sample_random
+from ditlab.util.random_seed import make_rng
 
 
 class DummyLLM(LLMClientBase):
@@ -18,4 +41,435 @@ def test_simulation_step() -> None:
     controller = SimulationController(env, brain, llm)
     env_state, perceived = controller.step_once(action="right")
     assert env_state.agent_position == 1
-    assert isinstance(perceived, dict)
\ No newline at end of file
+    assert isinstance(perceived, dict)
+
+
+def test_snapshot_replays_brain_random_stream() -> None:
+    env = Simple1DEnvironment(size=5)
+    brain = QubitBrainState.init_random(3, rng=make_rng(11))
+    controller = SimulationController(env, brain, DummyLLM(), rng=make_rng(12))
+    controller.step_once(action="right")
+    snapshot = controller.snapshots.rewind(0)
+    expected, _ = controller.brain.measure()
+    replayed, _ = snapshot.brain_state.measure()
+    assert (expected == replayed).all()
+
+
+def test_delta_snapshots_spill_and_rebuild(tmp_path) -> None:
+    env = Simple1DEnvironment(size=5)
+    brain = QubitBrainState.init_random(3, rng=make_rng(3))
+    manager = SnapshotManager(keyframe_interval=4, max_bytes=4000, spill_dir=str(tmp_path))
+    expected = []
+    for t in range(40):
+        env_state = env.step("right" if t % 3 else "left")
+        brain = apply_qubit_update(brain, "decohere" if t % 2 else "none")
+        manager.save(env_state, brain, t)
+        expected.append((deepcopy(env_state), brain.amplitudes.copy()))
+    assert manager.store.spilled_segments > 0
+    assert manager.store.nbytes <= 4000
+    for index in (0, 5, 22, 39):
+        snapshot = manager.rewind(index)
+        assert snapshot.time_step == index
+        assert snapshot.env_state == expected[index][0]
+        assert np.array_equal(snapshot.brain_state.amplitudes, expected[index][1])
+
+
+def test_branching_shares_history() -> None:
+    env = Simple1DEnvironment(size=5)
+    brain = QubitBrainState.init_random(2)
+    manager = SnapshotManager()
+    for t in range(5):
+        manager.save(env.step("right"), brain, t)
+    fork = manager.path()[2].node_id
+    for _ in range(3):
+        manager.branch(fork)
+        manager.save(env.step("left"), brain, 3)
+    assert len(manager) == 8
+    assert len(manager.leaves()) == 4
+    # Every branch shares the first three snapshots with the original.
+    branch_path = manager.path()
+    assert [n.node_id for n in branch_path[:3]] == [n.node_id for n in manager.path(4)[:3]]
+    assert manager.rewind(1).time_step == 1
+    assert manager.checkout(4).time_step == 4
+
+
+def test_branch_streams_depend_on_branch_point() -> None:
+    def manager_with_history() -> SnapshotManager:
+        env = Simple1DEnvironment(size=5)
+        manager = SnapshotManager(rng=make_rng(21))
+        for t in range(5):
+            manager.save(env.step("right"), QubitBrainState.init_random(2, rng=make_rng(t)), t)
+        return manager
+
+    first, second = manager_with_history(), manager_with_history()
+    first.branch(1)
+    stream = first.branch(3).random(4)
+    # Branches elsewhere in the tree do not shift the stream of node 3.
+    assert np.array_equal(second.branch(3).random(4), stream)
+    # Siblings from the same node still diverge.
+    assert not np.array_equal(second.branch(3).random(4), stream)
+
+
+class NoisyLLM(LLMClientBase):
+    def __call__(self, prompt: str) -> str:
+        return '{"qubit_update": "decohere", "perceived_environment": {}}'
+
+
+def test_rewind_replays_from_sparse_checkpoints() -> None:
+    controller = SimulationController(
+        Simple1DEnvironment(size=5), QubitBrainState.init_random(3, rng=make_rng(3)), NoisyLLM(),
+        checkpoint_interval=4,
+    )
+    actions = ["right", "left", "right", "stay"] * 3
+    states = []
+    for action in actions:
+        states.append((deepcopy(controller.env.state), controller.brain.amplitudes.copy()))
+        controller.step_once(action)
+    assert sorted(controller.replay.checkpoints) == [0, 4, 8]
+    assert len(controller.snapshots) == 0
+
+    controller.llm = None  # replay must not call the LLM
+    for step in (10, 3, 7):
+        restored = controller.rewind_to(step)
+        assert restored.time_step == step
+        assert restored.env_state == states[step][0]
+        assert np.array_equal(restored.brain_state.amplitudes, states[step][1])
+
+    # Continuing after a rewind overwrites the old future.
+    controller.llm = NoisyLLM()
+    controller.step_once("left")
+    assert len(controller.replay) == 8
+    assert sorted(controller.replay.checkpoints) == [0, 4]
+
+
+def test_columnar_timeline_matches_snapshots() -> None:
+    controller = SimulationController(
+        Simple1DEnvironment(size=5), QubitBrainState.init_random(2, rng=make_rng(5)), NoisyLLM(), columnar=True
+    )
+    for action in ["right", "right", "left", "stay", "right"]:
+        controller.step_once(action)
+    columns = controller.columns
+    assert len(columns) == 5
+    assert columns["agent_position"].tolist() == [1, 2, 1, 1, 2]
+    assert columns["time_step"].tolist() == [0, 1, 2, 3, 4]
+    assert columns.histogram("threat_distance", bins=[0, 4, 10])[0].tolist() == [2, 3]
+
+    rebuilt = ColumnarTimeline.from_snapshots(controller.snapshots)
+    assert np.array_equal(rebuilt.amplitudes, columns.amplitudes)
+    entropy = np.array([compute_entropy(controller.snapshots.state(i).brain_state) for i in range(5)])
+    assert np.allclose(columns.entropy(), entropy)
+    assert np.allclose(columns.metrics()["entropy"], entropy)
+    assert columns[1:3]["agent_position"].tolist() == [2, 1]
+
+
+def test_run_matches_step_once_and_calls_hooks() -> None:
+    class PromptlessLLM(NoisyLLM):
+        uses_prompt = False
+
+        def __call__(self, prompt: str) -> str:
+            assert prompt == ""
+            return super().__call__(prompt)
+
+    actions = ["right", "left", "right", "right", "stay", "left"]
+    stepped = SimulationController(
+        Simple1DEnvironment(size=5), QubitBrainState.init_random(2, rng=make_rng(9)), NoisyLLM()
+    )
+    for action in actions:
+        stepped.step_once(action)
+
+    controller = SimulationController(
+        Simple1DEnvironment(size=5), QubitBrainState.init_random(2, rng=make_rng(9)), PromptlessLLM()
+    )
+    seen = []
+    env_state, _ = controller.run(
+        10, actions=actions, hooks=[lambda c, env, perceived: seen.append(c.time_step)], hook_every=2
+    )
+    assert controller.time_step == 6
+    assert seen == [2, 4, 6]
+    assert env_state == stepped.env.state
+    assert np.array_equal(controller.brain.amplitudes, stepped.brain.amplitudes)
+    assert len(controller.snapshots) == 6
+
+    controller.run(5, snapshot_every=2)
+    assert len(controller.snapshots) == 9
+
+    # The last step is saved even when the actions run out early.
+    controller.run(100, actions=["left"] * 25, snapshot_every=10)
+    assert controller.time_step == 36
+    assert controller.snapshots.rewind(len(controller.snapshots) - 1).time_step == 35
+
+
+def test_repeated_responses_give_independent_perceptions() -> None:
+    controller = SimulationController(
+        Simple1DEnvironment(size=5), QubitBrainState.init_random(2, rng=make_rng(4)), DummyLLM()
+    )
+    _, first = controller.step_once("right")
+    first["threat_level"] = "high"
+    _, second = controller.step_once("right")
+    assert second["threat_level"] == "low"
+    assert second is not first
+    assert len(controller._parsed) == 1
+
+
+def _sweep_cell(config: LabConfig) -> int:
+    return config.brain.num_qubits * 100 + config.seed % 100
+
+
+def _other_sweep_cell(config: LabConfig) -> int:
+    return -_sweep_cell(config)
+
+
+def test_sweep_expands_configs_and_memoises(tmp_path) -> None:
+    configs = expand_grid(LabConfig(), {"brain.num_qubits": [2, 3], "environment.size": [5, 6, 7]})
+    assert [(c.brain.num_qubits, c.environment.size) for c in configs][:3] == [(2, 5), (2, 6), (2, 7)]
+    sampled = sample_random(LabConfig(), {"brain.num_qubits": (2, 4), "llm.temperature": (0.0, 1.0)}, 5, seed=1)
+    assert all(2 <= c.brain.num_qubits <= 4 and 0.0 <= c.llm.temperature < 1.0 for c in sampled)
+
+    runner = SweepRunner(_sweep_cell, max_workers=0, cache_dir=str(tmp_path))
+    first = list(runner.run(configs[:2], seeds=3, root_seed=0))
+    assert len(first) == 6 and not any(r.cached for r in first)
+    assert len({r.config.seed for r in first}) == 3
+
+    resumed = list(runner.run(configs[:3], seeds=3, root_seed=0))
+    assert sum(r.cached for r in resumed) == 6
+    assert {r.key: r.result for r in first}.items() <= {r.key: r.result for r in resumed}.items()
+
+    # Another run function does not pick up these results.
+    other = SweepRunner(_other_sweep_cell, max_workers=0, cache_dir=str(tmp_path))
+    assert not any(r.cached for r in other.run(configs[:1], seeds=3, root_seed=0))
+
+
+def test_async_controllers_step_concurrently_with_limit() -> None:
+    class SlowLLM(NoisyLLM):
+        in_flight = 0
+        peak = 0
+
+        async def acall(self, prompt: str) -> str:
+            SlowLLM.in_flight += 1
+            SlowLLM.peak = max(SlowLLM.peak, SlowLLM.in_flight)
+            await asyncio.sleep(0.01)
+            SlowLLM.in_flight -= 1
+            return self(prompt)
+
+    def make(cls, llm):
+        return [
+            cls(Simple1DEnvironment(size=5), QubitBrainState.init_random(2, rng=make_rng(s)), llm)
+            for s in range(12)
+        ]
+
+    controllers = make(AsyncSimulationController, SlowLLM())
+    results = asyncio.run(run_concurrently(controllers, 4, actions="right", max_concurrency=3))
+    assert SlowLLM.peak == 3
+    assert [env.agent_position for env, _ in results] == [4] * 12
+
+    for sync, done in zip(make(SimulationController, NoisyLLM()), controllers):
+        sync.run(4, actions="right")
+        assert np.array_equal(sync.brain.amplitudes, done.brain.amplitudes)
+
+    # The default acall runs sync clients in a thread; cancelling mid-step
+    # leaves every controller at a step boundary.
+    async def cancelled_run(controllers):
+        task = asyncio.ensure_future(run_concurrently(controllers, 100, max_concurrency=2))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    controllers = make(AsyncSimulationController, SlowLLM())
+    asyncio.run(cancelled_run(controllers))
+    for controller, fresh in zip(controllers, make(SimulationController, NoisyLLM())):
+        assert controller.time_step < 10
+        assert len(controller.snapshots) == controller.time_step
+        # Resuming reproduces an uninterrupted run.
+        controller.llm = NoisyLLM()
+        controller.run(10 - controller.time_step)
+        fresh.run(10)
+        assert np.array_equal(controller.brain.amplitudes, fresh.brain.amplitudes)
+
+
+def test_cancelled_async_step_restores_controller() -> None:
+    class HangingLLM(NoisyLLM):
+        hang = False
+
+        async def acall(self, prompt: str) -> str:
+            if HangingLLM.hang:
+                await asyncio.Event().wait()
+            return self(prompt)
+
+    profiler = StepProfiler()
+    controller = AsyncSimulationController(
+        Simple1DEnvironment(size=5), QubitBrainState.init_random(2, rng=make_rng(6)), HangingLLM(),
+        checkpoint_interval=1, profiler=profiler, cadence=ThreatDistanceChange(),
+    )
+    asyncio.run(controller.astep_once("left"))
+    distance = controller.cadence._distance
+    HangingLLM.hang = True
+
+    async def cancelled_step():
+        task = asyncio.ensure_future(controller.astep_once("right"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled_step())
+    assert controller.time_step == 1
+    assert controller.cadence._distance == distance
+    assert controller._pending_action == "left"
+    assert sorted(controller.replay.checkpoints) == [0]
+    assert profiler.summary()["steps"] == 1
+    assert profiler.summary()["phases"]["measure"]["count"] == 1
+
+
+def test_multiverse_fan_out_reports_divergence() -> None:
+    controller = SimulationController(
+        Simple1DEnvironment(size=5), QubitBrainState.init_random(2, rng=make_rng(2)), NoisyLLM()
+    )
+    controller.run(3, actions="right")
+    multiverse = Multiverse.from_controller(controller, node_id=0)
+    assert multiverse.time_step == 1 and multiverse.env.state.agent_position == 1
+
+    # Same random stream, different actions: only positions diverge.
+    fan = multiverse.fan_out(3, actions=[["right"] * 3, ["left"] * 3])
+    assert [b.final_env.agent_position for b in fan.branches] == [4, 0]
+    assert fan.branches[0].timeline["time_step"].tolist() == [1, 2, 3]
+    assert np.allclose(fan.divergence.position_spread, [1.0, 1.5, 2.0])
+    assert np.allclose(fan.divergence.entropy_spread, 0.0)
+    assert np.array_equal(fan.branches[0].final_brain.amplitudes, fan.branches[1].final_brain.amplitudes)
+    assert controller.env.state.agent_position == 3
+
+    # Different seeds: brains diverge; thread pool gives the same result.
+    fan = multiverse.fan_out(3, seeds=[1, 2, 3])
+    assert (fan.divergence.entropy_spread > 0).all()
+    assert (fan.divergence.perception_disagreement == 0).all()
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        pooled = multiverse.fan_out(3, seeds=[1, 2, 3], executor=pool)
+    assert np.array_equal(pooled.divergence.entropy_spread, fan.divergence.entropy_spread)
+
+
+def test_step_profiler_records_phases(tmp_path) -> None:
+    profiler = StepProfiler()
+    controller = SimulationController(
+        Simple1DEnvironment(size=5), QubitBrainState.init_random(2), NoisyLLM(), profiler=profiler
+    )
+    controller.step_once("right")
+    controller.run(4)
+    summary = profiler.summary()
+    assert summary["steps"] == 5
+    assert set(summary["phases"]) == {
+        "env_step", "measure", "build_prompt", "llm_call", "parse_response", "apply_update", "snapshot"
+    }
+    assert all(phase["count"] == 5 for phase in summary["phases"].values())
+
+    assert summary["tokens"]["prompt"] > summary["tokens"]["response"] > 0
+
+    path = tmp_path / "profile.jsonl"
+    profiler.dump_jsonl(str(path))
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["time_step"] for r in records] == [0, 1, 2, 3, 4]
+    assert records[0]["llm_call"] >= 0
+
+    # Without a profiler the controller reports nothing.
+    quiet = SimulationController(Simple1DEnvironment(size=5), QubitBrainState.init_random(2), NoisyLLM())
+    quiet.run(2)
+    assert quiet.profiler.summary()["steps"] == 0
+
+    # Steps replayed by a rewind are not profiled again.
+    replaying = StepProfiler()
+    controller = SimulationController(
+        Simple1DEnvironment(size=5), QubitBrainState.init_random(2), NoisyLLM(),
+        checkpoint_interval=8, profiler=replaying,
+    )
+    controller.run(20)
+    controller.rewind_to(19)
+    assert replaying.summary()["steps"] == 20
+    assert replaying.summary()["phases"]["measure"]["count"] == 20
+
+
+def test_cadence_skips_llm_between_events() -> None:
+    class CountingLLM(NoisyLLM):
+        calls = 0
+
+        def __call__(self, prompt: str) -> str:
+            CountingLLM.calls += 1
+            return '{"qubit_update": "decohere", "perceived_environment": {"step": %d}}' % CountingLLM.calls
+
+    config = LabConfig(cadence={"every_n": 4, "on_threat_distance_change": True}, checkpoint_interval=3, seed=4)
+    controller = Experiment(config=config, llm_client=CountingLLM()).create_controller()
+    actions = ["stay"] * 6 + ["right"] + ["stay"] * 5
+    perceived = [controller.step_once(action)[1] for action in actions]
+    # Calls on step 0, every 4 steps, and when the agent moves on step 6.
+    assert controller.llm_calls == CountingLLM.calls == 4
+    assert [p["step"] for p in perceived] == [1, 1, 1, 1, 2, 2, 3, 3, 3, 3, 4, 4]
+
+    # Replay reproduces local steps without calling the LLM.
+    amplitudes = controller.brain.amplitudes.copy()
+    controller.rewind_to(5)
+    controller.rewind_to(12)
+    assert np.array_equal(controller.brain.amplitudes, amplitudes)
+    assert CountingLLM.calls == 4
+
+
+def test_pipelined_run_matches_sequential_and_overlaps_llm() -> None:
+    class SleepyLLM(NoisyLLM):
+        lock = threading.Lock()
+        in_flight = 0
+        peak = 0
+
+        def __call__(self, prompt: str) -> str:
+            with SleepyLLM.lock:
+                SleepyLLM.in_flight += 1
+                SleepyLLM.peak = max(SleepyLLM.peak, SleepyLLM.in_flight)
+            time.sleep(0.01)
+            with SleepyLLM.lock:
+                SleepyLLM.in_flight -= 1
+            return super().__call__(prompt)
+
+    def make(llm):
+        return [
+            SimulationController(Simple1DEnvironment(size=5), QubitBrainState.init_random(2, rng=make_rng(s)), llm)
+            for s in range(8)
+        ]
+
+    actions = [["right", "left", "right", "stay", "right"]] * 8
+    pipelined = make(SleepyLLM())
+    envs = [controller.env for controller in pipelined]
+    results = run_pipelined(pipelined, 5, actions=actions, speculative=True)
+    assert SleepyLLM.peak > 1
+    assert [env.agent_position for env, _ in results] == [2] * 8
+    # Speculation copies the stepped state back; the environments stay put.
+    assert all(controller.env is env for controller, env in zip(pipelined, envs))
+    for sequential, done in zip(make(NoisyLLM()), pipelined):
+        for action in actions[0]:
+            sequential.step_once(action)
+        assert np.array_equal(sequential.brain.amplitudes, done.brain.amplitudes)
+        assert len(done.snapshots) == 5
+
+
+def test_pipelined_failure_leaves_controllers_at_step_boundaries() -> None:
+    class Boom(NoisyLLM):
+        def __call__(self, prompt: str) -> str:
+            raise RuntimeError("boom")
+
+    class SlowLLM(NoisyLLM):
+        def __call__(self, prompt: str) -> str:
+            time.sleep(0.05)
+            return super().__call__(prompt)
+
+    controllers = [
+        SimulationController(Simple1DEnvironment(size=5), QubitBrainState.init_random(2, rng=make_rng(s)), llm)
+        for s, llm in enumerate([Boom(), SlowLLM()])
+    ]
+    with pytest.raises(RuntimeError, match="boom"):
+        run_pipelined(controllers, 3, actions="right", speculative=True)
+    for seed, controller in enumerate(controllers):
+        assert controller.env.state.agent_position == controller.time_step
+        assert len(controller.snapshots) == controller.time_step
+        # Continuing reproduces an uninterrupted run.
+        fresh = SimulationController(
+            Simple1DEnvironment(size=5), QubitBrainState.init_random(2, rng=make_rng(seed)), NoisyLLM()
+        )
+        fresh.run(3, actions="right")
+        controller.llm = NoisyLLM()
+        controller.run(3 - controller.time_step, actions="right")
+        assert np.array_equal(controller.brain.amplitudes, fresh.brain.amplitudes)
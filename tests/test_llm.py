@@ -1,8 +1,21 @@
 """Basic tests for the LLM subpackage."""
 
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
 import pytest
 
+from ditlab.llm.cache import CachedLLMClient
 from ditlab.llm.client_base import LLMClientBase
+from ditlab.llm.openai_client import OpenAIClient, OpenAIRequestError
+from ditlab.llm.parsing import RESPONSE_SCHEMA, StreamingJSONParser, iter_json_objects
+from ditlab.llm.prompts import PromptOptions, build_prompt, estimate_tokens, parse_response
+from ditlab.llm.recording import RecordingLLMClient, ReplayLLMClient
+from ditlab.llm.stub_server import StubChatServer, uniform
+from ditlab.llm import surrogate as surrogate_module
+from ditlab.llm.surrogate import SurrogateLLMClient
 
 
 class TestClient(LLMClientBase):
@@ -21,4 +34,193 @@ def test_llm_abstract_base() -> None:
         pass
 
     with pytest.raises(TypeError):
-        Dummy()
\ No newline at end of file
+        Dummy()
+
+
+def test_cached_client_tiers_and_quantization(tmp_path) -> None:
+    class Counting(LLMClientBase):
+        calls = 0
+
+        def __call__(self, prompt: str) -> str:
+            Counting.calls += 1
+            return f"response {Counting.calls}"
+
+    db = str(tmp_path / "cache.sqlite")
+    cache = CachedLLMClient(Counting(), max_entries=1, db_path=db, quantize=2)
+    assert cache("p 0.501") == "response 1"
+    assert cache("p 0.499") == "response 1"  # both round to 0.50
+    assert cache("other") == "response 2"
+    # The first entry fell out of memory but is still on disk.
+    assert cache("p 0.5") == "response 1"
+    assert cache.stats()["disk_hits"] == 1
+    cache.close()
+
+    reopened = CachedLLMClient(Counting(), db_path=db, quantize=2, ttl=0.0)
+    assert reopened("other") == "response 3"  # expired
+    assert (reopened.hits, reopened.misses) == (0, 1)
+    reopened.close()
+
+    # Overflowing the disk cap evicts the least recently used tenth at once.
+    capped = CachedLLMClient(Counting(), max_entries=1, db_path=db, max_db_entries=10)
+    capped.clear()
+    for i in range(10):
+        capped.put(f"k{i}", "v")
+    assert capped.get("k0") == "v"  # from disk; its access time is buffered
+    capped.put("k10", "v")
+    capped.close()
+    survivors = CachedLLMClient(Counting(), max_entries=1, db_path=db)
+    assert survivors._rows == 9
+    assert survivors.get("k0") == "v" and survivors.get("k1") is None
+
+
+def test_compact_prompt_and_token_budget() -> None:
+    p_one = np.linspace(0.0, 1.0, 32)
+    brain = {"measured_bits": [0] * 32, "probabilities": np.stack([1 - p_one, p_one], axis=1).tolist()}
+    env = {"agent_position": 3, "threat_position": 7}
+    full = build_prompt(env, brain)
+    compact = build_prompt(env, brain, PromptOptions(compact=True, precision=2))
+    assert estimate_tokens(compact) < estimate_tokens(full) / 2
+    assert '"ap":3' in compact and '"p1":[0.0,0.03,' in compact
+
+    budgeted = build_prompt(env, brain, PromptOptions(compact=True, token_budget=150))
+    assert estimate_tokens(budgeted) <= 150
+    assert '"om":' in budgeted  # trailing qubits were left out
+
+
+def test_openai_client_batches_and_retries_against_stub() -> None:
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self) -> None:
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            prompt = body["messages"][0]["content"]
+            seen.append(prompt)
+            if prompt == "bad":
+                status, payload = 400, {"error": "bad request"}
+            elif seen.count(prompt) == 1 and prompt == "p1":
+                status, payload = 429, {"error": "slow down"}
+            else:
+                status, payload = 200, {"choices": [{"message": {"content": prompt.upper()}}]}
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = OpenAIClient(base_url=f"http://127.0.0.1:{server.server_port}/v1", backoff=0.0, pool_size=2)
+        prompts = [f"p{i}" for i in range(6)]
+        assert client.call_many(prompts) == [p.upper() for p in prompts]
+        assert seen.count("p1") == 2  # retried once after the 429
+        with pytest.raises(OpenAIRequestError) as info:
+            client("bad")
+        assert info.value.status == 400 and seen.count("bad") == 1
+        client.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_record_then_replay_against_stub_server(tmp_path) -> None:
+    path = str(tmp_path / "calls.jsonl")
+    server = StubChatServer(latency=uniform(0.0, 0.01), error_rate=0.3, reply=lambda p: p[::-1], seed=0)
+    with server:
+        client = OpenAIClient(base_url=server.url, backoff=0.0, max_retries=20)
+        recorder = RecordingLLMClient(client, path)
+        assert recorder.call_many(["abc", "xyz", "abc"]) == ["cba", "zyx", "cba"]
+        client.close()
+    assert server.errors > 0 and server.requests == 3 + server.errors
+
+    replay = ReplayLLMClient(path)
+    assert len(replay) == 2
+    assert replay("xyz") == "zyx"
+    with pytest.raises(KeyError):
+        replay("unseen")
+    assert ReplayLLMClient(path, fallback=TestClient())("unseen") == "{}"
+    assert replay.settings() == client.settings()
+
+    # Recordings of different models do not share cache entries.
+    class OtherModel(LLMClientBase):
+        def __call__(self, prompt: str) -> str:
+            return prompt[::-1]
+
+        def settings(self) -> dict:
+            return {**super().settings(), "model": "other-model"}
+
+    other = str(tmp_path / "other.jsonl")
+    RecordingLLMClient(OtherModel(), other)("abc")
+    replay_other = ReplayLLMClient(other)
+    assert CachedLLMClient(replay).key("abc") != CachedLLMClient(replay_other).key("abc")
+    with open(other, "a", encoding="utf-8") as f, open(path, encoding="utf-8") as g:
+        f.write(g.readline())
+    with pytest.raises(ValueError):
+        ReplayLLMClient(other)
+
+
+def test_parse_response_recovers_wrapped_and_streamed_json() -> None:
+    body = '{"qubit_update": "decohere", "perceived_environment": {"description": "a {brace} \\" quote"}}'
+    text = "Sure, here it is {as asked}:\n```json\n" + body + "\n```"
+    expected = {"qubit_update": "decohere", "perceived_environment": {"description": 'a {brace} " quote'}}
+    assert parse_response(text) == expected
+    assert parse_response('{"qubit_update": 1, "perceived_environment": "calm"}') == {
+        "qubit_update": "1",
+        "perceived_environment": {"description": "calm"},
+    }
+    assert parse_response("no json here")["perceived_environment"]["description"] == "unknown"
+
+    parser = StreamingJSONParser(RESPONSE_SCHEMA)
+    chunks = [text[i : i + 5] for i in range(0, len(text), 5)]
+    results = [parser.feed(chunk) for chunk in chunks]
+    # Found as soon as the chunk with the closing brace arrives.
+    closing_chunk = (text.index(body) + len(body) - 1) // 5
+    assert results.index(expected) == closing_chunk and parser.done
+
+
+def test_surrogate_learns_from_recording_and_defers_when_unsure(tmp_path, monkeypatch) -> None:
+    class PositionLLM(LLMClientBase):
+        calls = 0
+
+        def __call__(self, prompt: str) -> str:
+            PositionLLM.calls += 1
+            position = next(iter_json_objects(prompt))["agent_position"]
+            return json.dumps({"qubit_update": "none", "perceived_environment": {"at": position}})
+
+    def prompt(position: int, light: float = 0.5) -> str:
+        env = {"agent_position": position, "threat_position": 9, "light": light}
+        return build_prompt(env, {"measured_bits": [0, 1], "probabilities": [[1.0, 0.0], [0.0, 1.0]]})
+
+    path = str(tmp_path / "calls.jsonl")
+    recorder = RecordingLLMClient(PositionLLM(), path)
+    for position in (0, 1, 2, 5):
+        for _ in range(3):
+            recorder(prompt(position))
+
+    surrogate = SurrogateLLMClient.from_recording(path, PositionLLM(), min_support=3, max_distance=1.0)
+    PositionLLM.calls = 0
+    assert len(surrogate) == 4
+    assert json.loads(surrogate(prompt(1, light=0.52)))["perceived_environment"] == {"at": 1}  # same bin
+    assert json.loads(surrogate(prompt(6)))["perceived_environment"] == {"at": 5}  # nearest neighbour
+    assert json.loads(surrogate(prompt(8)))["perceived_environment"] == {"at": 8}  # too far: deferred
+    assert PositionLLM.calls == 1
+    stats = surrogate.stats()
+    assert (stats["table_hits"], stats["neighbour_hits"], stats["deferred"]) == (1, 1, 1)
+    assert stats["fallback_rate"] == pytest.approx(1 / 3)
+
+    # Learning a new key indexes just that key, not the whole table.
+    splits = []
+    real_split = surrogate_module._split
+    monkeypatch.setattr(surrogate_module, "_split", lambda key: splits.append(key) or real_split(key))
+    learner = SurrogateLLMClient(PositionLLM(), max_distance=0.5)
+    for position in range(200):
+        learner(prompt(position * 10))
+    assert len(learner) == 200
+    # One split to index each new key and one for each neighbour search.
+    assert len(splits) == 2 * 200 - 1